@@ -0,0 +1,212 @@
+import re
+from collections import namedtuple
+
+
+# Street type spellings -> canonical abbreviation (Canada Post style, "BL" as shown by the site table)
+STREET_SUFFIXES = {
+    "AVENUE": "AVE", "AVE": "AVE", "AV": "AVE",
+    "BOULEVARD": "BL", "BOUL": "BL", "BLVD": "BL", "BL": "BL",
+    "CIRCLE": "CIR", "CIRC": "CIR", "CIR": "CIR",
+    "COURT": "CRT", "CRT": "CRT", "CT": "CRT",
+    "CRESCENT": "CRES", "CRES": "CRES", "CR": "CRES",
+    "DRIVE": "DR", "DR": "DR",
+    "GARDENS": "GDNS", "GDNS": "GDNS",
+    "GATE": "GATE", "GT": "GATE",
+    "GROVE": "GROVE", "GRV": "GROVE",
+    "HEIGHTS": "HTS", "HTS": "HTS",
+    "HIGHWAY": "HWY", "HWY": "HWY",
+    "LANE": "LANE", "LN": "LANE",
+    "PARKWAY": "PKY", "PKWY": "PKY", "PKY": "PKY",
+    "PLACE": "PL", "PL": "PL",
+    "ROAD": "RD", "RD": "RD",
+    "SQUARE": "SQ", "SQ": "SQ",
+    "STREET": "ST", "ST": "ST",
+    "TERRACE": "TERR", "TERR": "TERR", "TER": "TERR",
+    "TRAIL": "TRAIL", "TRL": "TRAIL",
+    "WAY": "WAY",
+}
+
+DIRECTIONS = {
+    "NORTH": "N", "N": "N", "SOUTH": "S", "S": "S", "EAST": "E", "E": "E", "WEST": "W", "W": "W",
+    "NORTHEAST": "NE", "NE": "NE", "NORTHWEST": "NW", "NW": "NW",
+    "SOUTHEAST": "SE", "SE": "SE", "SOUTHWEST": "SW", "SW": "SW",
+}
+
+# "5-773" (unit-civic number) and "773 ... UNIT 5" / "APT 5" / "#5"
+_UNIT_CIVIC = re.compile(r"^([0-9A-Z]+)-([0-9]+[A-Z]?)$")
+_UNIT_TRAILER = re.compile(r"\s(?:UNIT|APT|APARTMENT|SUITE|STE|PH)\s*#?\s*([0-9A-Z]+)$|\s?#\s*([0-9A-Z]+)$")
+
+# Scores of `AddressIndex.match`
+EXACT_SCORE = 0.9
+MIN_SCORE = 0.5
+AMBIGUITY_MARGIN = 0.1
+
+ParsedAddress = namedtuple("ParsedAddress", ["number", "street", "suffix", "direction", "unit"])
+ParsedAddress.__doc__ = """
+## Normalized parts of an address: civic `number`, `street` name tokens (tuple), canonical `suffix` and `direction`,
+and `unit` ("" when absent).
+"""
+
+MatchResult = namedtuple("MatchResult", ["status", "score", "entry", "candidates"])
+MatchResult.__doc__ = """
+## Result of `AddressIndex.match`: `status` ("exact", "ambiguous" or "no_match"), the best `score` (0 to 1), the
+matched `entry` (None unless exact) and the scored `candidates` as `(score, key, entry)` tuples, best first.
+"""
+
+
+def parse_address(street_number, street_name=""):
+    """
+    ## Splits and normalizes an address.
+
+    - param street_number: Civic number (str or int), possibly with a unit ("5-773"). When `street_name` is empty it
+      can hold the whole address ("773 YORK HILL BL").
+    - param street_name: Street name, possibly with a suffix, a direction and a unit.
+
+    - return: `ParsedAddress`.
+    """
+    text = ' '.join(re.sub(r"[.,]", " ", f"{street_number} {street_name}").upper().split())
+    unit = ""
+    trailer = _UNIT_TRAILER.search(text)
+    if trailer:
+        unit = trailer.group(1) or trailer.group(2)
+        text = text[:trailer.start()].strip()
+
+    tokens = text.split()
+    number = tokens[0] if tokens else ""
+    unit_civic = _UNIT_CIVIC.match(number)
+    if unit_civic:
+        unit = unit or unit_civic.group(1)
+        number = unit_civic.group(2)
+    street = tokens[1:]
+
+    direction = ""
+    if len(street) > 1 and street[-1] in DIRECTIONS:
+        direction = DIRECTIONS[street.pop()]
+    suffix = ""
+    if len(street) > 1 and street[-1] in STREET_SUFFIXES:
+        suffix = STREET_SUFFIXES[street.pop()]
+    return ParsedAddress(number, tuple(street), suffix, direction, unit)
+
+
+def normalize_address(street_number, street_name=""):
+    """
+    ## Canonical key of an address: "NUMBER STREET SUFFIX DIRECTION", plus " UNIT x" when there is a unit.
+
+    - return: String; "773 York Hill Boulevard" and "773 YORK HILL BL" give the same key.
+    """
+    return address_key(parse_address(street_number, street_name))
+
+
+def address_key(parsed):
+    parts = [parsed.number, *parsed.street, parsed.suffix, parsed.direction]
+    if parsed.unit:
+        parts += ["UNIT", parsed.unit]
+    return ' '.join(part for part in parts if part)
+
+
+def addresses_match(first, second):
+    """
+    ## True when two full address strings normalize to the same key (replaces the old substring test, where
+    "77 YORK HILL BL" matched "773 YORK HILL BL").
+    """
+    return normalize_address(first) == normalize_address(second)
+
+
+def score_addresses(wanted, candidate):
+    """
+    ## Similarity of two `ParsedAddress`, from 0 to 1. Different civic numbers never score above `MIN_SCORE`.
+    """
+    if wanted.street == candidate.street:
+        score = 0.9
+    else:
+        wanted_tokens, candidate_tokens = set(wanted.street), set(candidate.street)
+        union = wanted_tokens | candidate_tokens
+        score = 0.8 * len(wanted_tokens & candidate_tokens) / len(union) if union else 0.0
+    # A missing suffix or direction is tolerated, a different one is not
+    for wanted_part, candidate_part in ((wanted.suffix, candidate.suffix), (wanted.direction, candidate.direction)):
+        if wanted_part == candidate_part:
+            score += 0.05
+        elif wanted_part and candidate_part:
+            score -= 0.2
+    if wanted.unit != candidate.unit:
+        score *= 0.5 if wanted.unit and candidate.unit else 0.95
+    if wanted.number != candidate.number:
+        score = min(score * 0.5, MIN_SCORE - 0.01)
+    return max(0.0, min(1.0, score))
+
+
+class AddressIndex:
+    """
+    ## AddressIndex
+    #### Precomputed index of the addresses of a site table: exact keys, civic numbers and street tokens, so a lookup only scores the few rows sharing the number or a street token.
+
+    #### Methods:
+
+    - `AddressIndex(entries: Iterable[tuple], complete: bool = True)`:
+        - `entries` are `(address, entry)` pairs; `address` is a full address string, `entry` is returned by `match`.
+          The first entry of an address wins.
+        - `complete` is False for an index built from a partial read of the table: a "no_match" then does not mean the
+          address is missing from the table.
+
+    - `match(street_number, street_name="") -> MatchResult`:
+        - "exact" when one entry scores at least `EXACT_SCORE` and no other comes within `AMBIGUITY_MARGIN`,
+          "ambiguous" when several entries are that close or the best one scores between `MIN_SCORE` and `EXACT_SCORE`,
+          "no_match" otherwise.
+
+    - `match_batch(rows: Iterable[dict]) -> list`:
+        - Matches every CSV row (`streetNumber` / `streetName`) in one pass; returns the `MatchResult`s in row order.
+
+    - `get(street_number, street_name="")`:
+        - Entry of an exact match, None otherwise.
+    """
+
+    def __init__(self, entries=(), complete=True):
+        self.complete = complete
+        self._entries = {}
+        self._parsed = {}
+        self._by_number = {}
+        self._by_token = {}
+        for address, entry in entries:
+            parsed = parse_address(address)
+            key = address_key(parsed)
+            if key in self._entries:
+                continue
+            self._entries[key] = entry
+            self._parsed[key] = parsed
+            self._by_number.setdefault(parsed.number, []).append(key)
+            for token in parsed.street:
+                self._by_token.setdefault(token, set()).add(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def match(self, street_number, street_name=""):
+        wanted = parse_address(street_number, street_name)
+        key = address_key(wanted)
+        if key in self._entries:
+            return MatchResult("exact", 1.0, self._entries[key], [(1.0, key, self._entries[key])])
+
+        candidate_keys = set(self._by_number.get(wanted.number, ()))
+        if not candidate_keys:
+            # Only to report near misses (e.g. a wrong civic number), they never match
+            for token in wanted.street:
+                candidate_keys.update(self._by_token.get(token, ()))
+        candidates = sorted(
+            ((score_addresses(wanted, self._parsed[candidate]), candidate, self._entries[candidate])
+             for candidate in candidate_keys),
+            key=lambda candidate: (-candidate[0], candidate[1]))[:5]
+
+        if not candidates or candidates[0][0] < MIN_SCORE:
+            return MatchResult("no_match", candidates[0][0] if candidates else 0.0, None, candidates)
+        best = candidates[0][0]
+        close = [candidate for candidate in candidates if best - candidate[0] < AMBIGUITY_MARGIN]
+        if best >= EXACT_SCORE and len(close) == 1:
+            return MatchResult("exact", best, candidates[0][2], candidates)
+        return MatchResult("ambiguous", best, None, candidates)
+
+    def match_batch(self, rows):
+        return [self.match(data['streetNumber'], data['streetName']) for data in rows]
+
+    def get(self, street_number, street_name=""):
+        result = self.match(street_number, street_name)
+        return result.entry if result.status == "exact" else None
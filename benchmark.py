@@ -0,0 +1,195 @@
+"""
+Benchmark of the `FetcherBot` code paths against the local mock of the Bell consent pages (see `mock_site.py`).
+
+Reports rows/minute, per-step latency, WebDriver commands per step and wait latencies. With `--baseline`, the
+per-step means are compared with a previous report and steps that got slower than `--tolerance` are flagged.
+
+    python benchmark.py --rows 50 --table-rows 400 --latency 0.02 --out bench.json
+    python benchmark.py --rows 50 --table-rows 400 --latency 0.02 --baseline bench.json
+
+With `--trace`, every WebDriver command of the run is recorded for an offline replay (see `trace_driver.py`); the feed
+is saved next to the trace as `<trace>.feed.csv`.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from browser_profiles import summarize_page_loads
+from csv_stream import iter_csv_rows
+from fetcher_bot import FetcherBot
+from mock_site import MockSalesforceServer, STATUSES
+from scheduler import SiteScheduler
+from tab_bot import AsyncTabBot
+from trace_driver import record_bot
+
+
+FEED_COLUMNS = ("id", "streetNumber", "lastName", "name", "notes", "salesForceNotes", "phone", "email", "type",
+                "streetId", "locationId", "lastUpdated", "lastUpdatedBy", "statusAttempt", "consent", "street",
+                "location")
+
+
+def write_feed(server, path, rows, seed=0):
+    """
+    ## Writes a CSV feed of `rows` addresses picked from the mock sites.
+
+    - return: The path of the feed.
+    """
+    generator = random.Random(seed)
+    candidates = [(site_name, row) for site_name, site_rows in server.sites.items() for row in site_rows]
+    picked = generator.sample(candidates, min(rows, len(candidates)))
+    with open(path, "w", newline="", encoding="utf-8") as feed:
+        writer = csv.DictWriter(feed, FEED_COLUMNS)
+        writer.writeheader()
+        for number, (site_name, row) in enumerate(picked):
+            street_number, _, street = row["address"].partition(" ")
+            writer.writerow({
+                "id": f"bench-{number}",
+                "streetNumber": street_number,
+                "street": street.title(),
+                "name": "Bench",
+                "lastName": f"Resident{number}",
+                "phone": "4165550000",
+                "email": f"bench{number}@example.com",
+                "type": row["type"],
+                "lastUpdated": "2024-01-01T00:00:00.000Z",
+                "lastUpdatedBy": "benchmark",
+                "statusAttempt": generator.choice([status for status in STATUSES if status]),
+                "consent": generator.choice(("Yes", "No")),
+                "location": site_name,
+            })
+    return path
+
+
+def run_benchmark(rows=20, table_rows=300, sites=1, latency=0.0, seed=0, direct=False, tabs=1, profile="default",
+                  trace=None):
+    """
+    ## Runs the bot over a generated feed against a fresh mock server.
+    #### With `trace`, the WebDriver commands are recorded to that file and the feed is written next to it.
+
+    - return: Dictionary report (see the module docstring).
+    """
+    site_names = ["TNHLON40_3104A"] + [f"MOCKSITE_{number:03d}" for number in range(1, sites)]
+    server = MockSalesforceServer({name: table_rows for name in site_names}, latency=latency, seed=seed).start()
+    feed_path = os.path.splitext(trace)[0] + ".feed.csv" if trace else os.path.join(tempfile.mkdtemp(), "feed.csv")
+    write_feed(server, feed_path, rows, seed)
+
+    startup = time.perf_counter()
+    bot = FetcherBot(profile=profile)
+    try:
+        if trace:
+            record_bot(bot, trace)
+        if not bot.start_session(server.login_url, "benchmark", "benchmark"):
+            raise RuntimeError("Unable to log in to the mock server")
+        if direct:
+            bot.enable_direct_data(f"{server.url}/apex/remoting/rows")
+        startup = time.perf_counter() - startup
+
+        start = time.perf_counter()
+        if tabs > 1:
+            outcomes = asyncio.run(AsyncTabBot.from_bot(bot, tabs=tabs).run(iter_csv_rows(feed_path)))
+        else:
+            outcomes = SiteScheduler(bot).run(iter_csv_rows(feed_path))
+        elapsed = time.perf_counter() - start
+
+        statuses = {}
+        for outcome in outcomes:
+            statuses[outcome["status"]] = statuses.get(outcome["status"], 0) + 1
+        metrics = bot.metrics.to_dict()
+        return {
+            "config": {"rows": rows, "table_rows": table_rows, "sites": sites, "latency": latency, "seed": seed,
+                       "direct": direct, "tabs": tabs, "profile": profile},
+            "startup_seconds": startup,
+            "elapsed_seconds": elapsed,
+            "rows": len(outcomes),
+            "rows_per_minute": len(outcomes) / (elapsed / 60) if elapsed else 0.0,
+            "statuses": statuses,
+            "server": server.state(),
+            "webdriver_commands": metrics["webdriver_commands"],
+            "steps": {
+                name: {key: step[key] for key in ("count", "mean", "max", "commands")}
+                for name, step in metrics["steps"].items()
+            },
+            "waits": bot.waits.stats(),
+            "locator_cache": dict(bot.locators.stats),
+            "page_loads": summarize_page_loads(bot.page_loads),
+            "sync": dict(bot.sync_stats),
+            "navigation": dict(bot.navigator.stats),
+        }
+    finally:
+        bot.quit()
+        server.stop()
+
+
+def print_report(report, baseline=None, tolerance=0.2):
+    """
+    ## Prints a report; with a baseline report, flags the steps whose mean latency grew by more than `tolerance`.
+
+    - return: List of the regressed step names.
+    """
+    print(f"\nRows: {report['rows']} in {report['elapsed_seconds']:.1f}s "
+          f"({report['rows_per_minute']:.1f} rows/min, startup {report['startup_seconds']:.1f}s)")
+    print(f"Statuses: {report['statuses']}  WebDriver commands: {report['webdriver_commands']}")
+    print(f"Locator cache: {report['locator_cache']}")
+    print(f"Page loads: {report.get('page_loads')}")
+    print(f"Sync: {report.get('sync')}")
+    print(f"Table navigation: {report.get('navigation')}")
+    print(f"\n{'step':45} {'count':>6} {'mean s':>8} {'max s':>8} {'cmds':>7} {'vs base':>8}")
+
+    regressions = []
+    baseline_steps = (baseline or {}).get("steps", {})
+    for name, step in sorted(report["steps"].items()):
+        change = ""
+        base = baseline_steps.get(name)
+        if base and base["mean"]:
+            ratio = step["mean"] / base["mean"] - 1
+            change = f"{ratio:+.0%}"
+            if ratio > tolerance:
+                regressions.append(name)
+                change += " !"
+        print(f"{name:45} {step['count']:>6} {step['mean']:>8.3f} {step['max']:>8.3f} {step['commands']:>7} {change:>8}")
+
+    print(f"\n{'wait':45} {'count':>6} {'mean s':>8} {'max s':>8} {'timeouts':>8}")
+    for name, wait in sorted(report["waits"].items()):
+        print(f"{name:45} {wait['count']:>6} {wait['mean']:>8.3f} {wait['max']:>8.3f} {wait['timeouts']:>8}")
+
+    if baseline and baseline.get("rows_per_minute"):
+        print(f"\nRows/min vs baseline: {report['rows_per_minute'] / baseline['rows_per_minute'] - 1:+.0%}")
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FetcherBot against the local mock pages")
+    parser.add_argument("--rows", type=int, default=20, help="CSV rows to process")
+    parser.add_argument("--table-rows", type=int, default=300, help="table rows per site")
+    parser.add_argument("--sites", type=int, default=1, help="number of sites")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every mock request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--direct", action="store_true", help="read the site tables from their JSON endpoint")
+    parser.add_argument("--tabs", type=int, default=1, help="process rows in this many tabs of one browser")
+    parser.add_argument("--browser-profile", default="default", choices=("default", "lean"),
+                        help="browser profile of the bot (see browser_profiles.py)")
+    parser.add_argument("--out", help="save the report as JSON")
+    parser.add_argument("--baseline", help="JSON report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown per step (0.2 = 20%%)")
+    parser.add_argument("--trace", help="record the WebDriver commands of the run to this file (see trace_driver.py)")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.rows, args.table_rows, args.sites, args.latency, args.seed, args.direct, args.tabs,
+                           args.browser_profile, args.trace)
+    baseline_report = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline_report = json.load(baseline_file)
+    regressed = print_report(result, baseline_report, args.tolerance)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out_file:
+            json.dump(result, out_file, indent=2)
+    sys.exit(1 if regressed else 0)
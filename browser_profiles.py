@@ -0,0 +1,140 @@
+"""
+Browser profiles of `FetcherBot`.
+
+"default" is the plain headless Chrome the bot always used. "lean" loads only what the bot reads: pages are handed back
+at DOMContentLoaded (eager page load strategy), images are neither downloaded nor decoded, fonts, media and analytics
+beacons are blocked through CDP, and extensions, background networking and component updates are off.
+Compare both with `python benchmark.py --browser-profile lean`.
+"""
+
+# URL patterns blocked by the lean profile (`Network.setBlockedURLs`; "*" matches anything)
+LEAN_BLOCKED_URLS = (
+    # Images and icons
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp",
+    # Fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    # Media
+    "*.mp4", "*.webm", "*.mp3",
+    # Analytics and beacons
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*/uitracker/*",
+    "*/sfsites/c/resource/*analytics*",
+)
+
+PROFILES = {
+    "default": {
+        "page_load_strategy": "normal",
+        "arguments": (),
+        "prefs": {},
+        "blocked_urls": (),
+    },
+    "lean": {
+        "page_load_strategy": "eager",
+        "arguments": (
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--disable-component-update",
+            "--disable-default-apps",
+            "--disable-sync",
+            "--blink-settings=imagesEnabled=false",
+        ),
+        "prefs": {"profile.managed_default_content_settings.images": 2},
+        "blocked_urls": LEAN_BLOCKED_URLS,
+    },
+}
+
+# Load time and transferred bytes of the current document and of the resources it loaded (Resource Timing API;
+# cross-origin resources without Timing-Allow-Origin report 0 bytes)
+PAGE_LOAD_SCRIPT = """
+var navigation = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = navigation ? navigation.transferSize : 0;
+for (var i = 0; i < resources.length; i++) {
+    bytes += resources[i].transferSize || 0;
+}
+return {
+    url: window.location.href,
+    dom_content_loaded_ms: navigation ? navigation.domContentLoadedEventEnd : null,
+    load_ms: navigation && navigation.loadEventEnd ? navigation.loadEventEnd : null,
+    resources: resources.length,
+    transfer_bytes: bytes
+};
+"""
+
+
+def get_profile(name):
+    """
+    ## Returns the settings of a profile.
+
+    - param name: A key of `PROFILES`.
+
+    - return: Profile dictionary. Raises ValueError for an unknown profile.
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Unknown browser profile {name!r}, expected one of {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def apply_options(options, name):
+    """
+    ## Adds the launch settings of a profile (page load strategy, arguments, preferences) to Chrome `Options`.
+
+    - return: The same `Options`.
+    """
+    profile = get_profile(name)
+    options.page_load_strategy = profile["page_load_strategy"]
+    for argument in profile["arguments"]:
+        options.add_argument(argument)
+    if profile["prefs"]:
+        options.add_experimental_option("prefs", dict(profile["prefs"]))
+    return options
+
+
+def apply_network_rules(driver, name):
+    """
+    ## Installs the URL blocking of a profile in a running Chrome.
+
+    - return: True if the rules are installed (or the profile has none), False otherwise.
+    """
+    blocked_urls = get_profile(name)["blocked_urls"]
+    if not blocked_urls:
+        return True
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(blocked_urls)})
+        return True
+    except Exception as e:
+        print(f"Error: Unable to install the request blocking of the {name} profile\n{e}")
+        return False
+
+
+def page_load_stats(driver):
+    """
+    ## Reads the load time and transferred bytes of the page currently displayed.
+
+    - return: Dictionary with `url`, `dom_content_loaded_ms`, `load_ms`, `resources` and `transfer_bytes`, or None.
+    """
+    try:
+        return driver.execute_script(PAGE_LOAD_SCRIPT)
+    except Exception as e:
+        print(f"Error: Unable to read the page load timings\n{e}")
+        return None
+
+
+def summarize_page_loads(page_loads):
+    """
+    ## Aggregates the `page_load_stats` of a run.
+
+    - return: Dictionary with the number of `pages`, the mean DOMContentLoaded and load times and the total bytes.
+    """
+    loads = [load for load in page_loads if load]
+
+    def mean(key):
+        values = [load[key] for load in loads if load.get(key) is not None]
+        return sum(values) / len(values) if values else None
+
+    return {
+        "pages": len(loads),
+        "mean_dom_content_loaded_ms": mean("dom_content_loaded_ms"),
+        "mean_load_ms": mean("load_ms"),
+        "transfer_bytes": sum(load.get("transfer_bytes") or 0 for load in loads),
+    }
@@ -0,0 +1,61 @@
+from csv_stream import parse_timestamp
+
+
+# `data-title-text` of the site table columns compared with the CSV
+STATUS_COLUMN = "Status"
+CONSENT_COLUMN = "Consent"
+LAST_UPDATED_COLUMN = "Last Updated"
+
+# Status for which the form asks for a consent answer
+CONSENT_STATUS = "Consent Final"
+
+# What `parse_timestamp` returns for an empty or invalid value
+_UNKNOWN_TIMESTAMP = parse_timestamp("")
+
+
+def _state(status, consent):
+    status = ' '.join((status or "").split()).upper()
+    consent = ' '.join((consent or "").split()).upper() if status == CONSENT_STATUS.upper() else ""
+    return status, consent
+
+
+def target_state(data):
+    """
+    ## State a CSV row asks for.
+
+    - param data: Dictionary produced by `FetcherBot.process_csv_to_dict`.
+
+    - return: `(status, consent)` tuple, upper-cased; consent is only part of the state for "Consent Final".
+    """
+    return _state(data.get("statusAttempt"), data.get("consent"))
+
+
+def table_state(row):
+    """
+    ## State shown by a row of the site table (a `FetcherBot.get_table_data` row or a site index `state`).
+
+    - return: `(status, consent)` tuple, comparable with `target_state`.
+    """
+    return _state(row.get(STATUS_COLUMN), row.get(CONSENT_COLUMN))
+
+
+def is_in_target_state(data, row):
+    """
+    ## Checks whether submitting a CSV row would be a no-op.
+    #### True when the table row already shows the status (and, for "Consent Final", the consent) of the CSV row, and the table row was not updated before the CSV row's `lastUpdated`, which would mean the CSV carries newer details (name, phone, email) than Salesforce.
+
+    - param data: Dictionary produced by `FetcherBot.process_csv_to_dict`.
+    - param row: The table row of the same address.
+
+    - return: True if the row can be skipped.
+
+    #### Note:
+    - When either timestamp is missing or cannot be parsed, only the status and consent are compared.
+    """
+    if target_state(data) != table_state(row):
+        return False
+    csv_updated = parse_timestamp(data.get("lastUpdated", ""))
+    table_updated = parse_timestamp(row.get(LAST_UPDATED_COLUMN, ""))
+    if _UNKNOWN_TIMESTAMP in (csv_updated, table_updated):
+        return True
+    return table_updated >= csv_updated
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+# Stages of a row update, in the order they complete
+STAGES = ("lookup", "form_1", "form_2", "signature")
+
+
+def feed_journal_path(csv_path, directory="./.checkpoints"):
+    """
+    ## Path of the journal of one input feed, named after the CSV file and a digest of its content.
+    #### A restarted run of the same file resumes from its journal, while a new feed (e.g. the next export, whose rows
+    carry a new `lastUpdated` and `statusAttempt` under the same ids) starts a journal of its own.
+
+    - return: `<directory>/<csv name>-<digest>.sqlite3`
+    """
+    digest = hashlib.sha1()
+    with open(csv_path, "rb") as csv_file:
+        for chunk in iter(lambda: csv_file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(directory, f"{name}-{digest.hexdigest()[:12]}.sqlite3")
+
+
+def remove_journal(path):
+    """
+    ## Deletes a closed journal and its WAL files, once the feed it belongs to is done.
+    """
+    for file_path in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+class CheckpointJournal:
+    """
+    ## CheckpointJournal
+    #### Crash-safe SQLite journal of the row updates, keyed by the CSV `id`, so an interrupted batch resumes where it stopped.
+
+    #### Methods:
+
+    - `record(row_id: str, stage: str, finished: bool = False)`:
+        - Records that `stage` (one of `STAGES`) completed for the row; `finished` marks the whole row as done.
+          A row already recorded at a later stage keeps that stage, and is not marked finished by an earlier one.
+
+    - `stage_of(row_id: str) -> Optional[str]`:
+        - Returns the last completed stage of the row, None if the row was never started.
+
+    - `is_finished(row_id: str) -> bool`:
+        - Returns True if the row was fully processed.
+
+    - `has_completed(row_id: str, stage: str) -> bool`:
+        - Returns True if the row already went through `stage`.
+
+    #### Note:
+    - Every `record` is committed immediately (WAL journal), so it survives a crash of the bot or of Chrome.
+    - The journal can be shared by the threads of one process; separate processes open their own `CheckpointJournal`.
+    - Rows are keyed by their id only, so a journal belongs to one input feed (see `feed_journal_path`) and is deleted
+      with `remove_journal` once the feed is done; otherwise a later feed would skip every id finished before.
+    """
+
+    def __init__(self, path="./.checkpoints/journal.sqlite3"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " row_id TEXT PRIMARY KEY,"
+            " stage TEXT NOT NULL,"
+            " finished INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL)")
+        self._connection.commit()
+
+    def record(self, row_id, stage, finished=False):
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage!r}, expected one of {STAGES}")
+        with self._lock:
+            found = self._connection.execute(
+                "SELECT stage, finished FROM checkpoints WHERE row_id = ?", (str(row_id),)).fetchone()
+            if found is not None and STAGES.index(found[0]) > STAGES.index(stage):
+                # A resumed row goes through the earlier stages again, they must not undo its progress
+                stage, finished = found[0], bool(found[1])
+            self._connection.execute(
+                "INSERT INTO checkpoints (row_id, stage, finished, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(row_id) DO UPDATE SET stage = excluded.stage, finished = excluded.finished,"
+                " updated_at = excluded.updated_at",
+                (str(row_id), stage, int(finished), time.time()))
+            self._connection.commit()
+
+    def stage_of(self, row_id):
+        with self._lock:
+            found = self._connection.execute(
+                "SELECT stage FROM checkpoints WHERE row_id = ?", (str(row_id),)).fetchone()
+        return found[0] if found else None
+
+    def is_finished(self, row_id):
+        with self._lock:
+            found = self._connection.execute(
+                "SELECT finished FROM checkpoints WHERE row_id = ?", (str(row_id),)).fetchone()
+        return bool(found and found[0])
+
+    def has_completed(self, row_id, stage):
+        completed = self.stage_of(row_id)
+        return completed is not None and STAGES.index(completed) >= STAGES.index(stage)
+
+    def summary(self):
+        """
+        ## Counts the journal rows by stage.
+
+        - return: Dictionary mapping each stage (and "finished") to its number of rows.
+        """
+        with self._lock:
+            counts = dict(self._connection.execute(
+                "SELECT stage, COUNT(*) FROM checkpoints WHERE finished = 0 GROUP BY stage").fetchall())
+            counts["finished"] = self._connection.execute(
+                "SELECT COUNT(*) FROM checkpoints WHERE finished = 1").fetchone()[0]
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,141 @@
+import csv
+import gzip
+from datetime import datetime, timezone
+
+from address_matcher import normalize_address
+
+
+# CSV columns the bot cannot work without
+REQUIRED_COLUMNS = (
+    "streetNumber", "street", "name", "lastName", "phone", "email",
+    "type", "statusAttempt", "consent", "location",
+)
+
+_OLDEST = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def open_csv(file_path):
+    """
+    ## Opens a CSV export for reading, plain or gzipped.
+
+    - param file_path: Path to the CSV file; gzipped files are detected from their content, not their name.
+
+    - return: Text file object to be used with `csv.DictReader`.
+    """
+    with open(file_path, "rb") as raw_file:
+        is_gzipped = raw_file.read(2) == b"\x1f\x8b"
+    if is_gzipped:
+        return gzip.open(file_path, "rt", newline="", encoding="utf-8-sig")
+    return open(file_path, newline="", encoding="utf-8-sig")
+
+
+def validate_columns(fieldnames, file_path=""):
+    """
+    ## Checks the CSV header before any row is read.
+
+    - param fieldnames: Header of the CSV file.
+    - param file_path: Path of the file, used in the error message.
+
+    - raise ValueError: When one of `REQUIRED_COLUMNS` is missing.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in (fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV file {file_path} is missing the required columns: {', '.join(missing)}")
+
+
+def normalize_row(row):
+    """
+    ## Converts a raw CSV row into the record used by `FetcherBot`.
+
+    - param row: Dictionary read by `csv.DictReader`.
+
+    - return: Dictionary with the keys produced by `FetcherBot.process_csv_to_dict`.
+    """
+    return {
+        'id': (row.get('id') or '').strip(),
+        'streetNumber': row['streetNumber'].strip(),
+        'streetName': row['street'].strip(),
+        'name': row['name'],
+        'lastName': row['lastName'],
+        'phone': row['phone'],
+        'email': row['email'],
+        'type': row['type'],
+        'statusAttempt': row['statusAttempt'].strip(),
+        'consent': row['consent'].strip(),
+        'location': row['location'].strip(),
+        'lastUpdated': (row.get('lastUpdated') or '').strip(),
+    }
+
+
+def parse_timestamp(value):
+    """
+    ## Parses a `lastUpdated` value such as "2023-07-28T15:47:54.523Z".
+
+    - return: Timezone-aware datetime, the oldest possible datetime when the value is empty or invalid.
+    """
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return _OLDEST
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _address_key(record):
+    return f"{record['location']}|{normalize_address(record['streetNumber'], record['streetName'])}"
+
+
+def iter_csv_rows(file_path, deduplicate=True):
+    """
+    ## Streams the normalized records of a CSV export.
+    #### The header is validated before the first record is produced. With `deduplicate`, rows sharing the same location and address are collapsed into the one with the latest `lastUpdated` (the first one wins a tie): a first pass keeps only the winning line number of every address, a second pass streams the winners, so memory grows with the number of addresses, not with the size of the rows.
+
+    - param file_path: Path to the CSV file (plain or gzipped).
+    - param deduplicate: Collapse duplicate addresses.
+
+    - return: Generator of dictionaries (see `normalize_row`), in file order.
+    """
+    with open_csv(file_path) as csv_file:
+        reader = csv.DictReader(csv_file)
+        validate_columns(reader.fieldnames, file_path)
+        if not deduplicate:
+            for row in reader:
+                yield normalize_row(row)
+            return
+
+        latest = {}
+        for line_number, row in enumerate(reader):
+            record = normalize_row(row)
+            key = _address_key(record)
+            updated = parse_timestamp(record['lastUpdated'])
+            if key not in latest or updated > latest[key][0]:
+                latest[key] = (updated, line_number)
+
+    winners = {line_number for _, line_number in latest.values()}
+    duplicates = line_number + 1 - len(winners) if latest else 0
+    if duplicates:
+        print(f"Info: {duplicates} duplicate addresses collapsed in {file_path}")
+    del latest
+
+    with open_csv(file_path) as csv_file:
+        for line_number, row in enumerate(csv.DictReader(csv_file)):
+            if line_number in winners:
+                yield normalize_row(row)
+
+
+def iter_batches(records, batch_size=50):
+    """
+    ## Groups a stream of records into lists of at most `batch_size` records.
+
+    - param records: Iterable of records (see `iter_csv_rows`).
+    - param batch_size: Maximum number of records per batch.
+
+    - return: Generator of lists.
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
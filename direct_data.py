@@ -0,0 +1,105 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
+
+import urllib3
+
+
+# JSON field of a table row -> `data-title-text` of the matching table cell
+DEFAULT_COLUMNS = {
+    "address": "Address",
+    "name": "Name",
+    "status": "Status",
+    "consent": "Consent",
+    "lastUpdated": "Last Updated",
+}
+
+
+class DirectTableClient:
+    """
+    ## DirectTableClient
+    #### Reads the site table from the JSON endpoint the table page loads it from, over a pooled HTTP connection that reuses the browser's authenticated session cookies.
+
+    #### Methods:
+
+    - `from_driver(driver, endpoint_url, **options) -> DirectTableClient`:
+        - Builds a client with the cookies and user agent of a logged-in WebDriver.
+
+    - `fetch_page(site_name: str, page: int) -> dict`:
+        - Returns one page of the endpoint: `{"total": int, "rows": [dict, ...]}`.
+
+    - `fetch_rows(site_name: str) -> list`:
+        - Returns every JSON row of a site; the first page gives the total, the other pages are fetched concurrently.
+
+    - `fetch_site_data(site_name: str, table_page_size: int) -> list`:
+        - Returns the rows in the structure built by `FetcherBot.fetch_site_data` (cells keyed by `data-title-text`,
+          `Number`, `Street Name`, and the `Page`/`Row` the row has in a browser table showing `table_page_size` rows per page).
+
+    #### Note:
+    - The endpoint is called with the `site`, `page` and `count` query parameters and must answer
+      `{"total": ..., "rows": [...]}` in the table's display order, as the table page's own loader does
+      (see `/apex/remoting/rows` in `mock_site.py`). Override `fetch_page` for an endpoint with another protocol,
+      such as Apex remoting.
+    - The browser is still needed for the "Go To" and form steps.
+    """
+
+    def __init__(self, endpoint_url, cookies=(), user_agent=None, page_size=500, pool_size=4, timeout=30,
+                 columns=None):
+        self.endpoint_url = endpoint_url
+        self.page_size = page_size
+        self.pool_size = pool_size
+        self.columns = columns or DEFAULT_COLUMNS
+        host = urlparse(endpoint_url).hostname or ""
+        # Only send the cookies the browser would send to the endpoint host
+        cookie_header = "; ".join(
+            f"{cookie['name']}={cookie['value']}" for cookie in cookies
+            if host == cookie.get("domain", "").lstrip(".") or host.endswith("." + cookie.get("domain", "").lstrip("."))
+            or not cookie.get("domain")
+        )
+        headers = {"Accept": "application/json", "Cookie": cookie_header}
+        if user_agent:
+            headers["User-Agent"] = user_agent
+        self.http = urllib3.PoolManager(
+            maxsize=pool_size, headers=headers, timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504)))
+
+    @classmethod
+    def from_driver(cls, driver, endpoint_url, **options):
+        try:
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        except Exception:
+            cookies = driver.get_cookies()
+        user_agent = driver.execute_script("return navigator.userAgent;")
+        return cls(endpoint_url, cookies=cookies, user_agent=user_agent, **options)
+
+    def fetch_page(self, site_name, page):
+        query = urlencode({"site": site_name, "page": page, "count": self.page_size})
+        response = self.http.request("GET", f"{self.endpoint_url}?{query}")
+        if response.status != 200:
+            raise RuntimeError(f"Table endpoint answered {response.status} for site {site_name}, page {page}")
+        return json.loads(response.data)
+
+    def fetch_rows(self, site_name):
+        first = self.fetch_page(site_name, 1)
+        rows = list(first["rows"])
+        pages = -(-first["total"] // self.page_size)
+        if pages > 1:
+            with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+                for page in executor.map(lambda number: self.fetch_page(site_name, number), range(2, pages + 1)):
+                    rows.extend(page["rows"])
+        return rows
+
+    def fetch_site_data(self, site_name, table_page_size):
+        table_data = []
+        for position, json_row in enumerate(self.fetch_rows(site_name)):
+            row = {title: str(json_row.get(key) or "") for key, title in self.columns.items()}
+            address = row.get("Address")
+            if not address:
+                continue
+            parts = address.split()
+            row["Number"] = parts[0]
+            row["Street Name"] = " ".join(parts[1:])
+            row["Page"] = position // table_page_size + 1
+            row["Row"] = position % table_page_size
+            table_data.append(row)
+        return table_data
@@ -0,0 +1,132 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from fetcher_bot import FetcherBot
+from session_store import SessionStore
+
+
+class DriverPool:
+    """
+    ## DriverPool
+    #### Pool of pre-launched, logged-in `FetcherBot`s that workers check out and return, so a job does not pay Chrome's cold start and the login.
+
+    #### Methods:
+
+    - `start() -> DriverPool`:
+        - Launches and logs in `size` bots in parallel. The first login is saved to the `SessionStore`, the others
+          reuse it.
+
+    - `checkout(timeout: float = None) -> FetcherBot`:
+        - Returns a ready bot, replacing it first when its browser died. Raises `queue.Empty` after `timeout` seconds.
+
+    - `checkin(bot: FetcherBot)`:
+        - Returns a bot to the pool. Its browser stays open, on the site it was working on.
+
+    - `lease(timeout: float = None)`:
+        - Context manager around `checkout` / `checkin`.
+
+    - `close()`:
+        - Quits every bot of the pool.
+
+    #### Usage:
+    - `with DriverPool(url, username, password, size=2).start() as pool:` then `with pool.lease() as bot: ...`
+    """
+
+    def __init__(self, url, username, password, size=2, session_path=None, index_ttl=900, profile="default"):
+        self.url = url
+        self.username = username
+        self.password = password
+        self.size = max(1, size)
+        self.session_store = SessionStore(session_path) if session_path else None
+        self.index_ttl = index_ttl
+        self.profile = profile
+        self._idle = queue.LifoQueue()
+        self._bots = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        # The first bot logs in and saves the session before the others restore it
+        first = self._launch()
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            others = list(executor.map(lambda _: self._launch(), range(self.size - 1)))
+        for bot in [first] + others:
+            if bot is not None:
+                self._idle.put(bot)
+        print(f"Driver pool ready with {self._idle.qsize()} of {self.size} bots")
+        return self
+
+    def checkout(self, timeout=None):
+        bot = self._idle.get(timeout=timeout)
+        if self.is_alive(bot):
+            return bot
+        print("Info: Pooled browser is gone, launching a new one")
+        self._discard(bot)
+        replacement = self._launch()
+        if replacement is None:
+            raise RuntimeError("Unable to launch a replacement browser")
+        return replacement
+
+    def checkin(self, bot):
+        if self.is_alive(bot):
+            self._idle.put(bot)
+        else:
+            self._discard(bot)
+            replacement = self._launch()
+            if replacement is not None:
+                self._idle.put(replacement)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        bot = self.checkout(timeout)
+        try:
+            yield bot
+        finally:
+            self.checkin(bot)
+
+    def close(self):
+        with self._lock:
+            bots, self._bots = self._bots, []
+        for bot in bots:
+            bot.quit()
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def is_alive(bot):
+        """
+        ## Non-throwing check that the browser of a bot still answers.
+        """
+        if not bot.has_driver:
+            return False
+        try:
+            bot.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _launch(self):
+        bot = FetcherBot(index_ttl=self.index_ttl, profile=self.profile)
+        try:
+            if bot.start_session(self.url, self.username, self.password, self.session_store):
+                with self._lock:
+                    self._bots.append(bot)
+                return bot
+            print("Error: Pooled browser could not log in")
+        except Exception as e:
+            print(f"Error: Unable to launch a pooled browser\n{e}")
+        bot.quit()
+        return None
+
+    def _discard(self, bot):
+        with self._lock:
+            if bot in self._bots:
+                self._bots.remove(bot)
+        bot.quit()
@@ -0,0 +1,195 @@
+import os
+import statistics
+import time
+from collections import deque
+
+try:
+    import psutil
+except ImportError:
+    # The memory of the browser is read from /proc instead (Linux only)
+    psutil = None
+
+
+def _proc_children():
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", encoding="utf-8") as stat_file:
+                # The process name can hold spaces and parentheses, the parent pid follows the last ")"
+                parent = int(stat_file.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(name))
+    return children
+
+
+def _proc_rss(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def process_tree_rss(pid):
+    """
+    ## Resident memory of a process and all its descendants, read with psutil when installed, else from /proc.
+
+    - return: Bytes, or None when the memory cannot be read on this system.
+    """
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            total = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        except psutil.Error:
+            return None
+    if not os.path.isdir("/proc"):
+        return None
+    children = _proc_children()
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += _proc_rss(current)
+        pending.extend(children.get(current, ()))
+    return total
+
+
+def browser_rss(bot):
+    """
+    ## Resident memory of the browser of a bot: chromedriver, Chrome and its renderer and GPU processes.
+
+    - return: Bytes, or None when the browser is not started, is remote, or its memory cannot be read.
+    """
+    if not bot.has_driver:
+        return None
+    process = getattr(getattr(bot.driver, "service", None), "process", None)
+    if process is None:
+        return None
+    return process_tree_rss(process.pid)
+
+
+class RecyclePolicy:
+    """
+    ## RecyclePolicy
+    #### Thresholds after which `DriverRecycler` restarts the browser.
+
+    #### Attributes:
+
+    - `max_rows`: Rows processed by one browser (None: no limit).
+    - `max_rss_mb`: Resident memory of the browser process tree, in MB (None: not monitored).
+    - `max_drift`: Allowed ratio between the median latency of the last `window` rows and the median latency of the
+      first `window` rows of the browser (None: not monitored).
+    - `window`: Number of rows of the latency medians.
+    - `check_every`: The memory is read every `check_every` rows.
+    """
+
+    def __init__(self, max_rows=1000, max_rss_mb=2048, max_drift=1.5, window=25, check_every=10):
+        if max_rows is not None and max_rows < 1:
+            raise ValueError(f"max_rows must be at least 1, got {max_rows}")
+        if max_rss_mb is not None and max_rss_mb <= 0:
+            raise ValueError(f"max_rss_mb must be positive, got {max_rss_mb}")
+        if max_drift is not None and max_drift <= 1:
+            raise ValueError(f"max_drift must be greater than 1, got {max_drift}")
+        if window < 1 or check_every < 1:
+            raise ValueError("window and check_every must be at least 1")
+        self.max_rows = max_rows
+        self.max_rss_mb = max_rss_mb
+        self.max_drift = max_drift
+        self.window = window
+        self.check_every = check_every
+
+
+class DriverRecycler:
+    """
+    ## DriverRecycler
+    #### Restarts the browser of a `FetcherBot` between two rows once it has processed too many rows, uses too much memory or got slower, so throughput stays flat on long runs.
+
+    #### Methods:
+
+    - `after_row(seconds: float) -> bool`:
+        - Records the latency of a row that went through the forms and restarts the browser when `reason()` gives a
+          reason. Returns True if the browser was restarted.
+
+    - `reason() -> Optional[str]`:
+        - "rows", "memory" or "latency_drift" when a threshold of the policy is crossed, None otherwise.
+
+    - `recycle(reason: str) -> bool`:
+        - Restarts the browser with `FetcherBot.restart_driver`: same session, same site, same site index.
+
+    #### Attributes:
+
+    - `self.stats`: Number of `restarts` per reason, `failed_restarts`, the last measured `rss_mb` and the `restart_seconds`
+      spent restarting.
+    - `self.restart_failed`: True when the restart of the last `after_row` did not bring the bot back to its site.
+
+    #### Note:
+    - The rows themselves are not affected: the scheduler goes on with the next row, on the site the bot was on.
+    - Not for `AsyncTabBot`, whose tabs belong to the browser.
+    """
+
+    def __init__(self, bot, policy=None):
+        self.bot = bot
+        self.policy = policy or RecyclePolicy()
+        self.stats = {"restarts": {}, "failed_restarts": 0, "rss_mb": None, "restart_seconds": 0.0}
+        self.restart_failed = False
+        self._reset()
+
+    def _reset(self):
+        self.rows = 0
+        self.baseline = []
+        self.recent = deque(maxlen=self.policy.window)
+
+    def after_row(self, seconds):
+        self.restart_failed = False
+        self.rows += 1
+        if len(self.baseline) < self.policy.window:
+            self.baseline.append(seconds)
+        self.recent.append(seconds)
+        reason = self.reason()
+        if reason is None:
+            return False
+        return self.recycle(reason)
+
+    def reason(self):
+        policy = self.policy
+        if policy.max_rows is not None and self.rows >= policy.max_rows:
+            return "rows"
+        if policy.max_rss_mb is not None and self.rows % policy.check_every == 0:
+            rss = browser_rss(self.bot)
+            if rss is not None:
+                self.stats["rss_mb"] = rss / (1024 * 1024)
+                if self.stats["rss_mb"] > policy.max_rss_mb:
+                    return "memory"
+        # The recent rows must not overlap the baseline rows
+        if policy.max_drift is not None and self.rows >= 2 * policy.window:
+            baseline = statistics.median(self.baseline)
+            if baseline > 0 and statistics.median(self.recent) / baseline > policy.max_drift:
+                return "latency_drift"
+        return None
+
+    def recycle(self, reason):
+        print(f"Info: Restarting the browser after {self.rows} rows ({reason})")
+        start = time.perf_counter()
+        restarted = self.bot.restart_driver()
+        self.stats["restart_seconds"] += time.perf_counter() - start
+        if restarted:
+            self.stats["restarts"][reason] = self.stats["restarts"].get(reason, 0) + 1
+        else:
+            self.stats["failed_restarts"] += 1
+            self.restart_failed = True
+            print("Error: The restarted browser is not back on its site")
+        # The next rows are measured against the new browser; a failed restart is recovered by `SiteScheduler`
+        self._reset()
+        return restarted
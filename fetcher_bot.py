@@ -1,12 +1,12 @@
-import csv
+import json
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
+import os
+import tempfile
 import time
-import tkinter
-from tkinter import messagebox
 
 from selenium import webdriver
 # Uncomment to use:
@@ -17,6 +17,154 @@ from selenium import webdriver
 # Headless browser from chrome (options)
 from selenium.webdriver.chrome.options import Options
 
+from address_matcher import AddressIndex, addresses_match, normalize_address
+from browser_profiles import apply_network_rules, apply_options, page_load_stats
+from change_detection import is_in_target_state
+from retry_queue import classify_error
+from session_store import SessionStore
+from signature import replay_signature, stroke_signature
+from csv_stream import iter_csv_rows
+from direct_data import DirectTableClient
+from locators import LocatorRegistry
+from metrics import Metrics, timed
+from table_navigator import TableNavigator
+from wait_engine import WaitEngine
+
+
+# Reads every data row of the table page in one round-trip.
+# Each "Go To" button is tagged with a `data-fetcher-row` handle so it can be clicked later without re-reading the row.
+TABLE_DATA_SCRIPT = """
+var nonce = String(Date.now());
+var rows = [];
+var trs = document.getElementsByTagName('tr');
+for (var i = 0; i < trs.length; i++) {
+    var tds = trs[i].getElementsByTagName('td');
+    if (!tds.length) {
+        continue;
+    }
+    var cells = {};
+    for (var j = 0; j < tds.length; j++) {
+        cells[tds[j].getAttribute('data-title-text')] = (tds[j].innerText || '').trim();
+    }
+    var goTo = null;
+    var buttons = trs[i].querySelectorAll('td button');
+    for (var k = 0; k < buttons.length; k++) {
+        if (buttons[k].textContent.indexOf('Go To') !== -1) {
+            goTo = nonce + '-' + rows.length;
+            buttons[k].setAttribute('data-fetcher-row', goTo);
+            break;
+        }
+    }
+    rows.push({cells: cells, goTo: goTo});
+}
+return JSON.stringify(rows);
+"""
+
+# Texts of the options of the select element arguments[0]
+SITE_OPTIONS_SCRIPT = """
+var texts = [];
+for (var i = 0; i < arguments[0].options.length; i++) {
+    texts.push(arguments[0].options[i].text.trim());
+}
+return texts;
+"""
+
+# Fills form 1 in one round-trip. arguments[0] is a list of fields {key, kind, locators, value} handled in order:
+# text inputs get the value and an input/change event, selects get the option whose text matches and a change event,
+# radios are clicked. Angular applies each event synchronously, so a field rendered by an earlier choice (Consent) is
+# found by the later ones. Returns a JSON map of every field key to the value the form now holds (null if not found).
+FORM_FILL_SCRIPT = """
+function resolve(locators, all) {
+    for (var i = 0; i < locators.length; i++) {
+        var found = [];
+        if (locators[i].css) {
+            found = Array.prototype.slice.call(document.querySelectorAll(locators[i].css));
+        } else {
+            var snapshot = document.evaluate(locators[i].xpath, document, null,
+                                             XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (var j = 0; j < snapshot.snapshotLength; j++) {
+                found.push(snapshot.snapshotItem(j));
+            }
+        }
+        if (found.length) {
+            return all ? found : found[0];
+        }
+    }
+    return all ? [] : null;
+}
+function fire(element, type) {
+    element.dispatchEvent(new Event(type, {bubbles: true}));
+}
+var result = {};
+var fields = arguments[0];
+for (var f = 0; f < fields.length; f++) {
+    var field = fields[f];
+    result[field.key] = null;
+    if (field.kind === 'radio') {
+        var radios = resolve(field.locators, true);
+        for (var r = 0; r < radios.length; r++) {
+            if (radios[r].value === field.value) {
+                if (!radios[r].checked) {
+                    radios[r].click();
+                }
+                result[field.key] = radios[r].checked ? radios[r].value : null;
+            }
+        }
+        continue;
+    }
+    var element = resolve(field.locators, false);
+    if (!element) {
+        continue;
+    }
+    if (field.kind === 'select') {
+        for (var o = 0; o < element.options.length; o++) {
+            if (element.options[o].text.trim() === field.value) {
+                element.selectedIndex = o;
+                fire(element, 'change');
+                break;
+            }
+        }
+        var selected = element.options[element.selectedIndex];
+        result[field.key] = selected ? selected.text.trim() : '';
+    } else {
+        element.focus();
+        element.value = field.value;
+        fire(element, 'input');
+        fire(element, 'change');
+        element.blur();
+        result[field.key] = element.value;
+    }
+}
+return JSON.stringify(result);
+"""
+
+
+def row_key(data):
+    """
+    ## Builds the key that identifies a CSV row across runs and workers.
+
+    - param data: Dictionary produced by `FetcherBot.process_csv_to_dict`.
+
+    - return: The CSV `id` when present, otherwise "location|normalized address".
+    """
+    if data.get("id"):
+        return str(data["id"])
+    address = FetcherBot.normalize_address_key(data['streetNumber'], data['streetName'])
+    return f"{data.get('location', '')}|{address}"
+
+
+class TableReadIncomplete(Exception):
+    """
+    ## Raised by `FetcherBot.iter_table_pages` when the table could not be read to its last page.
+    #### `pages_read` pages were yielded out of `page_count` (None when the pager could not be read).
+    `FetcherBot.fetch_site_data` attaches the `rows` of the pages read.
+    """
+
+    def __init__(self, message, pages_read=0, page_count=None):
+        super().__init__(message)
+        self.pages_read = pages_read
+        self.page_count = page_count
+        self.rows = []
 
 
 class FetcherBot:
@@ -39,7 +187,7 @@ class FetcherBot:
 
     - `click_next_page_button() -> bool`:
         - Clicks the button to navigate to the next page.
-        - Returns True if successful, False otherwise.
+        - Returns True if successful, False otherwise (right away on the last page).
 
     - `get_login_confirmation() -> bool`:
         - Prompts the user to confirm login using a dialog box.
@@ -53,13 +201,37 @@ class FetcherBot:
         - Finds matching addresses from a table and performs related actions.
         - Returns True if successful, False otherwise.
 
+    - `build_site_index(site_name: str) -> bool`:
+        - Scrapes every page of the site table once and indexes the rows by address.
+        - Returns True if successful, False otherwise.
+
     #### Attributes:
 
     - `self.driver`:
-        - The Selenium WebDriver instance used to interact with the web browser.
+        - The Selenium WebDriver instance used to interact with the web browser. Chrome is started on first use, so
+          building a `FetcherBot` is cheap; pass `driver=` to reuse a browser that is already running.
+
+    - `self.locators`:
+        - `LocatorRegistry` resolving and caching the iframe and the elements used by every method (see `locators.LOCATORS`).
+
+    - `self.site_index`:
+        - Dict keyed by normalized address ("773 YORK HILL BL") holding the page number, row position and
+          row state of every row of the active site (built by `build_site_index`).
+
+    - `self.address_index`:
+        - `AddressIndex` over the same rows, used to match CSV addresses despite suffix, direction, unit or case
+          differences (see `address_matcher`).
+
+    - `self.index_ttl`:
+        - Number of seconds after which `self.site_index` is considered stale and rebuilt.
+
+    - `self.last_error`:
+        - `{"step", "kind", "message"}` of the last failure inside `process_row`, None when the row went through;
+          `kind` is one of `retry_queue.ERROR_KINDS`, None for an error a retry cannot fix.
 
-    - `self.xpath_iframe_complete`:
-        - XPATH for the iframe to be selected (used in `select_site` method).
+    - `self.profile`:
+        - Browser profile, "default" or "lean" (see `browser_profiles`). `self.page_loads` holds the load time and
+          transferred bytes of the pages the bot opened, to compare profiles.
 
     #### Usage:
     - Initialize an instance of the FetcherBot class with appropriate configurations.
@@ -70,29 +242,95 @@ class FetcherBot:
     - Be aware of the specific web elements and structures that this class is designed to interact with.
     """
 
-    def __init__(self):
-        self.draw_script = """
-        var context = arguments[0].getContext('2d');
-        context.beginPath();
-        context.moveTo(50, 50);  # Start point
-        context.lineTo(200, 200);  # End point
-        context.stroke();
-        """
-                # Create ChromeOptions object with headless mode
+    def __init__(self, index_ttl=900, driver=None, profile="default"):
+        # Create ChromeOptions object with headless mode
         self.chrome_options = Options()
         self.chrome_options.add_argument("--headless=new")
         self.chrome_options.add_argument('--disable-gpu')  # Disable GPU usage when in headless mode
         self.chrome_options.add_argument('--no-sandbox')   # Optional, may be required in some environments
+        # "lean" blocks the resources the bot does not read (see `browser_profiles`)
+        self.profile = profile
+        apply_options(self.chrome_options, profile)
+        # Load time and bytes of every page opened by `go_to_url` and `login`
+        self.page_loads = []
+
+
+        # Per-step timings and WebDriver command counts (see `Metrics`)
+        self.metrics = Metrics()
+        # Condition-driven waits shared by every step (see `WaitEngine`)
+        self.waits = WaitEngine(None)
+        # Iframe and element handles cached per frame context (see `LocatorRegistry`)
+        self.locators = LocatorRegistry(None)
+        # Page size, page jumps and filter box of the site table (see `TableNavigator`)
+        self.navigator = TableNavigator(self)
+        # The browser is started on first use of `self.driver` (see `driver`)
+        self._driver = None
+        if driver is not None:
+            self._bind_driver(driver)
+
+        self.fetch_report = []
+        # Site table index (see `build_site_index`)
+        self.index_ttl = index_ttl
+        self.site_index = {}
+        self.address_index = AddressIndex()
+        self.site_index_site = None
+        self.site_index_built_at = None
+        self.active_site = None
+        self.current_page = None
+        self.table_page_size = None
+        # Rows found already in their target state ("unchanged") or sent to the form ("changed"), see `process_row`
+        self.sync_stats = {"unchanged": 0, "changed": 0}
+        # Step and class of the last failure of `process_row` (see `retry_queue.classify_error`)
+        self.last_error = None
+        # Last `AddressIndex.match` result of `find_matching_address_from_table`
+        self.last_match = None
+        # Page and login of `start_session`, used by `reset_page` and `recover_session`
+        self.session_url = None
+        self._login_details = None
+        # Optional direct data mode (see `enable_direct_data`)
+        self.direct_client = None
+
+    @property
+    def driver(self):
+        """
+        ## The WebDriver of the bot, Chrome is started the first time it is used.
+        """
+        if self._driver is None:
+            # self.service = Service("C:/Users/yalme/Desktop/gate/chromedriver.exe")
+            self._bind_driver(webdriver.Chrome(options=self.chrome_options))
+        return self._driver
 
+    @property
+    def has_driver(self):
+        """
+        ## True once the browser has been started (or injected).
+        """
+        return self._driver is not None
 
+    def _bind_driver(self, driver):
+        self._driver = driver
+        self.metrics.attach(driver)
+        apply_network_rules(driver, self.profile)
+        self.waits.driver = driver
+        self.locators.driver = driver
 
-        # self.service = Service("C:/Users/yalme/Desktop/gate/chromedriver.exe")
-        self.driver = webdriver.Chrome(options=self.chrome_options)
-        self.xpath_iframe_complete = "/html/body/div[4]/div[1]/section/div[1]/div/div[2]/div[1]/div/div/div/div/div/div/force-aloha-page/div/iframe"
-        self.form_iframe_xpath = "/html/body/div[4]/div[1]/section/div[1]/div/div[2]/div[1]/div/div/div/div/div/div/force-aloha-page/div/iframe"
-        self.second_form_iframe_xpath = "/html/body/div[4]/div[1]/section/div[1]/div/div[2]/div[1]/div/div/div/div/div/div/force-aloha-page/div/iframe"
-        self.canvas_iframe_xpath = "/html/body/div/div[2]/div/div/form/div[5]/div[3]/canvas[1]"
-
+    def quit(self):
+        """
+        ## Closes the browser, if it was started.
+        """
+        if self._driver is None:
+            return
+        try:
+            self._driver.quit()
+        except Exception as e:
+            print(f"Error: Unable to quit the driver\n{e}")
+        finally:
+            self._driver = None
+            self.locators.reset()
+            self.active_site = None
+            self.current_page = None
+
+    @timed("go_to_url")
     def go_to_url(self, url):
         """
         ## Navigates to a specific URL using the Selenium WebDriver.
@@ -107,12 +345,15 @@ class FetcherBot:
         - The URL should be properly formatted and include the protocol (e.g., 'http://', 'https://').
         """
         try:
+            self.locators.reset()
             self.driver.get(url)
+            self.page_loads.append(page_load_stats(self.driver))
             return True
         except Exception as e:
             print(f"Error: Unable to go to url\n{e}")
             return False
 
+    @timed("login")
     def login(self, username: str, password: str) -> bool:
         """
         ## Logs in by entering username and password
@@ -135,13 +376,57 @@ class FetcherBot:
 
             login_button = self.driver.find_element(By.NAME, 'Login')
             login_button.click()
-            time.sleep(5)
-            print(f"5 Seconds has passed after loggin")
+            self.waits.login_complete()
+            self.page_loads.append(page_load_stats(self.driver))
+            print("Login page left")
             return True
         except Exception as e:
             print(f"Error during login process:\n{e}")
             return False
 
+    def is_login_page(self):
+        """
+        ## Checks whether the Salesforce login form is displayed.
+
+        - return: True if the username field of the login form is on the page, False otherwise.
+        """
+        try:
+            return bool(self.driver.find_elements(By.NAME, 'username'))
+        except Exception as e:
+            print(f"Error: Unable to check for the login form\n{e}")
+            return False
+
+    def start_session(self, url, username, password, session_store=None):
+        """
+        ## Opens the given URL with an authenticated session.
+        #### Reuses the session saved in `session_store` when there is one, so the page is loaded only once. When the store is empty, the saved session has expired or Salesforce still shows the login form, it falls back to a full `login` and saves the new session.
+
+        - param url: String representing the URL to open.
+        - param username: String representing the username used for a full login.
+        - param password: String representing the password used for a full login.
+        - param session_store: Optional `SessionStore`.
+
+        - return: True if the page is open with an authenticated session, False otherwise.
+        """
+        self.session_url = url
+        self._login_details = (username, password, session_store)
+        if session_store is not None and session_store.restore(self.driver):
+            if self.go_to_url(url) and not self.is_login_page():
+                print("Logged in with the saved session")
+                return True
+            print("Info: Saved session has expired, logging in again")
+            session_store.clear()
+            if not self.is_login_page() and not self.go_to_url(url):
+                return False
+        elif not self.go_to_url(url):
+            return False
+
+        if not self.login(username=username, password=password):
+            return False
+        if session_store is not None:
+            session_store.save(self.driver)
+        return True
+
     def get_login_confirmation(self):
         """
         ## Waits for user confirmation regarding login completion.
@@ -151,9 +436,11 @@ class FetcherBot:
 
         #### Note:
         - This method is designed to be used in situations where a human needs to intervene, such as navigating through CAPTCHA or other login barriers that may require human interaction.
-        - It assumes that the tkinter and messagebox modules are imported properly.
+        - tkinter is only imported here, so the bot runs on hosts without a display as long as this method is not called.
         - Ensure that the application calling this method has the proper permissions to create GUI components if running in a restricted environment.
         """
+        import tkinter
+        from tkinter import messagebox
 
         root = tkinter.Tk()
         root.withdraw()
@@ -176,13 +463,12 @@ class FetcherBot:
         """
         try:
             timeout = 20  # Set the timeout to 20 seconds
-            xpath = '//button[@type="button" and @ng-click="params.count(100)"]'
-            full_xpath = "/html/body/div/div[2]/div/div[5]/div[2]/div/div[2]/div/ul/li[12]/div/button[4]"
-            button = WebDriverWait(self.driver, timeout).until(
-                EC.element_to_be_clickable(
-                    (By.XPATH, full_xpath))
-            )
+            # The pager is re-rendered with the table, so the button is not cached
+            button = self.locators.find("page_size_100", timeout, cache=False)
+            WebDriverWait(self.driver, timeout).until(EC.element_to_be_clickable(button))
             button.click()
+            self.waits.angular_idle()
+            self.table_page_size = 100
             return True
         except TimeoutException:
             print("Error @ 'click_100_views_button': Timed out waiting for the button to be clickable")
@@ -200,23 +486,20 @@ class FetcherBot:
 
         #### Note:
         - Ensure that the WebDriver is correctly initialized and configured before calling this method.
-        - This method assumes that the web page is loaded and the "next page" button is present on the page.
-        - It will wait for a maximum of 10 seconds for the "next page" button to become present.
-        - If a TimeoutException occurs, it is assumed that the last page has been reached.
+        - The pager is read first (see `TableNavigator.next_page`): on the last page there is no "next" button and
+          the method returns False without waiting for it.
+        - After the click it waits until the table shows the rows of the new page.
         """
         try:
-            next_button = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, '//li[contains(@class, "next")]/a')))
-            next_button.click()
+            if not self.navigator.next_page():
+                print("Info: No next page button found. It seems we've reached the end of the pages.")
+                return False
             return True
-        except TimeoutException as e:
-            print(
-                f"Info: No next page button found. It seems we've reached the end of the pages.\n{e}")
-            return False
         except Exception as e:
             print(f"Error: Next page button not found\n{e}")
             return False
 
+    @timed("select_site")
     def select_site(self, site_name):
         """
         ## Selects a specific site from a dropdown menu on a webpage.
@@ -227,33 +510,22 @@ class FetcherBot:
         - return: True if the site is successfully selected, False if an exception occurs during the process.
 
         #### Note:
-        - `self.xpath_iframe_complete` should be defined as an instance variable of the class, containing the XPATH
-        for the iframe to be selected.
+        - The iframe and the dropdown are resolved through `self.locators`.
         - This method assumes that the relevant web page has been loaded, and the iframe and dropdown are present
         on the page.
         """
         # /html/body/div/div[2]/div/div[4]/div[2]/div/div[3]/select
         try:
             # Switch to iframe
-            WebDriverWait(self.driver, 120).until(
-                EC.presence_of_element_located((By.XPATH, self.xpath_iframe_complete)))
-            iframe = self.driver.find_element(
-                By.XPATH, self.xpath_iframe_complete)
-            self.driver.switch_to.frame(iframe)
+            self.locators.enter_frame("lightning_iframe", timeout=120)
         except Exception as e:
             print("Exception @ select_site @ Switch to iframe")
             print(e)
 
         try:
             # get the select element
-            select_xpath = "/html/body/div/div[2]/div/div[4]/div[2]/div/div[3]/select"
-            select_xpath = "/html/body/div/div[2]/div/div[4]/div[2]/div/div[3]/select"
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "select.ng-pristine.ng-valid.ng-touched")))
-
-            dropdown = Select(self.driver.find_element(
-                By.CSS_SELECTOR, "select.ng-pristine.ng-valid.ng-touched"))
-            dropdown.select_by_visible_text(site_name)
+            self.locators.perform(
+                "site_select", lambda select: Select(select).select_by_visible_text(site_name), timeout=10)
 
             # Handle geolocation alert if it occurs
             # try:
@@ -264,28 +536,40 @@ class FetcherBot:
             # except NoAlertPresentException:
             #     pass
 
-            time.sleep(2)
+            self.waits.angular_idle()
         except Exception as e:
             print("Exception @ select_site when trying to get the select element")
             print(e)
+            self._record_error("select_site", e)
             return False
 
+        if site_name != self.site_index_site:
+            self.invalidate_site_index()
+        self.active_site = site_name
+        self.current_page = 1
+        # Largest page size, set once per site: fewer pages to move through and to index
+        try:
+            self.navigator.ensure_page_size()
+        except Exception as e:
+            print(f"Warning: Unable to set the page size of site {site_name}\n{e}")
         print(f"Site {site_name} selected successfully!")
         return True
 
 
     def fetch_site_data(self, site_name):
-        to_report = {
-            "site": site_name,
-            "function_name": "fetch_site_data",
-            "status": "",
-        }
+        """
+        ## Fetches every row of the site table, page by page.
+        #### Each row is a dictionary of the row cells keyed by their `data-title-text`, plus the derived `Number` and `Street Name` keys and the `Page` and `Row` position of the row in the table.
+
+        - param site_name: String representing the site currently selected (used for reporting).
+
+        - return: List of row dictionaries. Raises `TableReadIncomplete`, with the rows of the pages read, when the
+          table could not be read to its last page.
+        """
         table_data = []
-        self.click_100_views_button()
-        while True:
-            try:
-                page_data = self.get_table_data()
-                for row in page_data:
+        try:
+            for page_number, page_data in self.iter_table_pages(site_name):
+                for row_position, row in enumerate(page_data):
                     address = row.get('Address')
                     if address:
                         parts = address.split()
@@ -293,107 +577,420 @@ class FetcherBot:
                         street_name = ' '.join(parts[1:])
                         row['Number'] = number
                         row['Street Name'] = street_name
+                        row['Page'] = page_number
+                        row['Row'] = row_position
                         table_data.append(row)
-            except Exception as e:
-                message = f'\nNot able to fetch data from site: {site_name}\n{e}'
-                to_report["status"] = message
+        except TableReadIncomplete as e:
+            e.rows = table_data
+            raise
+        return table_data
+
+    def iter_table_pages(self, site_name):
+        """
+        ## Reads the site table page by page, as a generator.
+        #### The caller handles (or writes) a page before the next one is read, so only one page is held in memory. The page count is read before the first page, so the last page is never left waiting for a "next" button.
+
+        - param site_name: String representing the site currently selected (used for reporting).
 
-                self.fetch_report.append(to_report)
+        - return: Iterator of `(page_number, rows)` tuples, `rows` being the `get_table_data` dictionaries of the page.
+
+        #### Note:
+        - An error before the last page is printed, recorded in `self.fetch_report` and raised as
+          `TableReadIncomplete`, so a caller never takes a partial read for the whole table.
+        """
+        to_report = {
+            "site": site_name,
+            "function_name": "fetch_site_data",
+            "status": "",
+        }
+        try:
+            self.navigator.ensure_page_size()
+            if not self.navigator.go_to_page(1):
+                raise RuntimeError("The first page of the table is not displayed")
+            page_count = self.navigator.page_count()
+        except Exception as e:
+            message = f'\nNot able to fetch data from site: {site_name}\n{e}'
+            self.fetch_report.append(dict(to_report, status=message))
+            print(message)
+            raise TableReadIncomplete(message) from e
+        for page_number in range(1, page_count + 1):
+            try:
+                page_data = self.get_table_data()
+            except Exception as e:
+                message = f'\nNot able to fetch data from site: {site_name}, page {page_number} of {page_count}\n{e}'
+                self.fetch_report.append(dict(to_report, status=message))
                 print(message)
-                break
+                raise TableReadIncomplete(message, page_number - 1, page_count) from e
+            self.current_page = page_number
+            yield page_number, page_data
+            if page_number < page_count and not self.click_next_page_button():
+                message = f'\nNot able to fetch data from site: {site_name}, stopped on page {page_number} of {page_count}\n'
+                self.fetch_report.append(dict(to_report, status=message))
+                print(message)
+                raise TableReadIncomplete(message, page_number, page_count)
+        message = f'\nFetched data from site: {site_name} successfully\n'
+        self.fetch_report.append(dict(to_report, status=message))
+
+    def list_sites(self):
+        """
+        ## Lists the sites of the `site_select` dropdown.
+
+        - return: List of the option texts (the empty option left out), empty if the dropdown cannot be read.
+        """
+        try:
+            self.locators.enter_frame("lightning_iframe", timeout=120)
+            select = self.locators.find("site_select", timeout=10)
+            return [text for text in self.driver.execute_script(SITE_OPTIONS_SCRIPT, select) if text]
+        except Exception as e:
+            print(f"Error: Unable to list the sites\n{e}")
+            return []
+
+    def get_table_rows(self):
+        """
+        ## Reads every data row of the table page currently displayed in a single `execute_script` call.
+
+        - return: List of dictionaries with the keys `cells` (the cell texts keyed by their `data-title-text`) and `go_to` (handle for `click_go_to_button`, None if the row has no "Go To" button), in display order.
+        """
+        payload = self.driver.execute_script(TABLE_DATA_SCRIPT)
+        return [{"cells": row["cells"], "go_to": row["goTo"]} for row in json.loads(payload)]
+
+    def get_table_data(self):
+        """
+        ## Reads the rows of the table page currently displayed.
+
+        - return: List of dictionaries, one per data row, mapping each cell's `data-title-text` to its text.
+        """
+        return [row["cells"] for row in self.get_table_rows()]
+
+    def click_go_to_button(self, handle):
+        """
+        ## Clicks the "Go To" button of a row returned by `get_table_rows`.
+
+        - param handle: The row's `go_to` handle.
+
+        - return: True if the button was clicked, False otherwise.
+        """
+        if handle is None:
+            return False
+        self.driver.find_element(By.CSS_SELECTOR, f'button[data-fetcher-row="{handle}"]').click()
+        # The iframe navigates to the form, its cached handles are gone
+        self.locators.invalidate(self.locators.frame_context)
+        self.current_page = None
+        return True
+
+    @staticmethod
+    def normalize_address_key(street_number, street_name):
+        """
+        ## Builds the key used by `self.site_index` for an address.
+
+        - param street_number: Street number (str or int).
+        - param street_name: Street name.
+
+        - return: Canonical "NUMBER STREET SUFFIX DIRECTION" string (see `address_matcher.normalize_address`), so
+          "York Hill Boulevard" and "YORK HILL BL" give the same key.
+        """
+        return normalize_address(street_number, street_name)
+
+    @timed("build_site_index")
+    def build_site_index(self, site_name):
+        """
+        ## Builds an in-memory index of the site table from a single `fetch_site_data` pass.
+        #### Every row is stored under its normalized address (see `normalize_address_key`) with its page number, row position and row state, so that `find_matching_address_from_table` can jump straight to the right page and row.
+
+        - param site_name: String representing the site currently selected.
+
+        - return: True if the index was built, False if no rows could be read.
+
+        #### Note:
+        - In direct data mode (see `enable_direct_data`) the rows are read from the table's JSON endpoint instead of
+          the DOM; the browser table is only switched to 100 rows per page so the page numbers match.
+        - When the table cannot be read to its last page, the rows read are indexed as a partial index
+          (`AddressIndex.complete` False): the addresses it does not hold are searched in the table.
+        """
+        table_data = None
+        complete = True
+        if self.direct_client is not None:
             try:
-                next_buttons = self.driver.find_element(
-                    By.XPATH, '//li[contains(@class, "next")]/a')
-                next_buttons.click()
-                time.sleep(2)
+                self.navigator.ensure_page_size()
+                table_data = self.direct_client.fetch_site_data(site_name, self.table_page_size or 10)
+                self.fetch_report.append({"site": site_name, "function_name": "build_site_index",
+                                          "status": f"Fetched {len(table_data)} rows from the table endpoint"})
             except Exception as e:
-                print(
-                    f"Info: No next page button found. It seems we've reached the end of the pages.\n{e}")
-                break
-            message = f'\nFetched data from site: {site_name} successfully\n'
-            to_report["status"] = message
-            self.fetch_report.append(to_report)
+                print(f"Error: Unable to read site {site_name} from the table endpoint, reading the table instead\n{e}")
+        if table_data is None:
+            try:
+                table_data = self.fetch_site_data(site_name)
+            except TableReadIncomplete as e:
+                # The rows of the pages read are indexed, the addresses missing from them are searched in the table
+                table_data = e.rows
+                complete = False
+        if not table_data:
+            print(f"Error: Unable to build the table index for site {site_name}")
+            return False
 
-        return table_data
+        site_index = {}
+        for row in table_data:
+            key = self.normalize_address_key(row['Number'], row['Street Name'])
+            # Keep the first occurrence, which is the one a page by page scan would find.
+            site_index.setdefault(key, {
+                "page": row['Page'],
+                "row": row['Row'],
+                "state": row,
+            })
+
+        self.site_index = site_index
+        self.address_index = AddressIndex(site_index.items(), complete=complete)
+        self.site_index_site = site_name
+        self.site_index_built_at = time.monotonic()
+        partial = "" if complete else " (partial table read)"
+        print(f"Indexed {len(site_index)} addresses for site {site_name}{partial}")
+        return True
 
+    def enable_direct_data(self, endpoint_url, **options):
+        """
+        ## Switches `build_site_index` to direct data mode.
+        #### The site table is read in bulk from `endpoint_url` (the endpoint the table page loads its rows from) with the session cookies of `self.driver`, over a pooled HTTP connection. The browser is only used for the "Go To" and form steps.
+
+        - param endpoint_url: URL of the table endpoint.
+        - param options: Extra `DirectTableClient` options (`page_size`, `pool_size`, `timeout`, `columns`).
 
-    def update_site(self, data):
+        - return: True if the client was created, False otherwise.
         """
-        ... (method docstring) ...
+        try:
+            self.direct_client = DirectTableClient.from_driver(self.driver, endpoint_url, **options)
+            return True
+        except Exception as e:
+            print(f"Error: Unable to enable direct data mode\n{e}")
+            return False
+
+    def is_site_index_valid(self, site_name=None):
+        """
+        ## Checks whether `self.site_index` can be used for the given site.
+
+        - param site_name: Site to check; defaults to the active site.
+
+        - return: True if the index belongs to the site and is younger than `self.index_ttl` seconds.
+        """
+        site_name = site_name or self.active_site
+        if self.site_index_built_at is None or site_name != self.site_index_site:
+            return False
+        return time.monotonic() - self.site_index_built_at < self.index_ttl
+
+    def invalidate_site_index(self):
+        """
+        ## Discards the site table index.
+        """
+        self.site_index = {}
+        self.address_index = AddressIndex()
+        self.site_index_site = None
+        self.site_index_built_at = None
+
+    def go_to_table_page(self, page_number):
+        """
+        ## Displays the given page of the site table.
+        #### Jumps straight to the page (see `TableNavigator.go_to_page`) instead of clicking "next" from the current page.
+
+        - param page_number: 1-based page number.
+
+        - return: True if the page is displayed, False otherwise.
         """
         try:
-            # Check and set default phone number
-            phone_data = data.get("phone")
-            if not phone_data or phone_data == "None" or phone_data == " ":
-                phone_data = "0000000000"
-
-            # Clear and fill fields
-            fields = {
-                "name": "/html/body/div/div[2]/div/div/form/div[3]/div[3]/input[1]",
-                "lastName": "/html/body/div/div[2]/div/div/form/div[3]/div[3]/input[2]",
-                "email": "/html/body/div/div[2]/div/div/form/div[6]/div[3]/input",
-                "phone": "/html/body/div/div[2]/div/div/form/div[5]/div[3]/input"
-            }
+            return self.navigator.go_to_page(page_number)
+        except Exception as e:
+            print(f"Error: Unable to go to table page {page_number}\n{e}")
+            self.current_page = None
+            return False
 
-            for field_name, xpath in fields.items():
-                field = self.driver.find_element(By.XPATH, xpath)
-                field.clear()
-                field.send_keys(data.get(field_name, ""))
-
-            # Select Language
-            language_select = self.driver.find_element(By.NAME, "language")
-            language_options = language_select.find_elements(By.TAG_NAME, "option")
-            for option in language_options:
-                if option.text.strip() == "English":
-                    option.click()
-                    break
-
-            # Select Feed
-            feed_options = self.driver.find_elements(By.NAME, "feed")
-            for option in feed_options:
-                if option.get_attribute("value") == "Aerial":
-                    option.click()
-                    break
-
-            # Select Installation Type
-            installation_type_select = self.driver.find_element(By.NAME, "installationType")
-            installation_type_options = installation_type_select.find_elements(By.TAG_NAME, "option")
-            for option in installation_type_options:
-                if option.text.strip() == data.get("type", ""):
-                    option.click()
-                    break
-
-            # Select Status and Consent
-            status_select = self.driver.find_element(By.XPATH, "/html/body/div/div[2]/div/div/form/div[13]/div[3]/select")
-            status_options = status_select.find_elements(By.TAG_NAME, "option")
-            for option in status_options:
-                status_attempt = data.get('statusAttempt', "")
-                if option.text.strip() == status_attempt and status_attempt != "Consent Final":
-                    option.click()
-                    break
-                elif option.text.strip() == status_attempt and status_attempt == "Consent Final":
-                    option.click()
-
-                    consent_select = self.driver.find_element(By.NAME, "Consent")
-                    consent_options = consent_select.find_elements(By.TAG_NAME, "option")
-                    for consent_option in consent_options:
-                        if consent_option.text.strip() == data.get("consent", ""):
-                            consent_option.click()
-                            break
-                    break
-
-            # Submit the form
-            time.sleep(2)
-            submit_button = WebDriverWait(self.driver, 120).until(
-                EC.element_to_be_clickable((By.XPATH, "/html/body/div/div[2]/div/div/div[3]/div[2]/button[5]")))
+    def _click_and_wait_for_new_rows(self, element):
+        """
+        ## Clicks a paging element and waits until the table shows the new rows instead of the previous page's.
+
+        - param element: The paging element to click.
+        """
+        previous_signature = self.waits.table_signature()
+        element.click()
+        try:
+            self.waits.table_rows_changed(previous_signature)
+        except TimeoutException as e:
+            print(f"Warning: {e}")
+
+    def _find_address_with_index(self, data):
+        """
+        ## Uses `self.address_index` to open the row of an address.
+
+        - param data: Dictionary containing 'streetNumber' and 'streetName' keys.
+
+        - return: True if the row was opened, False if the address is not in the table or matches several rows,
+          None if the indexed position could not be used or the address is not in a partial index (the caller should
+          scan the table).
+        """
+        self.last_match = match = self.address_index.match(data['streetNumber'], data['streetName'])
+        if match.status == "no_match" and not self.address_index.complete:
+            print(f"Info: Address {data['streetNumber']} {data['streetName']} is not in the partial index of site "
+                  f"{self.site_index_site}, searching the table")
+            return None
+        if match.status == "no_match":
+            print(f"Address {data['streetNumber']} {data['streetName']} not found in the index of site "
+                  f"{self.site_index_site}")
+            return False
+        if match.status == "ambiguous":
+            candidates = ", ".join(f"{key} ({score:.2f})" for score, key, _ in match.candidates)
+            print(f"Address {data['streetNumber']} {data['streetName']} is ambiguous in the index of site "
+                  f"{self.site_index_site}: {candidates}")
+            return False
+        entry = match.entry
+        address_to_update = match.candidates[0][1]
+
+        if not self.go_to_table_page(entry["page"]):
+            return None
+        rows = self.get_table_rows()
+        if entry["row"] >= len(rows):
+            return None
+        row = rows[entry["row"]]
+        if not addresses_match(row["cells"].get("Address", ""), address_to_update):
+            return None
+
+        if not self.click_go_to_button(row["go_to"]):
+            return None
+        # The table is left for the form, its page is unknown when we come back
+        print(f'Found matching address:\n{entry["state"]}')
+        return True
+
+    def _find_address_with_filter(self, data):
+        """
+        ## Types the civic number of an address in the table's filter box and opens the matching row among the rows
+        the server returns.
+
+        - param data: Dictionary containing 'streetNumber' and 'streetName' keys.
+
+        - return: True if the row was opened, None if the table has no filter box of the Address column or the
+          filtered rows do not contain the address (the caller should scan the table, the filter is cleared by
+          `TableNavigator.go_to_page`).
+        """
+        address_to_update = self.normalize_address_key(data['streetNumber'], data['streetName'])
+        if not self.navigator.apply_filter(self.navigator.filter_text(data['streetNumber'], data['streetName'])):
+            return None
+        while True:
+            for row in self.get_table_rows():
+                if addresses_match(row["cells"].get("Address", ""), address_to_update):
+                    self.click_go_to_button(row["go_to"])
+                    print(f'Found matching address:\n{row["cells"]}')
+                    return True
+            if not self.navigator.next_page():
+                print(f"Info: Address {address_to_update} not found in the filtered table, scanning the table")
+                return None
+
+
+    @timed("update_site")
+    def update_site(self, data, bulk=True):
+        """
+        ## Fills form 1 with the row data and submits it.
+        #### By default every field is set by a single injected script (see `fill_form_1_bulk`). When the script cannot verify the result, the fields are filled again one by one through WebDriver (see `fill_form_1_per_field`).
+
+        - param data: Dictionary produced by `process_csv_to_dict`.
+        - param bulk: Set to False to always use the per-field path.
+
+        - return: True if the form was submitted, False if an exception occurs during the process.
+        """
+        try:
+            self.waits.form_loaded()
+
+            fields = self._form_1_fields(data)
+            if not bulk or not self.fill_form_1_bulk(fields):
+                self.fill_form_1_per_field(fields)
+
+            # Submit the form once Angular has applied the changes
+            self.waits.angular_idle()
+            submit_button = self.locators.find("form_submit", timeout=120)
+            WebDriverWait(self.driver, 120).until(EC.element_to_be_clickable(submit_button))
+            requests_before = self.waits.request_mark()
             submit_button.click()
+            self.locators.invalidate(self.locators.frame_context)
+            try:
+                self.waits.submit_acknowledged(submit_button, requests_before)
+            except TimeoutException as e:
+                print(f"Warning: {e}")
 
             return True
 
         except Exception as e:
             print("Error:", e)
+            self._record_error("update_site", e)
+            return False
+
+    @staticmethod
+    def _form_1_fields(data):
+        """
+        ## Lists the form 1 fields to fill for a row, in the order they have to be set.
+
+        - return: List of `(key, locator name, kind, value)` tuples; kind is "text", "select" or "radio".
+        """
+        # Check and set default phone number
+        phone_data = data.get("phone")
+        if not phone_data or phone_data == "None" or phone_data == " ":
+            phone_data = "0000000000"
+
+        status_attempt = data.get('statusAttempt', "")
+        fields = [
+            ("name", "form_name", "text", data.get("name", "")),
+            ("lastName", "form_last_name", "text", data.get("lastName", "")),
+            ("email", "form_email", "text", data.get("email", "")),
+            ("phone", "form_phone", "text", phone_data),
+            ("language", "form_language", "select", "English"),
+            ("feed", "form_feed", "radio", "Aerial"),
+            ("installationType", "form_installation_type", "select", data.get("type", "")),
+            ("statusAttempt", "form_status", "select", status_attempt),
+        ]
+        if status_attempt == "Consent Final":
+            fields.append(("consent", "form_consent", "select", data.get("consent", "")))
+        return fields
+
+    def fill_form_1_bulk(self, fields):
+        """
+        ## Sets every form 1 field in a single `execute_script` call and verifies the values the form ended up with.
+
+        - param fields: List built by `_form_1_fields`.
+
+        - return: True if every field holds its expected value, False otherwise.
+        """
+        payload = [
+            {"key": key, "kind": kind, "value": value, "locators": self.locators.script_locators(locator)}
+            for key, locator, kind, value in fields
+        ]
+        result = json.loads(self.driver.execute_script(FORM_FILL_SCRIPT, payload))
+        mismatches = {
+            key: result.get(key) for key, _, _, value in fields
+            if (result.get(key) or "").strip() != value.strip()
+        }
+        if mismatches:
+            print(f"Info: Bulk form fill not verified, falling back to per-field fill: {mismatches}")
             return False
+        return True
 
+    def fill_form_1_per_field(self, fields):
+        """
+        ## Fills form 1 field by field through WebDriver.
+
+        - param fields: List built by `_form_1_fields`.
+        """
+        for key, locator, kind, value in fields:
+            if kind == "text":
+                field = self.locators.find(locator)
+                field.clear()
+                field.send_keys(value)
+            elif kind == "radio":
+                for option in self.locators.find_all(locator):
+                    if option.get_attribute("value") == value:
+                        option.click()
+                        break
+            else:
+                # The Consent select is rendered once the status is chosen, never cached
+                cache = locator != "form_consent"
+                select = self.locators.find(locator, timeout=0 if cache else 5, cache=cache)
+                for option in select.find_elements(By.TAG_NAME, "option"):
+                    if option.text.strip() == value:
+                        option.click()
+                        break
 
     def find_matching_addresses_from_table(self, data):
         """
@@ -416,32 +1013,21 @@ class FetcherBot:
 
             while True:  # Keep looping until address is found or no more pages
                 try:
-                    # Wait for page to load
-                    time.sleep(1)
+                    # Wait for the page rows to settle
+                    self.waits.angular_idle()
 
-                    # Get all table rows
-                    rows = self.driver.find_elements(By.TAG_NAME, 'tr')
+                    # Get all table rows in one round-trip
+                    rows = self.get_table_rows()
                     address_found = False
 
                     # Iterate through rows
                     for row in rows:
-                        row_dict = {}
-
-                        # Get all cells within the row
-                        cells = row.find_elements(By.TAG_NAME, 'td')
-
-                        # Build dictionary from cell data
-                        for cell in cells:
-                            key = cell.get_attribute('data-title-text')
-                            value = cell.text
-                            row_dict[key] = value
+                        row_dict = row["cells"]
 
                         # Check if address matches
-                        if address_to_update in row_dict.get("Address", ""):
+                        if addresses_match(row_dict.get("Address", ""), address_to_update):
                             # Click the "Go To" button if address matches
-                            go_to_button = row.find_element(
-                                By.XPATH, "td//button[contains(text(), 'Go To')]")
-                            go_to_button.click()
+                            self.click_go_to_button(row["go_to"])
                             print(f'Found matching address:\n{row_dict}')
                             address_found = True
                             break  # Exit the for loop
@@ -462,13 +1048,14 @@ class FetcherBot:
         # Return True if function executed without exception
         return True
 
+    @timed("find_matching_address_from_table")
     def find_matching_address_from_table(self, data, max_attempts=100):
         """
         ## Search for a single address
         ### Click the "Go To" button next to the matching address.
 
         - data: Dictionary containing 'streetNumber' and 'streetName' keys
-        - max_attempts: Maximum number of pages to search through (default is 10)
+        - max_attempts: Maximum number of pages to search through (default is 100)
         - return: True if the address is found and method executes without exception, False otherwise
         """
 
@@ -476,63 +1063,88 @@ class FetcherBot:
         address = str(data['streetNumber']) + ' ' + data['streetName']
         address_to_update = address.upper()
 
-        # Click to change view or any initial action required
-        # self.click_100_views_button()
+        # The largest page size is set by `select_site`
         print(f'Address to be updated: {address_to_update}')
 
-        # Loop through pages.  '_' is a throwaway variable used to count the number of iterations
-        for _ in range(max_attempts):
+        # Jump straight to the indexed page and row when the site index is available
+        if self.is_site_index_valid():
             try:
-                # Wait for the table rows to be present
-                wait = WebDriverWait(self.driver, 10)
-                rows = wait.until(
-                    EC.presence_of_all_elements_located((By.TAG_NAME, 'tr')))
-                address_found = False
-
-                # Iterate through rows
-                for row in rows:
-                    print(f"Current Function: find_matching_address_from_table\nCurrent row:{row}")
-                    row_dict = {}
-
-                    # Get all cells within the row
-                    cells = row.find_elements(By.TAG_NAME, 'td')
-
-                    # Build dictionary from cell data
-                    for cell in cells:
-                        key = cell.get_attribute('data-title-text')
-                        value = cell.text
-                        row_dict[key] = value
-
-                    # Check if address matches
-                    if address_to_update in row_dict.get("Address", ""):
-                        # Click the "Go To" button if address matches
-                        go_to_button = row.find_element(
-                            By.XPATH, "td//button[contains(text(), 'Go To')]")
-                        go_to_button.click()
-                        print(f'Found matching address:\n{row_dict}')
-                        address_found = True
-                        break  # Exit the for loop
-
-                if address_found:
-                    print("Function: find_matching_address_from_table\nAddress found in table")
-                    return True  # Return True if the address was found
-
-                # If address not found on this page, click next and continue loop
-                if not self.click_next_page_button():
-                    print(
-                        f"Address {address_to_update} not found after {max_attempts} attempts")
-                    # return False  # Return False if address not found
-
+                found = self._find_address_with_index(data)
+                if found is not None:
+                    return found
+                if self.last_match.status != "no_match":
+                    print("Info: Indexed position is out of date, searching the table")
+                    self.invalidate_site_index()
             except Exception as e:
-                # Print exception and return False
                 print("Error:", e)
+                self._record_error("find_matching_address_from_table", e)
+                self.invalidate_site_index()
+
+        # Let the server return only the rows of the civic number when the table has a filter box
+        try:
+            found = self._find_address_with_filter(data)
+            if found is not None:
+                return found
+            # Scan from the first page; the page count bounds the scan
+            if not self.navigator.go_to_page(1):
                 return False
+            page_count = self.navigator.page_count()
+        except Exception as e:
+            print("Error:", e)
+            self._record_error("find_matching_address_from_table", e)
+            return False
+
+        # Loop through pages.  '_' is a throwaway variable used to count the number of iterations
+        for _ in range(min(max_attempts, page_count)):
+            with self.metrics.span("find_matching_address_from_table.page"):
+                found = self._search_table_page(address_to_update)
+            if found is not None:
+                return found
 
         # If the function has not returned by now, the address was not found in the given max_attempts
         print(
             f"Address {address_to_update} not found after {max_attempts} attempts")
         return False
 
+    def _search_table_page(self, address_to_update):
+        """
+        ## Searches the table page currently displayed for an address and moves to the next page when it is not there.
+
+        - return: True if the address was found and opened, False on error, None to continue with the next page.
+        """
+        try:
+            # Wait for the table rows to be present
+            wait = WebDriverWait(self.driver, 10)
+            wait.until(
+                EC.presence_of_all_elements_located((By.TAG_NAME, 'tr')))
+            self.waits.angular_idle()
+            # Read all table rows in one round-trip
+            rows = self.get_table_rows()
+
+            # Iterate through rows
+            for row in rows:
+                row_dict = row["cells"]
+
+                # Check if address matches
+                if addresses_match(row_dict.get("Address", ""), address_to_update):
+                    # Click the "Go To" button if address matches
+                    self.click_go_to_button(row["go_to"])
+                    print(f'Found matching address:\n{row_dict}')
+                    print("Function: find_matching_address_from_table\nAddress found in table")
+                    return True  # Return True if the address was found
+
+            # If address not found on this page, click next and continue loop
+            if not self.click_next_page_button():
+                print(f"Address {address_to_update} not found, last page reached")
+                return False
+            return None
+
+        except Exception as e:
+            # Print exception and return False
+            print("Error:", e)
+            self._record_error("find_matching_address_from_table", e)
+            return False
+
     def process_csv_to_dict(self, file_path: str) -> list:
         """
         ## Read CSV file and processes its content into list of dictionaries.
@@ -555,26 +1167,15 @@ class FetcherBot:
         - type: The type or category
         - consent: The consent status
         - location: The location (if applicable)
+        - id, lastUpdated: The record id and last update timestamp (optional)
+
+        #### Note:
+        - Missing required columns raise a ValueError, and duplicate addresses are collapsed into the row with the latest
+          `lastUpdated` (see `csv_stream.iter_csv_rows`, which streams the same records without loading the whole file).
         """
-        dataList = []
-        with open(file_path, newline='', encoding='utf-8-sig') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                data = {
-                    'streetNumber': row['streetNumber'],
-                    'streetName': row['street'],
-                    'name': row['name'],
-                    'lastName': row['lastName'],
-                    'phone': row['phone'],
-                    'email': row['email'],
-                    'type': row['type'],
-                    'statusAttempt': row['statusAttempt'],
-                    'consent': row['consent'],
-                    'location': row['location'],
-                }
-                dataList.append(data)
-        return dataList
+        return list(iter_csv_rows(file_path))
 
+    @timed("switch_to_forms_iframe")
     def switch_to_forms_iframe(self):
         """
         ## Switch to the iframe containing the form.
@@ -582,38 +1183,33 @@ class FetcherBot:
         - return: True if the iframe is successfully selected, False if an exception occurs during the process.
 
         #### Note:
-        - `self.form_iframe_xpath` should be defined as an instance variable of the class, containing the XPATH
-        for the iframe to be selected.
+        - The iframe handle is cached by `self.locators`; nothing is sent to the browser when the bot is already in it.
         - This method assumes that the relevant web page has been loaded, and the iframe is present
         on the page.
         """
         try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, self.form_iframe_xpath)))
-            iframe = driver.find_element(By.XPATH, self.form_iframe_xpath)
-            # switch to selected iframe
-            self.driver.switch_to.frame(iframe)
+            self.locators.enter_frame("lightning_iframe", timeout=10)
             return True
         except Exception as e:
             print(e)
+            self._record_error("switch_to_forms_iframe", e)
             return False
 
+    @timed("check_if_form_2_required")
     def check_if_form_2_required(self):
         """
         ## Check if form 2 is required.
+        #### Non-throwing probe for the signature canvas (see `LocatorRegistry.exists`), so the rows without form 2 do not pay for a failed `find_element`.
 
-        - return: True if the form 2 is required, False if an exception occurs during the process.
+        - return: True if the form 2 is required, False otherwise.
 
         """
-        try:
-            canvas_button = self.driver.find_element(
-                By.XPATH, self.canvas_iframe_xpath)
+        if self.locators.exists("signature_canvas"):
             return True
-        except Exception as e:
-            print(e)
-            print("\nForm 2 is not required")
-            return False
+        print("Form 2 is not required")
+        return False
 
+    @timed("switch_to_second_form_iframe")
     def switch_to_second_form_iframe(self):
         """
         ## Switch to the iframe containing the form.
@@ -622,36 +1218,246 @@ class FetcherBot:
 
         """
         try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, self.second_form_iframe_xpath)))
-            iframe = self.driver.find_element(
-                By.XPATH, self.second_form_iframe_xpath)
-            # switch to selected iframe
-            self.driver.switch_to.frame(iframe)
+            # Form 2 is displayed in the same iframe as form 1
+            self.locators.enter_frame("lightning_iframe", timeout=10)
             return True
         except Exception as e:
             print(e)
+            self._record_error("switch_to_second_form_iframe", e)
             return False
 
+    @timed("draw_signature")
     def draw_signature(self):
         """
         ## Draw signature on the canvas. save the signature and close the form.
+        #### The precomputed stroke is replayed as pointer events in a single script (see `signature.replay_signature`), and the form is only saved once the canvas shows it.
+        When the widget ignores the synthetic events or the canvas cannot be read, the stroke is drawn again with real pointer input (see `signature.stroke_signature`).
 
-        - return: True if the signature is successfully drawn, False if an exception occurs during the process.
+        - return: True if the signature is successfully drawn, False if the canvas stayed blank or an exception occurs
+          during the process.
         """
         try:
-            canvas = self.driver.find_element(
-                By.XPATH, self.canvas_iframe_xpath)
-            self.driver.execute_script(self.draw_script, canvas)
-            time.sleep(2)
-            save_button = self.driver.find_element(
-                By.XPATH, "/html/body/div/div[2]/div/div/form/div[7]/div[2]/button[3]")
-            save_button.click()
+            canvas = self.locators.find("signature_canvas")
+            result = replay_signature(self.driver, canvas)
+            if not result["drawn"]:
+                result = stroke_signature(self.driver, canvas)
+            if result["readable"] and not result["drawn"]:
+                raise RuntimeError("The signature canvas is still blank after the stroke replay")
+            if not result["readable"]:
+                print("Warning: The signature canvas cannot be read, saving the pointer stroke unconfirmed")
+            self.waits.angular_idle()
+            self.locators.perform("signature_save", lambda save_button: save_button.click())
+            self.locators.invalidate(self.locators.frame_context)
             return True
         except Exception as e:
             print(e)
+            self._record_error("draw_signature", e)
             return False
 
+    def _record_error(self, step, error):
+        self.last_error = {"step": step, "kind": classify_error(error), "message": str(error).strip().split("\n")[0]}
+
+    def is_session_lost(self):
+        """
+        ## Checks whether the browser or the Salesforce session is gone.
+        #### Looks for the login form in the current frame and in the top-level page, then returns to the frame the bot was in.
+
+        - return: True if the browser does not answer or Salesforce shows the login form.
+        """
+        if not self.has_driver:
+            return False
+        frame_context = self.locators.frame_context
+        try:
+            if self.driver.find_elements(By.NAME, 'username'):
+                return True
+            self.locators.leave_frame()
+            lost = bool(self.driver.find_elements(By.NAME, 'username'))
+            if not lost and frame_context != self.locators.frame_context:
+                self.locators.enter_frame(frame_context)
+            return lost
+        except WebDriverException as e:
+            return classify_error(e) == "session_lost"
+
+    def recover_session(self):
+        """
+        ## Logs in again after the session was lost and re-enters the Lightning iframe.
+        #### A browser that no longer answers is replaced first. The saved session is discarded since it is the one that expired.
+
+        - return: True if the session is back, False otherwise.
+        """
+        if self.session_url is None:
+            return False
+        username, password, session_store = self._login_details
+        try:
+            self.driver.current_url
+        except Exception:
+            print("Info: Browser is gone, starting a new one")
+            self.quit()
+        if session_store is not None:
+            session_store.clear()
+        self.active_site = None
+        self.current_page = None
+        if not self.start_session(self.session_url, username, password, session_store):
+            return False
+        print("Session recovered")
+        return self.switch_to_forms_iframe()
+
+    def reset_page(self):
+        """
+        ## Reloads the Lightning page after a failed row, so the next row starts from the site table.
+
+        - return: True if the page was reloaded, False otherwise.
+        """
+        self.active_site = None
+        self.current_page = None
+        if self.session_url is None:
+            return False
+        return self.go_to_url(self.session_url)
+
+    def restart_driver(self):
+        """
+        ## Replaces the browser with a new one, on the same session and the same site.
+        #### The session is saved (to the `SessionStore` of `start_session`, or to a temporary one) before the old browser is quit, so the new one only loads the page. The site index, counters and metrics of the bot are kept.
+
+        - return: True if the new browser is logged in and back on the site that was selected, False otherwise.
+        """
+        if self.session_url is None:
+            return False
+        username, password, session_store = self._login_details
+        site_name = self.active_site
+        store = session_store or SessionStore(
+            os.path.join(tempfile.gettempdir(), f"fetcher_bot_{os.getpid()}_{id(self)}.json"))
+        try:
+            if self.has_driver:
+                try:
+                    self.locators.leave_frame()
+                    store.save(self.driver)
+                except WebDriverException as e:
+                    # The new browser does a full login instead
+                    print(f"Warning: Unable to save the session before the restart\n{e}")
+            self.quit()
+            if not self.start_session(self.session_url, username, password, store):
+                return False
+        finally:
+            if session_store is None:
+                store.clear()
+                self._login_details = (username, password, None)
+        if site_name is None:
+            return True
+        return self.select_site(site_name)
+
+    def is_row_unchanged(self, data, address_index):
+        """
+        ## Compares a CSV row with its entry in a site's `AddressIndex` and counts the result in `self.sync_stats`.
+
+        - return: True if the table already shows the row's target state, False if it differs or is not an exact match.
+        """
+        entry = address_index.get(data['streetNumber'], data['streetName'])
+        if entry is None:
+            return False
+        if is_in_target_state(data, entry["state"]):
+            self.sync_stats["unchanged"] += 1
+            return True
+        self.sync_stats["changed"] += 1
+        return False
+
+    @classmethod
+    def row_outcome(cls, data):
+        """
+        ## Builds the outcome of a row before its update, with the "not_found" status (see `process_row`).
+        """
+        return {
+            "key": row_key(data),
+            "id": data.get("id", ""),
+            "address": cls.normalize_address_key(data['streetNumber'], data['streetName']),
+            "location": data.get("location", ""),
+            "status": "not_found",
+        }
+
+    @staticmethod
+    def report_not_found(outcome, match):
+        """
+        ## Completes the outcome of a row whose address was not opened: "ambiguous", with the scored `candidates`, when
+        `match` (the last `AddressIndex.match` result) is ambiguous.
+        """
+        if match is not None and match.status == "ambiguous":
+            outcome["status"] = "ambiguous"
+            outcome["candidates"] = [(key, round(score, 2)) for score, key, _ in match.candidates]
+        return outcome
+
+    @timed("process_row")
+    def process_row(self, data, journal=None, skip_unchanged=True):
+        """
+        ## Runs the whole update of one CSV row on the site currently selected.
+        #### Finds the address in the table, submits form 1 and, when required, signs form 2.
+        With a `CheckpointJournal`, every completed stage is recorded: finished rows are skipped and a partially
+        processed row resumes after its last completed stage.
+        With `skip_unchanged`, a row whose indexed table row already shows its status and consent is not submitted again
+        (see `change_detection.is_in_target_state`).
+
+        - param data: Dictionary produced by `process_csv_to_dict`.
+        - param journal: Optional `CheckpointJournal`.
+        - param skip_unchanged: Skip the rows already in their target state.
+
+        - return: Dictionary with the row `key` (see `row_key`), `id`, `address`, `location` and its `status`, one of "already_done",
+          "unchanged", "not_found", "ambiguous", "form_1_failed", "updated", "signed" or "signature_failed".
+          An "ambiguous" row also carries the scored `candidates` of the site index.
+        """
+        checkpoint = row_key(data)
+        outcome = self.row_outcome(data)
+        self.last_error = None
+        self.last_match = None
+        if journal is not None and journal.is_finished(checkpoint):
+            print(f"Row {checkpoint} already updated, skipping")
+            outcome["status"] = "already_done"
+            return outcome
+        if skip_unchanged and self.is_site_index_valid() and self.is_row_unchanged(data, self.address_index):
+            print(f"Row {checkpoint} already in its target state, skipping")
+            outcome["status"] = "unchanged"
+            return outcome
+
+        if not self.find_matching_address_from_table(data):
+            return self.report_not_found(outcome, self.last_match)
+        if journal is not None and not journal.stage_of(checkpoint):
+            journal.record(checkpoint, "lookup")
+
+        if not self.switch_to_forms_iframe():
+            outcome["status"] = "form_1_failed"
+            return outcome
+        if journal is not None and journal.has_completed(checkpoint, "form_1"):
+            print(f"Row {checkpoint}: form 1 already submitted, resuming at form 2")
+        else:
+            if not self.update_site(data):
+                print('Error: Site not updated, unable to submit form 1')
+                outcome["status"] = "form_1_failed"
+                return outcome
+            if journal is not None:
+                journal.record(checkpoint, "form_1")
+            self.switch_to_forms_iframe()
+
+        # check if form 2 is required
+        if not self.check_if_form_2_required():
+            if journal is not None and journal.has_completed(checkpoint, "form_2"):
+                # The row was left at form 2: it is finished only once signed
+                print(f'Error: Row {checkpoint} was left at form 2 but no signature canvas was found')
+                outcome["status"] = "signature_failed"
+                return outcome
+            print('Form 1 updated successfully')
+            outcome["status"] = "updated"
+            if journal is not None:
+                journal.record(checkpoint, "form_1", finished=True)
+            return outcome
+
+        self.switch_to_second_form_iframe()
+        if journal is not None:
+            journal.record(checkpoint, "form_2")
+        if not self.draw_signature():
+            outcome["status"] = "signature_failed"
+            return outcome
+        outcome["status"] = "signed"
+        if journal is not None:
+            journal.record(checkpoint, "signature", finished=True)
+        return outcome
 
 if __name__ == "__main__":
     bot = FetcherBot()
@@ -1,12 +1,28 @@
+from browser_profiles import summarize_page_loads
+from checkpoint_journal import CheckpointJournal, feed_journal_path, remove_journal
+from csv_stream import iter_batches, iter_csv_rows
+from driver_recycler import DriverRecycler, RecyclePolicy
 from fetcher_bot import FetcherBot
+from parallel_runner import ParallelRunner
+from scheduler import SiteScheduler
+from session_store import SessionStore
+from tab_bot import AsyncTabBot
+import argparse
+import asyncio
+import cProfile
+import itertools
+import pstats
 import os
 import time
 
 # print(f'Current directory{os.getcwd()}')
 
-brain = FetcherBot()
+# Seconds before the in-memory index of the site table is rebuilt
+site_index_ttl = 900
+
 bell_salesForce_url = "https://bellconsent.my.salesforce.com/?ec=302&startURL=%2Fvisualforce%2Fsession%3Furl%3Dhttps%253A%252F%252Fbellconsent.lightning.force.com%252Flightning%252Fn%252FBell"
 
+# Site used for CSV rows without a `location`
 site_to_be_updated = "TNHLON40_3104A"
 # site_data = [{}]
 
@@ -20,7 +36,37 @@ keyword = "rYeEsydWN!8808168eXkA9gV47A"
 
 csv_file_path = "./data-to-feed-SF.csv"
 
-site_data = brain.process_csv_to_dict(file_path=csv_file_path)
+# Authenticated session reused by later runs and parallel workers
+session_path = "./.session/salesforce_session.json"
+
+# Per-row progress journals, one per input feed: a restarted run of the same CSV resumes where it stopped, and the
+# journal is deleted once the run is done
+journal_dir = "./.checkpoints"
+
+# Number of browsers updating rows at the same time (1 runs everything in `brain`)
+parallel_workers = 1
+
+# Browser profile: "default", or "lean" to block images, fonts and beacons and return pages at DOMContentLoaded
+browser_profile = "default"
+
+# Number of tabs of the `brain` browser updating rows at the same time (1 uses the WebDriver window only)
+browser_tabs = 1
+
+# Step timings of the run (JSON and Prometheus text format)
+metrics_json_path = "./metrics.json"
+metrics_prometheus_path = "./metrics.prom"
+
+# Endpoint the site table loads its rows from; when set, the table is read over HTTP instead of through the DOM
+table_endpoint_url = None
+
+# Number of CSV rows handed to the update loop at a time
+batch_size = 50
+
+# The browser of `brain` is restarted between two rows after this many rows, above this resident memory (MB) or once
+# rows get this many times slower than at its start (None disables a limit)
+recycle_max_rows = 1000
+recycle_max_rss_mb = 2048
+recycle_max_drift = 1.5
 
 
 def main():
@@ -30,41 +76,65 @@ def main():
     - return: None
     """
 
-    brain.go_to_url(bell_salesForce_url)
-
-    is_logged_in = brain.login(username=user, password=keyword)
+    # Validate the CSV header before the browser does any work
+    site_data = iter_csv_rows(csv_file_path)
+    first_batch = next(iter_batches(site_data, 1), [])
+    journal_path = feed_journal_path(csv_file_path, journal_dir)
+
+    if parallel_workers > 1:
+        ParallelRunner(bell_salesForce_url, user, keyword, workers=parallel_workers,
+                       default_site=site_to_be_updated, index_ttl=site_index_ttl,
+                       session_path=session_path, journal_path=journal_path,
+                       profile=browser_profile).run(first_batch + list(site_data))
+        remove_journal(journal_path)
+        return
+
+    # Chrome starts with the first browser step, not when the bot is built
+    brain = FetcherBot(index_ttl=site_index_ttl, profile=browser_profile)
+    is_logged_in = brain.start_session(
+        bell_salesForce_url, user, keyword, session_store=SessionStore(session_path))
     # login_confirmed = brain.get_login_confirmation()
     if not is_logged_in:
         print("Error: Login confirmation failed")
         pass
     else:
         print("Login confirmed")
+        if table_endpoint_url:
+            brain.enable_direct_data(table_endpoint_url)
         # time.sleep(30)
-        brain.select_site(site_to_be_updated)
-         # loop through site_data and update each site in salesforce
-        for data in site_data:
-            # address_match = brain.find_matching_address_from_table(data)
-            if not brain.find_matching_address_from_table(data):
-                pass
-            else:
-                # brain.click_100_views_button()
-                brain.switch_to_forms_iframe()
-                # TODO: check if site is already updated
-                check = brain.update_site_form_1(data)
-                if not check:
-                    print('Error: Site not updated, unable to submit form 1')
-                    pass
-                else:
-                    brain.switch_to_forms_iframe()
-                    # check if form 2 is required
-                    if not brain.check_if_form_2_required():
-                        print('Form 1 updated successfully')
-                        pass
-                    else:
-                        brain.switch_to_second_form_iframe()
-                        brain.draw_signature()
+        recycler = DriverRecycler(brain, RecyclePolicy(
+            max_rows=recycle_max_rows, max_rss_mb=recycle_max_rss_mb, max_drift=recycle_max_drift))
+        # Rows are grouped by their `location`; rows without one go to `site_to_be_updated`
+        scheduler = SiteScheduler(brain, default_site=site_to_be_updated, recycler=recycler)
+        journal = CheckpointJournal(journal_path)
+        if browser_tabs > 1:
+            # One login, one browser: the rows are spread over several tabs driven concurrently
+            tab_bot = AsyncTabBot.from_bot(brain, tabs=browser_tabs, default_site=site_to_be_updated,
+                                           batch_size=batch_size)
+            asyncio.run(tab_bot.run(itertools.chain(first_batch, site_data), journal))
+        else:
+            # loop through site_data and update each site in salesforce
+            for batch in iter_batches(itertools.chain(first_batch, site_data), batch_size):
+                scheduler.run(batch, journal, drain=False)
+            # Rows that failed with an error are retried after the main pass
+            scheduler.drain_retries(journal)
+            print(f"Session recoveries: {scheduler.session_recoveries}")
+            print(f"Browser restarts: {recycler.stats}")
+            print(f"Site switches: {scheduler.site_switches}")
+        print(f"No-op submissions avoided: {brain.sync_stats['unchanged']} "
+              f"({brain.sync_stats['changed']} indexed rows needed an update)")
         print('All sites updated successfully')
-        brain.driver.quit()
+        print(f"Journal: {journal.summary()}")
+        journal.close()
+        remove_journal(journal_path)
+        brain.waits.print_stats()
+        print(f"Locator cache: {brain.locators.stats}")
+        print(f"Table navigation: {brain.navigator.stats}")
+        print(f"Page loads ({browser_profile} profile): {summarize_page_loads(brain.page_loads)}")
+        brain.metrics.write_json(metrics_json_path)
+        brain.metrics.write_prometheus(metrics_prometheus_path)
+        print(f"Metrics written to {metrics_json_path} and {metrics_prometheus_path}")
+        brain.quit()
         print("bot left the driver")
 
 
@@ -94,4 +164,16 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Update the Salesforce sites from the CSV feed")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="run main() under cProfile and save the stats to PATH")
+    args = parser.parse_args()
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(main)
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+        print(f"Profile saved to {args.profile}")
+    else:
+        main()
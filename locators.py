@@ -0,0 +1,234 @@
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+# Frame context of the top-level Lightning page
+DEFAULT_CONTEXT = "default"
+
+# Candidate locators of every element the bot uses, cheapest first.
+# The absolute XPaths the bot was written against are kept as the last resort.
+LOCATORS = {
+    # Lightning page
+    "lightning_iframe": [
+        (By.CSS_SELECTOR, "force-aloha-page iframe"),
+        (By.XPATH, "/html/body/div[4]/div[1]/section/div[1]/div/div[2]/div[1]/div/div/div/div/div/div/force-aloha-page/div/iframe"),
+    ],
+    # Site table
+    "site_select": [
+        (By.CSS_SELECTOR, "select.ng-pristine.ng-valid.ng-touched"),
+        (By.XPATH, "/html/body/div/div[2]/div/div[4]/div[2]/div/div[3]/select"),
+    ],
+    "page_size_100": [
+        (By.CSS_SELECTOR, 'button[ng-click="params.count(100)"]'),
+        (By.XPATH, "/html/body/div/div[2]/div/div[5]/div[2]/div/div[2]/div/ul/li[12]/div/button[4]"),
+    ],
+    "next_page": [
+        (By.CSS_SELECTOR, "li.next > a"),
+        (By.XPATH, '//li[contains(@class, "next")]/a'),
+    ],
+    # Filter box of the Address column only: typing a civic number in another column's filter or in a page-wide
+    # search box would hide the row
+    "table_filter": [
+        (By.CSS_SELECTOR, 'table.ng-table tr.ng-table-filters th[data-title-text="Address"] input'),
+        (By.CSS_SELECTOR, 'table.ng-table tr.ng-table-filters input[name="address" i]'),
+        (By.XPATH, '//table[contains(@class, "ng-table")]//tr[contains(@class, "ng-table-filters")]/th['
+                   'count(//table[contains(@class, "ng-table")]//thead/tr[1]/th[normalize-space()="Address"]'
+                   '/preceding-sibling::th) + 1]//input'),
+    ],
+    # Form 1
+    "form_name": [
+        (By.CSS_SELECTOR, 'form input[name="name"]'),
+        (By.XPATH, "/html/body/div/div[2]/div/div/form/div[3]/div[3]/input[1]"),
+    ],
+    "form_last_name": [
+        (By.CSS_SELECTOR, 'form input[name="lastName"]'),
+        (By.XPATH, "/html/body/div/div[2]/div/div/form/div[3]/div[3]/input[2]"),
+    ],
+    "form_email": [
+        (By.CSS_SELECTOR, 'form input[name="email"]'),
+        (By.XPATH, "/html/body/div/div[2]/div/div/form/div[6]/div[3]/input"),
+    ],
+    "form_phone": [
+        (By.CSS_SELECTOR, 'form input[name="phone"]'),
+        (By.XPATH, "/html/body/div/div[2]/div/div/form/div[5]/div[3]/input"),
+    ],
+    "form_language": [(By.NAME, "language")],
+    "form_feed": [(By.NAME, "feed")],
+    "form_installation_type": [(By.NAME, "installationType")],
+    "form_status": [
+        (By.CSS_SELECTOR, 'form select[name="status"]'),
+        (By.XPATH, "/html/body/div/div[2]/div/div/form/div[13]/div[3]/select"),
+    ],
+    "form_consent": [(By.NAME, "Consent")],
+    "form_submit": [(By.XPATH, "/html/body/div/div[2]/div/div/div[3]/div[2]/button[5]")],
+    # Form 2
+    "signature_canvas": [
+        (By.CSS_SELECTOR, "form canvas"),
+        (By.XPATH, "/html/body/div/div[2]/div/div/form/div[5]/div[3]/canvas[1]"),
+    ],
+    "signature_save": [(By.XPATH, "/html/body/div/div[2]/div/div/form/div[7]/div[2]/button[3]")],
+}
+
+# Resolves the first element matched by a list of `LocatorRegistry.script_locators` candidates, for injected scripts
+RESOLVE_FUNCTION = """
+function resolve(locators) {
+    for (var i = 0; i < locators.length; i++) {
+        var element = null;
+        if (locators[i].css) {
+            element = document.querySelector(locators[i].css);
+        } else {
+            element = document.evaluate(locators[i].xpath, document, null,
+                                        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        }
+        if (element) {
+            return element;
+        }
+    }
+    return null;
+}
+"""
+
+
+class LocatorRegistry:
+    """
+    ## LocatorRegistry
+    #### Central registry of the bot's locators that caches the resolved frame and element handles of each frame context.
+
+    #### Methods:
+
+    - `find(name: str, timeout: float = 0, cache: bool = True) -> WebElement`:
+        - Returns the element, from the cache of the current frame context when possible.
+        - Tries the candidate locators of `LOCATORS[name]` in order, waiting up to `timeout` seconds.
+
+    - `find_all(name: str, cache: bool = True) -> list`:
+        - Same as `find` for a list of elements (empty when nothing matches, never waits).
+
+    - `perform(name: str, action: Callable, timeout: float = 0)`:
+        - Calls `action(element)`; on `StaleElementReferenceException` the handle is resolved again and the action retried once.
+
+    - `enter_frame(name: str = "lightning_iframe", timeout: float = 10)`:
+        - Switches into the iframe, reusing the cached iframe handle. Does nothing when already in that frame.
+
+    - `invalidate(context: str = None)`:
+        - Drops the cached handles of a frame context (all contexts when None). Call it when a frame navigates.
+
+    #### Attributes:
+
+    - `self.stats`: Counts of cache `hits`, `misses` and `stale` handles.
+    """
+
+    def __init__(self, driver, locators=None):
+        self.driver = driver
+        self.locators = dict(LOCATORS, **(locators or {}))
+        self.frame_context = DEFAULT_CONTEXT
+        self.stats = {"hits": 0, "misses": 0, "stale": 0}
+        self._cache = {}
+
+    def find(self, name, timeout=0, cache=True):
+        key = (self.frame_context, name)
+        if cache and key in self._cache:
+            self.stats["hits"] += 1
+            return self._cache[key]
+        self.stats["misses"] += 1
+
+        if timeout:
+            element = WebDriverWait(self.driver, timeout).until(
+                lambda driver: self._resolve(name),
+                f"Element '{name}' not found after {timeout} seconds")
+        else:
+            element = self._resolve(name)
+            if element is None:
+                raise TimeoutException(f"Element '{name}' not found")
+        if cache:
+            self._cache[key] = element
+        return element
+
+    def find_all(self, name, cache=True):
+        key = (self.frame_context, name, "all")
+        if cache and key in self._cache:
+            self.stats["hits"] += 1
+            return self._cache[key]
+        self.stats["misses"] += 1
+
+        elements = []
+        for by, value in self.locators[name]:
+            elements = self.driver.find_elements(by, value)
+            if elements:
+                break
+        if cache and elements:
+            self._cache[key] = elements
+        return elements
+
+    def exists(self, name):
+        """
+        ## Non-throwing check that the element is on the page.
+        """
+        try:
+            return self._resolve(name) is not None
+        except Exception:
+            return False
+
+    def perform(self, name, action, timeout=0):
+        try:
+            return action(self.find(name, timeout))
+        except StaleElementReferenceException:
+            self.stats["stale"] += 1
+            self._cache.pop((self.frame_context, name), None)
+            return action(self.find(name, timeout))
+
+    def enter_frame(self, name="lightning_iframe", timeout=10):
+        if self.frame_context == name:
+            return
+        self.driver.switch_to.default_content()
+        self.frame_context = DEFAULT_CONTEXT
+        try:
+            self.driver.switch_to.frame(self.find(name, timeout))
+        except StaleElementReferenceException:
+            self.stats["stale"] += 1
+            self.invalidate(DEFAULT_CONTEXT)
+            self.driver.switch_to.frame(self.find(name, timeout))
+        self.frame_context = name
+
+    def leave_frame(self):
+        self.driver.switch_to.default_content()
+        self.frame_context = DEFAULT_CONTEXT
+
+    def invalidate(self, context=None):
+        if context is None:
+            self._cache.clear()
+            return
+        for key in [key for key in self._cache if key[0] == context]:
+            del self._cache[key]
+
+    def reset(self):
+        """
+        ## Forgets every handle and the frame context, after the top-level page navigated.
+        """
+        self.invalidate()
+        self.frame_context = DEFAULT_CONTEXT
+
+    def script_locators(self, name):
+        """
+        ## Converts the candidate locators of `name` for use in an injected script.
+
+        - return: List of `{"css": selector}` / `{"xpath": expression}` dictionaries, in the same order.
+        """
+        converted = []
+        for by, value in self.locators[name]:
+            if by == By.XPATH:
+                converted.append({"xpath": value})
+            elif by == By.CSS_SELECTOR:
+                converted.append({"css": value})
+            elif by == By.NAME:
+                converted.append({"css": f'[name="{value}"]'})
+            elif by == By.ID:
+                converted.append({"css": f'[id="{value}"]'})
+        return converted
+
+    def _resolve(self, name):
+        for by, value in self.locators[name]:
+            elements = self.driver.find_elements(by, value)
+            if elements:
+                return elements[0]
+        return None
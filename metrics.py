@@ -0,0 +1,154 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Span that marks one processed CSV row, used for the rows/minute rate
+ROW_SPAN = "process_row"
+
+
+def timed(name):
+    """
+    ## Decorator recording every call of a `FetcherBot` method as a `Metrics` span named `name`.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.span(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Metrics:
+    """
+    ## Metrics
+    #### Per-step timing of a bot run: latency histograms, WebDriver commands per step and rows per minute.
+
+    #### Methods:
+
+    - `attach(driver)`:
+        - Counts every WebDriver command sent through `driver`.
+
+    - `span(name: str)`:
+        - Context manager timing the enclosed block and counting the WebDriver commands it sends.
+
+    - `current_span() -> Optional[str]`:
+        - Name of the innermost span open in the calling thread, used to attribute commands to code paths.
+
+    - `to_dict() -> dict`:
+        - Returns the collected metrics.
+
+    - `write_json(path: str)` / `write_prometheus(path: str)`:
+        - Export the metrics as JSON or in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.command_count = 0
+        self.commands = {}
+        self._steps = {}
+        self._lock = threading.Lock()
+        # Spans open in each thread, innermost last
+        self._local = threading.local()
+
+    def attach(self, driver):
+        execute = driver.execute
+
+        def counted_execute(driver_command, params=None):
+            with self._lock:
+                self.command_count += 1
+                self.commands[driver_command] = self.commands.get(driver_command, 0) + 1
+            return execute(driver_command, params)
+
+        driver.execute = counted_execute
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        commands_before = self.command_count
+        stack = self._span_stack()
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+            self.record(name, time.perf_counter() - start, self.command_count - commands_before)
+
+    def current_span(self):
+        stack = self._span_stack()
+        return stack[-1] if stack else None
+
+    def _span_stack(self):
+        if not hasattr(self._local, "spans"):
+            self._local.spans = []
+        return self._local.spans
+
+    def record(self, name, seconds, commands=0):
+        with self._lock:
+            step = self._steps.setdefault(name, {
+                "count": 0, "sum": 0.0, "max": 0.0, "commands": 0, "buckets": [0] * len(HISTOGRAM_BUCKETS)})
+            step["count"] += 1
+            step["sum"] += seconds
+            step["max"] = max(step["max"], seconds)
+            step["commands"] += commands
+            for position, bound in enumerate(HISTOGRAM_BUCKETS):
+                if seconds <= bound:
+                    step["buckets"][position] += 1
+
+    def to_dict(self):
+        with self._lock:
+            elapsed = time.time() - self.started_at
+            rows = self._steps.get(ROW_SPAN, {}).get("count", 0)
+            return {
+                "started_at": self.started_at,
+                "elapsed_seconds": elapsed,
+                "rows": rows,
+                "rows_per_minute": rows / (elapsed / 60) if elapsed else 0.0,
+                "webdriver_commands": self.command_count,
+                "webdriver_commands_by_name": dict(self.commands),
+                "histogram_buckets": list(HISTOGRAM_BUCKETS),
+                "steps": {
+                    name: dict(step, buckets=list(step["buckets"]),
+                               mean=step["sum"] / step["count"] if step["count"] else 0.0)
+                    for name, step in self._steps.items()
+                },
+            }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as metrics_file:
+            json.dump(self.to_dict(), metrics_file, indent=2)
+
+    def write_prometheus(self, path):
+        data = self.to_dict()
+        lines = [
+            "# HELP fetcher_step_seconds Latency of the bot steps.",
+            "# TYPE fetcher_step_seconds histogram",
+        ]
+        for name, step in sorted(data["steps"].items()):
+            for bound, count in zip(HISTOGRAM_BUCKETS, step["buckets"]):
+                lines.append(f'fetcher_step_seconds_bucket{{step="{name}",le="{bound}"}} {count}')
+            lines.append(f'fetcher_step_seconds_bucket{{step="{name}",le="+Inf"}} {step["count"]}')
+            lines.append(f'fetcher_step_seconds_sum{{step="{name}"}} {step["sum"]}')
+            lines.append(f'fetcher_step_seconds_count{{step="{name}"}} {step["count"]}')
+        lines += [
+            "# HELP fetcher_step_webdriver_commands_total WebDriver commands sent by the bot steps.",
+            "# TYPE fetcher_step_webdriver_commands_total counter",
+        ]
+        for name, step in sorted(data["steps"].items()):
+            lines.append(f'fetcher_step_webdriver_commands_total{{step="{name}"}} {step["commands"]}')
+        lines += [
+            "# HELP fetcher_rows_total CSV rows processed.",
+            "# TYPE fetcher_rows_total counter",
+            f'fetcher_rows_total {data["rows"]}',
+            "# HELP fetcher_rows_per_minute CSV rows processed per minute.",
+            "# TYPE fetcher_rows_per_minute gauge",
+            f'fetcher_rows_per_minute {data["rows_per_minute"]}',
+        ]
+        with open(path, "w", encoding="utf-8") as metrics_file:
+            metrics_file.write("\n".join(lines) + "\n")
@@ -0,0 +1,704 @@
+"""
+Local stand-in for the Bell consent Salesforce pages used by `FetcherBot`.
+
+It reproduces the structure the bot relies on, not the real pages: the login form, the Lightning shell with the
+iframe at the absolute XPath of `locators.LOCATORS["lightning_iframe"]`, the ng-table of addresses (`data-title-text` cells, "Go To" buttons,
+the filter boxes of the Address and Name columns and a page-wide name search box, the pager with its first and last page links, `li.next` and the page size buttons, and the
+NgTableParams of the pager scope), form 1 and the signature form of form 2. Rows are served as JSON by
+`/apex/remoting/rows`, which the table page loads like the real Visualforce page does; the filters are applied by the
+server.
+
+Run `python mock_site.py --port 8765` to browse it, or use `MockSalesforceServer` from a benchmark.
+"""
+import argparse
+import json
+import random
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+STREET_NAMES = ("YORK HILL", "BAYVIEW", "STEELES", "BATHURST", "CENTRE", "BEVERLEY GLEN", "CLARK", "JOHN")
+STREET_SUFFIXES = ("BL", "AVE", "ST", "RD", "DR", "CRES")
+STATUSES = ("", "No Answer", "Do Not Call", "Consent Final")
+INSTALLATION_TYPES = ("Easy", "Moderate", "Difficult", "Non Standard")
+
+# Minimal AngularJS shim so `wait_engine.ANGULAR_IDLE_SCRIPT` sees the XHRs the page has in flight
+ANGULAR_SHIM = """
+var pendingRequests = [];
+window.angular = {
+    element: function () {
+        return {
+            injector: function () {
+                return {
+                    get: function (name) {
+                        return name === '$http' ? {pendingRequests: pendingRequests} : {$$phase: null};
+                    }
+                };
+            },
+            scope: function () {
+                return window.ngTableScope || null;
+            }
+        };
+    }
+};
+function request(method, url, body, done) {
+    var xhr = new XMLHttpRequest();
+    pendingRequests.push(xhr);
+    xhr.open(method, url);
+    xhr.setRequestHeader('Content-Type', 'application/json');
+    xhr.onloadend = function () {
+        pendingRequests.splice(pendingRequests.indexOf(xhr), 1);
+        done(xhr.status === 200 ? JSON.parse(xhr.responseText) : null);
+    };
+    xhr.send(body ? JSON.stringify(body) : null);
+}
+function query(name) {
+    var match = new RegExp('[?&]' + name + '=([^&]*)').exec(window.location.search);
+    return match ? decodeURIComponent(match[1].replace(/\\+/g, ' ')) : '';
+}
+"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Login | Salesforce</title></head><body>
+<form method="post" action="/login">
+    <input type="email" name="username">
+    <input type="password" name="pw">
+    <input type="submit" name="Login" value="Log In">
+</form>
+</body></html>"""
+
+
+def _nest(segments, inner):
+    """
+    Wraps `inner` in nested elements. Each segment is `(tag, preceding_siblings)`, where `preceding_siblings` empty
+    siblings of the same tag are added before the element so its position matches an absolute XPath.
+    """
+    html = inner
+    for tag, preceding_siblings in reversed(segments):
+        html = f"<{tag}></{tag}>" * preceding_siblings + f"<{tag}>{html}</{tag}>"
+    return html
+
+
+# Path of the iframe: /html/body/div[4]/div[1]/section/div[1]/div/div[2]/div[1]/div/div/div/div/div/div/force-aloha-page/div/iframe
+LIGHTNING_PAGE = "<!DOCTYPE html>\n<html><head><title>Bell | Salesforce</title></head><body>" + _nest(
+    [("div", 3), ("div", 0), ("section", 0), ("div", 0), ("div", 0), ("div", 1), ("div", 0)]
+    + [("div", 0)] * 6 + [("force-aloha-page", 0), ("div", 0)],
+    '<iframe src="/apex/BellConsent" style="width: 100%; height: 900px; border: 0"></iframe>',
+) + "</body></html>"
+
+TABLE_PAGE = """<!DOCTYPE html>
+<html><head><title>Bell Consent</title></head><body>
+<div>
+  <div>header</div>
+  <div>
+    <div>
+      <div><h1>Bell Consent</h1></div>
+      <div></div>
+      <div></div>
+      <div>
+        <div>Site</div>
+        <div><div>
+          <div></div>
+          <div></div>
+          <div><select class="ng-pristine ng-valid ng-touched" id="site-select">
+            <option value=""></option>%(site_options)s
+          </select></div>
+        </div></div>
+      </div>
+      <div>
+        <div>
+          <input type="search" id="name-search" placeholder="Search names">
+          <table class="ng-table">
+            <thead>
+              <tr><th>Address</th><th>Name</th><th>Status</th><th>Consent</th><th>Last Updated</th><th></th></tr>
+              <tr class="ng-table-filters">
+                <th data-title-text="Address" class="filter"><input type="text" name="address"
+                    class="input-filter form-control" ng-model="params.filter()[name]" id="address-filter"></th>
+                <th data-title-text="Name" class="filter"><input type="text" name="name"
+                    class="input-filter form-control" ng-model="params.filter()[name]" id="name-filter"></th>
+                <th></th><th></th><th></th><th></th>
+              </tr>
+            </thead>
+            <tbody id="rows"></tbody>
+          </table>
+        </div>
+        <div><div>
+          <div></div>
+          <div><div><ul class="pagination" id="pager"></ul></div></div>
+        </div></div>
+      </div>
+    </div>
+  </div>
+</div>
+<script>
+%(shim)s
+var state = {
+    site: query('site') || sessionStorage.getItem('site') || '',
+    page: 1,
+    count: parseInt(sessionStorage.getItem('count') || '10', 10),
+    filter: '',
+    nameFilter: '',
+    total: 0
+};
+// Pages shown on each side of the current one, between the first and the last page links
+var PAGE_WINDOW = 2;
+var FILTER_DELAY = 300;
+var filterTimer = null;
+
+function escapeHtml(text) {
+    return String(text).replace(/[&<>"]/g, function (c) {
+        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c];
+    });
+}
+
+function load() {
+    sessionStorage.setItem('site', state.site);
+    sessionStorage.setItem('count', String(state.count));
+    if (!state.site) {
+        render({rows: [], total: 0});
+        return;
+    }
+    request('GET', '/apex/remoting/rows?site=' + encodeURIComponent(state.site) + '&page=' + state.page +
+            '&count=' + state.count + '&filter=' + encodeURIComponent(state.filter) +
+            '&name=' + encodeURIComponent(state.nameFilter), null, render);
+}
+
+function render(data) {
+    data = data || {rows: [], total: 0};
+    state.total = data.total;
+    var html = '';
+    for (var i = 0; i < data.rows.length; i++) {
+        var row = data.rows[i];
+        html += '<tr>' +
+            '<td data-title-text="Address">' + escapeHtml(row.address) + '</td>' +
+            '<td data-title-text="Name">' + escapeHtml(row.name) + '</td>' +
+            '<td data-title-text="Status">' + escapeHtml(row.status) + '</td>' +
+            '<td data-title-text="Consent">' + escapeHtml(row.consent) + '</td>' +
+            '<td data-title-text="Last Updated">' + escapeHtml(row.lastUpdated) + '</td>' +
+            '<td data-title-text="Actions"><button type="button" onclick="goTo(\\'' + row.id + '\\')">Go To</button></td>' +
+            '</tr>';
+    }
+    document.getElementById('rows').innerHTML = html;
+    renderPager();
+}
+
+function renderPager() {
+    var pages = Math.max(1, Math.ceil(state.total / state.count));
+    var html = state.page > 1 ? '<li class="prev"><a href="" onclick="return setPage(' + (state.page - 1) + ')">&laquo;</a></li>'
+                              : '<li class="prev disabled"><a>&laquo;</a></li>';
+    // Like ng-table: first page, pages around the current one, last page, "..." for the gaps
+    var previous = 0;
+    for (var page = 1; page <= pages && state.total; page++) {
+        if (page !== 1 && page !== pages && Math.abs(page - state.page) > PAGE_WINDOW) {
+            continue;
+        }
+        if (page > previous + 1) {
+            html += '<li class="disabled"><a>&hellip;</a></li>';
+        }
+        html += '<li class="' + (page === state.page ? 'active' : '') + '"><a href="" onclick="return setPage(' + page + ')">' + page + '</a></li>';
+        previous = page;
+    }
+    // ng-table drops the "next" button on the last page
+    html += state.page < pages ? '<li class="next"><a href="" onclick="return setPage(' + (state.page + 1) + ')">&raquo;</a></li>'
+                               : '<li class="end"></li>';
+    html += '<li class="counts"><div>';
+    var counts = [10, 25, 50, 100];
+    for (var c = 0; c < counts.length; c++) {
+        html += '<button type="button" class="' + (counts[c] === state.count ? 'active' : '') + '" ng-click="params.count(' +
+                counts[c] + ')" onclick="setCount(' + counts[c] + ')">' + counts[c] + '</button>';
+    }
+    html += '</div></li>';
+    document.getElementById('pager').innerHTML = html;
+}
+
+function setPage(page) {
+    state.page = page;
+    load();
+    return false;
+}
+
+function setCount(count) {
+    state.count = count;
+    state.page = 1;
+    load();
+}
+
+function setFilter(value) {
+    state.filter = value;
+    state.page = 1;
+    load();
+}
+
+function setNameFilter(value) {
+    state.nameFilter = value;
+    state.page = 1;
+    load();
+}
+
+// NgTableParams as seen from the pager scope
+window.ngTableScope = {
+    params: {
+        page: function (page) {
+            return page === undefined ? state.page : setPage(page);
+        },
+        count: function (count) {
+            return count === undefined ? state.count : setCount(count);
+        }
+    },
+    $apply: function (fn) {
+        fn();
+    }
+};
+
+// ng-table reloads the rows once the user stops typing
+function debounced(apply) {
+    return function (event) {
+        clearTimeout(filterTimer);
+        var value = event.target.value;
+        filterTimer = setTimeout(function () {
+            apply(value);
+        }, FILTER_DELAY);
+    };
+}
+document.getElementById('address-filter').addEventListener('input', debounced(setFilter));
+// The Name column filter and the page-wide search box filter the names, not the addresses
+document.getElementById('name-filter').addEventListener('input', debounced(setNameFilter));
+document.getElementById('name-search').addEventListener('input', debounced(setNameFilter));
+
+function goTo(rowId) {
+    window.location.href = '/apex/BellConsentForm?site=' + encodeURIComponent(state.site) + '&row=' + rowId;
+}
+
+var select = document.getElementById('site-select');
+select.value = state.site;
+select.onchange = function () {
+    state.site = select.value;
+    state.page = 1;
+    load();
+};
+load();
+</script>
+</body></html>"""
+
+
+def _form_div(label, control="", extra=""):
+    return f"<div><div>{label}</div><div>{extra}</div><div>{control}</div></div>"
+
+
+# Form 1, the fields are at the absolute XPaths used by `FetcherBot.update_site`
+FORM_PAGE = """<!DOCTYPE html>
+<html><head><title>Bell Consent - Site</title></head><body>
+<div>
+  <div>header</div>
+  <div>
+    <div><div>
+      <form id="site-form" onsubmit="return false">
+        %(form_divs)s
+      </form>
+      <div></div>
+      <div></div>
+      <div>
+        <div></div>
+        <div>
+          <button type="button" onclick="back()">Back</button>
+          <button type="button">Print</button>
+          <button type="button">History</button>
+          <button type="button">Reset</button>
+          <button type="button" id="submit" onclick="submitForm()">Submit</button>
+        </div>
+      </div>
+    </div></div>
+  </div>
+</div>
+<script>
+%(shim)s
+var CONSENT_SELECT = '<select name="Consent"><option value=""></option><option>Yes</option><option>No</option></select>';
+var row = %(row)s;
+var form = document.getElementById('site-form');
+var statusSelect = form.children[12].querySelector('select');
+var consentCell = form.children[13].children[2];
+
+function toggleConsent() {
+    // Rendered by ng-if: the select only exists for "Consent Final"
+    if (statusSelect.value === 'Consent Final') {
+        if (!consentCell.firstChild) {
+            consentCell.innerHTML = CONSENT_SELECT;
+        }
+    } else {
+        consentCell.innerHTML = '';
+    }
+}
+statusSelect.addEventListener('change', toggleConsent);
+statusSelect.value = row.status;
+toggleConsent();
+if (consentCell.firstChild) {
+    consentCell.firstChild.value = row.consent;
+}
+
+function back() {
+    window.location.href = '/apex/BellConsent?site=' + encodeURIComponent(query('site'));
+}
+
+function submitForm() {
+    var values = {row: row.id, site: query('site')};
+    var fields = form.querySelectorAll('input[type=text], input[type=email], select');
+    for (var i = 0; i < fields.length; i++) {
+        values[fields[i].name] = fields[i].value;
+    }
+    var feed = form.querySelector('input[name=feed]:checked');
+    values.feed = feed ? feed.value : '';
+    document.getElementById('submit').disabled = true;
+    request('POST', '/apex/remoting/submit', values, function (response) {
+        if (response && response.signature) {
+            window.location.href = '/apex/BellConsentSignature?site=' + encodeURIComponent(values.site) + '&row=' + row.id;
+        } else {
+            back();
+        }
+    });
+}
+</script>
+</body></html>"""
+
+# Form 2, the canvas and the save button are at the absolute XPaths used by `FetcherBot.draw_signature`
+SIGNATURE_PAGE = """<!DOCTYPE html>
+<html><head><title>Bell Consent - Signature</title></head><body>
+<div>
+  <div>header</div>
+  <div>
+    <div><div>
+      <form onsubmit="return false">
+        <div><div>Signature</div></div>
+        <div></div>
+        <div></div>
+        <div></div>
+        <div><div>Sign below</div><div></div><div>
+          <canvas id="signature" width="400" height="150" style="border: 1px solid #999; touch-action: none"></canvas>
+        </div></div>
+        <div></div>
+        <div><div></div><div>
+          <button type="button" onclick="clearCanvas()">Clear</button>
+          <button type="button" onclick="back()">Cancel</button>
+          <button type="button" id="save" onclick="save()">Save</button>
+        </div></div>
+      </form>
+    </div></div>
+  </div>
+</div>
+<script>
+%(shim)s
+var canvas = document.getElementById('signature');
+var context = canvas.getContext('2d');
+var drawing = false;
+
+// Behaves like signature_pad: strokes are drawn from pointer events
+canvas.addEventListener('pointerdown', function (event) {
+    drawing = true;
+    context.beginPath();
+    context.moveTo(event.offsetX, event.offsetY);
+});
+canvas.addEventListener('pointermove', function (event) {
+    if (drawing) {
+        context.lineTo(event.offsetX, event.offsetY);
+        context.stroke();
+    }
+});
+canvas.addEventListener('pointerup', function () {
+    drawing = false;
+});
+
+function isEmpty() {
+    var pixels = context.getImageData(0, 0, canvas.width, canvas.height).data;
+    for (var i = 3; i < pixels.length; i += 4) {
+        if (pixels[i]) {
+            return false;
+        }
+    }
+    return true;
+}
+
+function clearCanvas() {
+    context.clearRect(0, 0, canvas.width, canvas.height);
+}
+
+function back() {
+    window.location.href = '/apex/BellConsent?site=' + encodeURIComponent(query('site'));
+}
+
+function save() {
+    document.getElementById('save').disabled = true;
+    request('POST', '/apex/remoting/signature', {row: query('row'), site: query('site'), empty: isEmpty(),
+                                                 image: canvas.toDataURL()}, back);
+}
+</script>
+</body></html>"""
+
+
+def generate_rows(site_name, count, seed=0):
+    """
+    Builds `count` deterministic table rows for a site. The first row of the first site of `MockSalesforceServer`
+    is the address of the sample CSV (773 YORK HILL BL).
+    """
+    generator = random.Random(f"{seed}-{site_name}")
+    rows = []
+    used = set()
+    while len(rows) < count:
+        address = (f"{generator.randint(1, 999)} {generator.choice(STREET_NAMES)} "
+                   f"{generator.choice(STREET_SUFFIXES)}")
+        if address in used:
+            continue
+        used.add(address)
+        rows.append({
+            "id": f"{site_name}-{len(rows)}",
+            "address": address,
+            "name": f"Resident {len(rows)}",
+            "status": generator.choice(STATUSES),
+            "consent": "",
+            "type": generator.choice(INSTALLATION_TYPES),
+            "lastUpdated": "2023-01-01T00:00:00.000Z",
+        })
+    return rows
+
+
+class MockSalesforceServer:
+    """
+    ## MockSalesforceServer
+    #### Serves the mock Bell consent pages from a background thread.
+
+    - param sites: Dictionary mapping each site name to its number of table rows.
+    - param latency: Seconds added to every request, to mimic the real org.
+    - param host, port: Address to listen on (port 0 picks a free port).
+
+    #### Usage:
+    - `server = MockSalesforceServer({"TNHLON40_3104A": 400}, latency=0.05).start()`
+    - `bot.start_session(server.login_url, "user", "password")`
+    - `server.stop()`
+    """
+
+    def __init__(self, sites=None, latency=0.0, host="127.0.0.1", port=0, seed=0):
+        sites = sites or {"TNHLON40_3104A": 300}
+        self.latency = latency
+        self.sites = {name: generate_rows(name, count, seed) for name, count in sites.items()}
+        first_site = next(iter(self.sites.values()))
+        if first_site:
+            first_site[0]["address"] = "773 YORK HILL BL"
+        self.sessions = set()
+        self.submissions = []
+        self.signatures = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self):
+        return f"{self.url}/login"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def find_row(self, site_name, row_id):
+        for row in self.sites.get(site_name, []):
+            if row["id"] == row_id:
+                return row
+        return None
+
+    def state(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "submissions": len(self.submissions),
+                "signatures": len(self.signatures),
+                "empty_signatures": sum(1 for signature in self.signatures if signature["empty"]),
+            }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def _handle(self, method):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+                if url.path in ("/", "/login"):
+                    return self._login(method)
+                if url.path == "/mock/state":
+                    return self._send_json(server.state())
+                if not self._has_session():
+                    if url.path.startswith("/apex/remoting/"):
+                        return self._send_json({"error": "INVALID_SESSION_ID"}, status=401)
+                    return self._redirect("/login")
+
+                if url.path == "/lightning/n/Bell":
+                    return self._send_html(LIGHTNING_PAGE)
+                if url.path == "/apex/BellConsent":
+                    return self._send_html(self._table_page())
+                if url.path == "/apex/BellConsentForm":
+                    row = server.find_row(params.get("site", ""), params.get("row", ""))
+                    if row is None:
+                        return self._send_html("<html><body>Unknown site</body></html>", status=404)
+                    return self._send_html(self._form_page(row))
+                if url.path == "/apex/BellConsentSignature":
+                    return self._send_html(SIGNATURE_PAGE % {"shim": ANGULAR_SHIM})
+                if url.path == "/apex/remoting/rows":
+                    return self._send_json(self._rows(params))
+                if url.path == "/apex/remoting/submit" and method == "POST":
+                    return self._send_json(self._submit(self._read_json()))
+                if url.path == "/apex/remoting/signature" and method == "POST":
+                    signature = self._read_json()
+                    with server._lock:
+                        server.signatures.append({"row": signature.get("row"), "empty": signature.get("empty")})
+                    return self._send_json({"saved": True})
+                self._send_html("<html><body>Not found</body></html>", status=404)
+
+            def _login(self, method):
+                if method == "POST":
+                    form = parse_qs(self._read_body().decode())
+                    if form.get("username") and form.get("pw"):
+                        session_id = secrets.token_hex(16)
+                        with server._lock:
+                            server.sessions.add(session_id)
+                        return self._redirect("/lightning/n/Bell", cookie=f"sid={session_id}; Path=/; HttpOnly")
+                elif self._has_session():
+                    return self._redirect("/lightning/n/Bell")
+                self._send_html(LOGIN_PAGE)
+
+            def _table_page(self):
+                options = "".join(f"<option>{name}</option>" for name in server.sites)
+                return TABLE_PAGE % {"site_options": options, "shim": ANGULAR_SHIM}
+
+            def _form_page(self, row):
+                name_inputs = '<input type="text" name="name"><input type="text" name="lastName">'
+                language = ('<select name="language"><option value=""></option><option>English</option>'
+                            '<option>French</option></select>')
+                feed = ('<input type="radio" name="feed" value="Aerial"> Aerial '
+                        '<input type="radio" name="feed" value="Underground"> Underground')
+                installation = '<select name="installationType"><option value=""></option>%s</select>' % "".join(
+                    f"<option>{value}</option>" for value in INSTALLATION_TYPES)
+                status = '<select name="status"><option value=""></option>%s</select>' % "".join(
+                    f"<option>{value}</option>" for value in STATUSES if value)
+                divs = [
+                    _form_div("Site", extra=row["id"]),
+                    _form_div("Address", extra=row["address"]),
+                    _form_div("Name", name_inputs),
+                    _form_div("Language", language),
+                    _form_div("Phone", '<input type="text" name="phone">'),
+                    _form_div("Email", '<input type="email" name="email">'),
+                    _form_div("Feed", feed),
+                    _form_div("Installation type", installation),
+                    _form_div("Notes"),
+                    _form_div("Unit"),
+                    _form_div("Drop"),
+                    _form_div("Technician"),
+                    _form_div("Status", status),
+                    _form_div("Consent"),
+                ]
+                return FORM_PAGE % {"form_divs": "\n".join(divs), "shim": ANGULAR_SHIM,
+                                    "row": json.dumps(row)}
+
+            def _rows(self, params):
+                rows = server.sites.get(params.get("site", ""), [])
+                address_filter = params.get("filter", "").strip().upper()
+                if address_filter:
+                    rows = [row for row in rows if address_filter in row["address"]]
+                name_filter = params.get("name", "").strip().upper()
+                if name_filter:
+                    rows = [row for row in rows if name_filter in row["name"].upper()]
+                count = max(1, int(params.get("count", 10)))
+                page = max(1, int(params.get("page", 1)))
+                start = (page - 1) * count
+                return {"total": len(rows), "page": page, "count": count, "rows": rows[start:start + count]}
+
+            def _submit(self, values):
+                row = server.find_row(values.get("site", ""), values.get("row", ""))
+                if row is None:
+                    return {"saved": False}
+                with server._lock:
+                    row["status"] = values.get("status", "")
+                    row["consent"] = values.get("Consent", "")
+                    row["lastUpdated"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+                    server.submissions.append(values)
+                return {"saved": True, "signature": row["status"] == "Consent Final" and row["consent"] == "Yes"}
+
+            def _has_session(self):
+                for cookie in self.headers.get("Cookie", "").split(";"):
+                    name, _, value = cookie.strip().partition("=")
+                    if name == "sid" and value in server.sessions:
+                        return True
+                return False
+
+            def _read_body(self):
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def _read_json(self):
+                try:
+                    return json.loads(self._read_body() or b"{}")
+                except ValueError:
+                    return {}
+
+            def _redirect(self, location, cookie=None):
+                self.send_response(302)
+                self.send_header("Location", location)
+                if cookie:
+                    self.send_header("Set-Cookie", cookie)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _send_html(self, html, status=200):
+                self._send(html.encode(), "text/html; charset=utf-8", status)
+
+            def _send_json(self, data, status=200):
+                self._send(json.dumps(data).encode(), "application/json", status)
+
+            def _send(self, body, content_type, status):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the mock Bell consent pages")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=300, help="rows per site")
+    parser.add_argument("--sites", type=int, default=1, help="number of sites")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    args = parser.parse_args()
+
+    site_names = ["TNHLON40_3104A"] + [f"MOCKSITE_{number:03d}" for number in range(1, args.sites)]
+    mock = MockSalesforceServer({name: args.rows for name in site_names}, latency=args.latency, port=args.port)
+    print(f"Mock Salesforce pages on {mock.login_url}")
+    mock.serve_forever()
@@ -0,0 +1,157 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from checkpoint_journal import CheckpointJournal
+from fetcher_bot import FetcherBot, row_key
+from scheduler import SiteScheduler
+from session_store import SessionStore
+
+
+def shard_rows(site_data, workers, default_site=None):
+    """
+    ## Splits the CSV rows into one shard per worker.
+    #### Rows are grouped by `location`. Each site is cut into a number of chunks proportional to its size (by a hash of the
+    address, so rows of the same address always share a chunk) and the chunks are handed, largest first, to the least loaded
+    worker. A worker therefore selects as few sites as possible and every row belongs to exactly one shard.
+
+    - param site_data: List of dictionaries produced by `FetcherBot.process_csv_to_dict`.
+    - param workers: Number of shards to build.
+    - param default_site: Site used for rows without a `location`.
+
+    - return: List of `workers` shards, each a list of `(site_name, rows)` tuples.
+    """
+    sites = {}
+    seen = set()
+    for data in site_data:
+        key = row_key(data)
+        if key in seen:
+            print(f"Info: Duplicate row {key} skipped")
+            continue
+        seen.add(key)
+        sites.setdefault(data.get("location") or default_site, []).append(data)
+
+    total = sum(len(rows) for rows in sites.values())
+    chunks = []
+    for site_name, rows in sites.items():
+        chunk_count = min(workers, max(1, round(workers * len(rows) / total)))
+        site_chunks = [[] for _ in range(chunk_count)]
+        for data in rows:
+            address = FetcherBot.normalize_address_key(data['streetNumber'], data['streetName'])
+            site_chunks[zlib.crc32(address.encode()) % chunk_count].append(data)
+        chunks.extend((site_name, chunk) for chunk in site_chunks if chunk)
+
+    shards = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for site_name, chunk in sorted(chunks, key=lambda item: len(item[1]), reverse=True):
+        worker = loads.index(min(loads))
+        shards[worker].append((site_name, chunk))
+        loads[worker] += len(chunk)
+    return shards
+
+
+def run_worker(worker_id, shard, config, pool=None):
+    """
+    ## Processes one shard with its own `FetcherBot` and browser.
+
+    - param worker_id: Number of the worker (used for logging).
+    - param shard: List of `(site_name, rows)` tuples built by `shard_rows`.
+    - param config: Dictionary with the `url`, `username`, `password`, `index_ttl`, `session_path`,
+      `journal_path` and browser `profile` used by the worker.
+    - param pool: Optional `DriverPool` (thread mode only); the worker then borrows a logged-in bot instead of
+      launching its own browser.
+
+    - return: List of `(row_key, outcome)` tuples, one per row of the shard.
+    """
+    results = []
+    if not shard:
+        return results
+
+    bot = pool.checkout() if pool is not None else FetcherBot(
+        index_ttl=config.get("index_ttl", 900), profile=config.get("profile", "default"))
+    journal = CheckpointJournal(config["journal_path"]) if config.get("journal_path") else None
+    try:
+        if pool is not None:
+            logged_in = True
+        else:
+            session_store = SessionStore(config["session_path"]) if config.get("session_path") else None
+            logged_in = bot.start_session(config["url"], config["username"], config["password"], session_store)
+        scheduler = SiteScheduler(bot)
+        for site_name, rows in shard:
+            if logged_in:
+                outcomes = scheduler.run_site(site_name, rows, journal)
+            else:
+                outcomes = [SiteScheduler.failed_outcome(data, site_name, "not_logged_in") for data in rows]
+            for outcome in outcomes:
+                outcome["worker"] = worker_id
+                results.append((outcome["key"], outcome))
+        # Rows deferred by `run_site` are retried once the shard has been through
+        for outcome in scheduler.drain_retries(journal) if logged_in else []:
+            outcome["worker"] = worker_id
+            results.append((outcome["key"], outcome))
+    finally:
+        if pool is not None:
+            pool.checkin(bot)
+        else:
+            bot.quit()
+        if journal is not None:
+            journal.close()
+    print(f"Worker {worker_id} processed {len(results)} rows")
+    return results
+
+
+class ParallelRunner:
+    """
+    ## ParallelRunner
+    #### Runs several `FetcherBot` sessions at once, each with its own browser, over shards of the CSV rows.
+
+    - `run(site_data: list) -> dict`:
+        - Shards the rows (see `shard_rows`), processes every shard in its own worker and merges the outcomes.
+        - Returns a dictionary with the per-row `results` (keyed by `row_key`) and a `summary` of the row statuses.
+
+    #### Usage:
+    - `ParallelRunner(url, username, password, workers=4).run(site_data)`
+    - `mode="process"` runs the workers in separate processes instead of threads.
+    - `session_path` points the workers to a shared `SessionStore` file so only the first one has to log in.
+    - `journal_path` points the workers to a shared `CheckpointJournal` so a restarted run skips the finished rows.
+    - `pool` (a started `DriverPool`, thread mode) lends the workers browsers that are already logged in.
+    """
+
+    def __init__(self, url, username, password, workers=2, mode="thread", default_site=None, index_ttl=900,
+                 session_path=None, journal_path=None, pool=None, profile="default"):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown mode {mode!r}, expected 'thread' or 'process'")
+        if pool is not None and mode != "thread":
+            raise ValueError("A driver pool can only be shared by thread workers")
+        self.pool = pool
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.default_site = default_site
+        self.config = {
+            "url": url,
+            "username": username,
+            "password": password,
+            "index_ttl": index_ttl,
+            "session_path": session_path,
+            "journal_path": journal_path,
+            "profile": profile,
+        }
+
+    def run(self, site_data):
+        shards = shard_rows(site_data, self.workers, self.default_site)
+        executor_class = ProcessPoolExecutor if self.mode == "process" else ThreadPoolExecutor
+
+        results = {}
+        with executor_class(max_workers=self.workers) as executor:
+            futures = [executor.submit(run_worker, worker_id, shard, self.config, self.pool)
+                       for worker_id, shard in enumerate(shards)]
+            for future in futures:
+                for key, outcome in future.result():
+                    if key in results:
+                        raise RuntimeError(f"Row {key} was claimed by more than one worker")
+                    results[key] = outcome
+
+        summary = {}
+        for outcome in results.values():
+            summary[outcome["status"]] = summary.get(outcome["status"], 0) + 1
+        print(f"Parallel run finished: {summary}")
+        return {"results": results, "summary": summary}
@@ -0,0 +1,118 @@
+import heapq
+import itertools
+import time
+
+import urllib3
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    NoSuchElementException,
+    NoSuchFrameException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+
+
+# Failure classes of a row step
+ERROR_KINDS = ("element_not_found", "timeout", "stale_element", "session_lost")
+
+# WebDriver messages of a browser or session that is gone
+_SESSION_LOST_MESSAGES = ("invalid session id", "disconnected", "session deleted", "target window already closed",
+                          "chrome not reachable", "no such window")
+
+
+def classify_error(error):
+    """
+    ## Classifies an exception raised by a bot step.
+
+    - param error: The exception.
+
+    - return: One of `ERROR_KINDS`, or None when the error does not come from the browser or its connection
+      (e.g. a KeyError or TypeError of the bot): retrying would fail the same way. WebDriver errors that match no
+      other class are classified as "timeout", the class that is retried with the longest backoff.
+    """
+    message = str(error).lower()
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return "session_lost"
+    if isinstance(error, StaleElementReferenceException):
+        return "stale_element"
+    if isinstance(error, (NoSuchElementException, NoSuchFrameException)):
+        return "element_not_found"
+    if isinstance(error, TimeoutException):
+        # `LocatorRegistry.find` reports a missing element as a timeout
+        return "element_not_found" if "not found" in message else "timeout"
+    if isinstance(error, WebDriverException) and any(text in message for text in _SESSION_LOST_MESSAGES):
+        return "session_lost"
+    if isinstance(error, (OSError, urllib3.exceptions.HTTPError)):
+        # chromedriver or the browser process is gone
+        return "session_lost"
+    if isinstance(error, WebDriverException):
+        return "timeout"
+    return None
+
+
+class RetryQueue:
+    """
+    ## RetryQueue
+    #### Deferred queue of the rows that failed during the main pass, retried after it with exponential backoff.
+
+    #### Methods:
+
+    - `defer(site_name: str, data: dict, kind: str, attempt: int = 1)`:
+        - Queues a failed row; it becomes ready `delay(attempt)` seconds later.
+
+    - `delay(attempt: int) -> float`:
+        - `base_delay * 2 ** (attempt - 1)`, capped at `max_delay`.
+
+    - `drain(process: Callable) -> list`:
+        - Retries the rows in the order they become ready. `process(site_name, data)` returns `(outcome, error_kind)`,
+          with `error_kind` None on success. A row failing again is deferred with the next backoff until it has been tried
+          `max_attempts` times. Returns the final outcome of every row, with its number of `attempts`.
+
+    #### Attributes:
+
+    - `self.stats`: Deferred rows by error kind, plus the rows `recovered` by a retry and the ones `exhausted`.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=2.0, max_delay=60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = dict({kind: 0 for kind in ERROR_KINDS}, recovered=0, exhausted=0)
+        self._heap = []
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def delay(self, attempt):
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def defer(self, site_name, data, kind, attempt=1):
+        if kind not in ERROR_KINDS:
+            raise ValueError(f"Unknown error kind {kind!r}, expected one of {ERROR_KINDS}")
+        self.stats[kind] += 1
+        ready_at = time.monotonic() + self.delay(attempt)
+        heapq.heappush(self._heap, (ready_at, next(self._order), attempt, site_name, data, kind))
+
+    def drain(self, process):
+        outcomes = []
+        while self._heap:
+            ready_at, _, attempt, site_name, data, kind = heapq.heappop(self._heap)
+            wait = ready_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            print(f"Retrying a row of site {site_name} (attempt {attempt + 1}, last error: {kind})")
+            outcome, error_kind = process(site_name, data)
+            outcome["attempts"] = attempt + 1
+            if error_kind is None:
+                self.stats["recovered"] += 1
+                outcomes.append(outcome)
+            elif attempt + 1 >= self.max_attempts:
+                self.stats["exhausted"] += 1
+                outcome["error"] = error_kind
+                outcomes.append(outcome)
+            else:
+                self.defer(site_name, data, error_kind, attempt + 1)
+        return outcomes
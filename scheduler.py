@@ -0,0 +1,205 @@
+import time
+
+from fetcher_bot import row_key
+from retry_queue import RetryQueue, classify_error
+
+
+# Outcomes of `FetcherBot.process_row` that are retried when a step failed with an error
+RETRYABLE_STATUSES = ("not_found", "form_1_failed", "signature_failed")
+
+# Outcomes of the rows that went through the form path; only their latency is reported to the `DriverRecycler`, the
+# near-instant skipped and not found rows would pull its latency medians apart
+FORM_PATH_STATUSES = ("form_1_failed", "updated", "signed", "signature_failed")
+
+
+class SiteScheduler:
+    """
+    ## SiteScheduler
+    #### Groups the CSV rows by site and orders the work so a `FetcherBot` switches sites as rarely as possible and moves forward through the table pages.
+
+    #### Methods:
+
+    - `plan(rows: Iterable[dict]) -> list`:
+        - Groups the rows by their `location` column, the site already selected first, then in order of appearance.
+        - Returns a list of `(site_name, rows)` tuples.
+
+    - `ensure_site(site_name: str) -> bool`:
+        - Selects the site unless it is already the active one.
+        - Returns True if the site is selected, False otherwise.
+
+    - `order_rows(site_name: str, rows: list) -> list`:
+        - Sorts the rows by the page and row position of their address in the site index, matched in one
+          `AddressIndex.match_batch` pass; rows without an exact match keep their file order, after the indexed ones.
+
+    - `run_site(site_name: str, rows: list, journal=None) -> list`:
+        - Selects the site, builds its index when needed and processes the ordered rows with `FetcherBot.process_row`.
+        - Rows that fail with an error are deferred to `self.retry_queue` instead of being reported.
+        - Returns the list of row outcomes.
+
+    - `drain_retries(journal=None) -> list`:
+        - Retries the deferred rows with exponential backoff (see `RetryQueue.drain`) and returns their final outcomes.
+
+    - `run(rows: Iterable[dict], journal=None, drain: bool = True) -> list`:
+        - `plan` followed by `run_site` for every site, then `drain_retries` unless `drain` is False.
+
+    #### Note:
+    - After a failure the scheduler checks the session once (`FetcherBot.is_session_lost`): a lost session is recovered
+      with a single re-login, so the following rows do not each wait out their timeouts. Otherwise the Lightning page is
+      reloaded so the next row starts from the site table. When the session cannot be recovered, the remaining rows are
+      deferred without being tried.
+    - With a `DriverRecycler`, the latency of every row that went through the form path is reported to it, and the
+      browser may be restarted between two rows (see `driver_recycler.py`).
+    """
+
+    def __init__(self, bot, default_site=None, retry_queue=None, recycler=None):
+        self.bot = bot
+        self.recycler = recycler
+        self.default_site = default_site
+        self.site_switches = 0
+        self.retry_queue = retry_queue if retry_queue is not None else RetryQueue()
+        self.session_recoveries = 0
+        self.session_failed = False
+
+    def plan(self, rows):
+        groups = {}
+        for data in rows:
+            groups.setdefault(data.get("location") or self.default_site, []).append(data)
+        return sorted(groups.items(), key=lambda group: group[0] != self.bot.active_site)
+
+    def ensure_site(self, site_name):
+        if site_name == self.bot.active_site:
+            return True
+        if not self.bot.select_site(site_name):
+            return False
+        self.site_switches += 1
+        return True
+
+    def order_rows(self, site_name, rows):
+        if not self.bot.is_site_index_valid(site_name):
+            return list(rows)
+
+        rows = list(rows)
+        # One pass over the whole batch with the site's address index
+        matches = self.bot.address_index.match_batch(rows)
+
+        def position(file_order):
+            entry = matches[file_order].entry
+            if entry is None:
+                return (1, 0, 0, file_order)
+            return (0, entry["page"], entry["row"], file_order)
+
+        return [rows[file_order] for file_order in sorted(range(len(rows)), key=position)]
+
+    def run_site(self, site_name, rows, journal=None):
+        if self.session_failed or not self.ensure_site(site_name):
+            error_kind = self._failure_kind()
+            print(f"Error: Unable to select site {site_name}, deferring {len(rows)} rows")
+            self.recover(error_kind)
+            for data in rows:
+                self.retry_queue.defer(site_name, data, error_kind)
+            return []
+        if not self.bot.is_site_index_valid(site_name):
+            self.bot.build_site_index(site_name)
+
+        outcomes = []
+        for data in self.order_rows(site_name, rows):
+            if self.session_failed:
+                self.retry_queue.defer(site_name, data, "session_lost")
+                continue
+            if self.bot.active_site != site_name and not self.ensure_site(site_name):
+                self.retry_queue.defer(site_name, data, self._failure_kind())
+                continue
+            if not self.bot.is_site_index_valid(site_name):
+                self.bot.build_site_index(site_name)
+            outcome, error_kind = self.attempt(site_name, data, journal)
+            if error_kind is None:
+                outcomes.append(outcome)
+            else:
+                self.retry_queue.defer(site_name, data, error_kind)
+        return outcomes
+
+    def attempt(self, site_name, data, journal=None):
+        """
+        ## Processes one row and classifies its failure.
+
+        - return: `(outcome, error_kind)`; `error_kind` is None when the row went through (or failed for a reason a
+          retry cannot fix, such as an address missing from the table or an exception that is not a WebDriver or
+          connection error, reported with the "error" status).
+        """
+        start = time.perf_counter()
+        try:
+            outcome = self.bot.process_row(data, journal)
+            error_kind = None
+            if outcome["status"] in RETRYABLE_STATUSES and (self.bot.last_error or {}).get("kind") is not None:
+                error_kind = self.bot.last_error["kind"]
+                print(f"Info: Row {outcome['key']} failed at {self.bot.last_error['step']} ({error_kind}), deferred")
+        except Exception as e:
+            print(f"Error @ run_site: {e}")
+            outcome = self.failed_outcome(data, site_name, "error")
+            error_kind = classify_error(e)
+            if error_kind is None:
+                # Not an error of the browser: a retry would raise it again, the row is reported as failed
+                outcome["error"] = f"{type(e).__name__}: {e}"
+                self.recover(None)
+                return outcome, None
+        if error_kind is not None:
+            self.recover(error_kind)
+        elif self.recycler is not None and outcome["status"] in FORM_PATH_STATUSES:
+            self.recycler.after_row(time.perf_counter() - start)
+            if self.recycler.restart_failed:
+                self.recover("session_lost")
+        return outcome, error_kind
+
+    def recover(self, error_kind):
+        """
+        ## Brings the bot back to a usable state after a failed row: re-login when the session is lost, reload otherwise.
+        """
+        if self.session_failed:
+            return
+        if error_kind == "session_lost" or self.bot.is_session_lost():
+            self.session_recoveries += 1
+            if not self.bot.recover_session():
+                print("Error: Unable to recover the session, the remaining rows are deferred")
+                self.session_failed = True
+        else:
+            self.bot.reset_page()
+
+    def drain_retries(self, journal=None):
+        if not len(self.retry_queue):
+            return []
+        print(f"Retrying {len(self.retry_queue)} deferred rows")
+        # A new pass gets a new chance to log in
+        self.session_failed = False
+
+        def process(site_name, data):
+            if self.session_failed:
+                self.recover("session_lost")
+            if self.session_failed or not self.ensure_site(site_name):
+                return self.failed_outcome(data, site_name, "site_not_selected"), self._failure_kind()
+            if not self.bot.is_site_index_valid(site_name):
+                self.bot.build_site_index(site_name)
+            return self.attempt(site_name, data, journal)
+
+        outcomes = self.retry_queue.drain(process)
+        print(f"Retry queue: {self.retry_queue.stats}")
+        return outcomes
+
+    def _failure_kind(self):
+        if self.session_failed:
+            return "session_lost"
+        return (self.bot.last_error or {}).get("kind") or "element_not_found"
+
+    @staticmethod
+    def failed_outcome(data, site_name, status):
+        """
+        ## Builds the outcome of a row that could not go through `FetcherBot.process_row`.
+        """
+        return {"key": row_key(data), "id": data.get("id", ""), "location": site_name, "status": status}
+
+    def run(self, rows, journal=None, drain=True):
+        outcomes = []
+        for site_name, site_rows in self.plan(rows):
+            outcomes.extend(self.run_site(site_name, site_rows, journal))
+        if drain:
+            outcomes.extend(self.drain_retries(journal))
+        return outcomes
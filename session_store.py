@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+
+
+# Keys accepted by the CDP `Network.setCookies` command
+CDP_COOKIE_KEYS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+# Restores the saved localStorage items of the page origin before any page script runs
+LOCAL_STORAGE_RESTORE_SCRIPT = """
+(function () {
+    var saved = %s;
+    var items = saved[window.location.origin];
+    if (!items) {
+        return;
+    }
+    try {
+        for (var key in items) {
+            if (window.localStorage.getItem(key) === null) {
+                window.localStorage.setItem(key, items[key]);
+            }
+        }
+    } catch (e) {}
+})();
+"""
+
+_store_lock = threading.Lock()
+
+
+class SessionStore:
+    """
+    ## SessionStore
+    #### Saves the authenticated Salesforce session (cookies and localStorage) to disk so later runs and parallel workers can skip the login.
+
+    #### Methods:
+
+    - `save(driver) -> bool`:
+        - Saves every browser cookie and the localStorage of the current page origin.
+        - Returns True if successful, False otherwise.
+
+    - `load() -> Optional[dict]`:
+        - Returns the saved session, or None when there is none or it has expired.
+
+    - `restore(driver) -> bool`:
+        - Loads the saved session into the browser without navigating.
+        - Returns True if a session was restored, False otherwise.
+
+    - `clear()`:
+        - Deletes the saved session.
+
+    #### Note:
+    - The file holds live session cookies: it is created readable by its owner only (0600), keep it out of version
+      control.
+    - `restore` keeps the identifier of the localStorage script it registers in each browser, and removes it before
+      registering a new one, so restoring again does not stack scripts on every page load.
+    - A session is considered expired after `max_age` seconds or when one of its cookies has expired. Salesforce can still
+      end a session earlier; `FetcherBot.start_session` detects that and logs in again.
+    """
+
+    def __init__(self, path="./.session/salesforce_session.json", max_age=2 * 60 * 60):
+        self.path = path
+        self.max_age = max_age
+        # Identifier of the localStorage restore script registered in each browser, by WebDriver session id
+        self._restore_scripts = {}
+
+    def save(self, driver):
+        try:
+            try:
+                cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+            except Exception:
+                # Not a Chromium driver, only the cookies of the current page are available
+                cookies = driver.get_cookies()
+            origin = driver.execute_script("return window.location.origin;")
+            local_storage = driver.execute_script(
+                "var items = {};"
+                "for (var i = 0; i < window.localStorage.length; i++) {"
+                "    var key = window.localStorage.key(i);"
+                "    items[key] = window.localStorage.getItem(key);"
+                "}"
+                "return items;")
+
+            with _store_lock:
+                session = self._read() or {"local_storage": {}}
+                session["saved_at"] = time.time()
+                session["cookies"] = cookies
+                session["local_storage"][origin] = local_storage
+                self._write(session)
+            print(f"Session saved to {self.path}")
+            return True
+        except Exception as e:
+            print(f"Error: Unable to save the session\n{e}")
+            return False
+
+    def load(self):
+        with _store_lock:
+            session = self._read()
+        if not session:
+            return None
+
+        now = time.time()
+        if now - session.get("saved_at", 0) > self.max_age:
+            print("Info: Saved session is too old")
+            return None
+        for cookie in session.get("cookies", []):
+            expires = cookie.get("expires", cookie.get("expiry", -1))
+            if expires is not None and 0 < expires < now:
+                print(f"Info: Saved session cookie {cookie.get('name')} has expired")
+                return None
+        return session
+
+    def restore(self, driver):
+        session = self.load()
+        if not session:
+            return False
+        try:
+            cookies = []
+            for cookie in session["cookies"]:
+                cookie = dict(cookie)
+                if "expiry" in cookie:
+                    cookie["expires"] = cookie.pop("expiry")
+                if cookie.get("expires", -1) in (-1, None):
+                    cookie.pop("expires", None)
+                cookies.append({key: cookie[key] for key in CDP_COOKIE_KEYS if key in cookie})
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+            previous = self._restore_scripts.pop(driver.session_id, None)
+            if previous is not None:
+                driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": previous})
+            script = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                "source": LOCAL_STORAGE_RESTORE_SCRIPT % json.dumps(session.get("local_storage", {}))})
+            self._restore_scripts[driver.session_id] = script["identifier"]
+            print(f"Session restored from {self.path}")
+            return True
+        except Exception as e:
+            print(f"Error: Unable to restore the session\n{e}")
+            return False
+
+    def clear(self):
+        with _store_lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as session_file:
+                return json.load(session_file)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            print(f"Error: Saved session {self.path} is unreadable\n{e}")
+            return None
+
+    def _write(self, session):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        # Created readable by its owner only, the cookies are never exposed to other users
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w",
+                       encoding="utf-8") as session_file:
+            json.dump(session, session_file)
+        # Atomic, so parallel workers never read a half written file
+        os.replace(temp_path, self.path)
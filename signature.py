@@ -0,0 +1,139 @@
+from functools import lru_cache
+
+from selenium.webdriver.common.action_chains import ActionChains
+
+
+# Key points of the signature stroke, as fractions of the canvas width and height
+SIGNATURE_STROKE = ((0.1, 0.6), (0.2, 0.3), (0.3, 0.7), (0.45, 0.35), (0.6, 0.65), (0.75, 0.4), (0.9, 0.55))
+
+# Reads the canvas pixels, null for a tainted canvas, and compares them with the pixels read before a stroke
+_PIXELS = """
+function pixels() {
+    try {
+        return new Uint32Array(canvas.getContext('2d').getImageData(0, 0, canvas.width, canvas.height).data.buffer);
+    } catch (e) {
+        // A tainted canvas cannot be read
+        return null;
+    }
+}
+// True when the canvas differs from `before` (a blank canvas, or one the widget filled with its background color),
+// false when either cannot be read
+function changed(before) {
+    var after = pixels();
+    if (!before || !after) {
+        return false;
+    }
+    for (var p = 0; p < after.length; p++) {
+        if (after[p] !== before[p]) {
+            return true;
+        }
+    }
+    return false;
+}
+"""
+
+# Replays the path of arguments[1] (fractions of the canvas size) on `canvas` as the pointer and mouse events a
+# signature widget listens for, in a single call. Returns {drawn, readable, points}: `drawn` is true once the canvas
+# pixels changed. It is false when the widget ignored the synthetic events, or when the canvas is tainted (`readable`
+# false) so the stroke cannot be confirmed: the caller then signs with real pointer input at `points`, the path in
+# client coordinates, and checks it with `SIGNATURE_CHECK_SCRIPT`.
+_REPLAY = _PIXELS + """
+var path = arguments[1];
+canvas.scrollIntoView({block: 'center', inline: 'center'});
+var rect = canvas.getBoundingClientRect();
+var points = [];
+for (var i = 0; i < path.length; i++) {
+    points.push({x: rect.left + rect.width * path[i][0], y: rect.top + rect.height * path[i][1]});
+}
+function fire(kind, type, point, buttons) {
+    var init = {bubbles: true, cancelable: true, view: window, clientX: point.x, clientY: point.y,
+                button: 0, buttons: buttons};
+    if (kind === 'pointer') {
+        init.pointerId = 1;
+        init.pointerType = 'mouse';
+        init.isPrimary = true;
+        canvas.dispatchEvent(new PointerEvent('pointer' + type, init));
+    } else {
+        canvas.dispatchEvent(new MouseEvent('mouse' + type, init));
+    }
+}
+var before = pixels();
+// Compared again by `SIGNATURE_CHECK_SCRIPT` after a stroke of real pointer input
+canvas.__fetcherBefore = before;
+var kinds = window.PointerEvent ? ['pointer', 'mouse'] : ['mouse'];
+for (var k = 0; k < kinds.length; k++) {
+    fire(kinds[k], 'down', points[0], 1);
+    for (var m = 1; m < points.length; m++) {
+        fire(kinds[k], 'move', points[m], 1);
+    }
+    fire(kinds[k], 'up', points[points.length - 1], 0);
+    if (changed(before)) {
+        return {drawn: true, readable: true, points: points};
+    }
+}
+return {drawn: false, readable: !!before, points: points};
+"""
+
+# Returns {drawn, readable} for the canvas pixels against the ones read by the replay
+_CHECK = _PIXELS + """
+var before = canvas.__fetcherBefore;
+return {drawn: changed(before), readable: !!(before && pixels())};
+"""
+
+# arguments[0] is the canvas element (WebDriver)
+SIGNATURE_SCRIPT = "var canvas = arguments[0];\n" + _REPLAY
+SIGNATURE_CHECK_SCRIPT = "var canvas = arguments[0];\n" + _CHECK
+
+
+def signature_script_by_locators(resolve_function, check=False):
+    """
+    ## Variant of `SIGNATURE_SCRIPT` (or of `SIGNATURE_CHECK_SCRIPT` with `check`) for callers that cannot pass an
+    element handle (CDP `Runtime.evaluate`): arguments[0] are the `LocatorRegistry.script_locators` of the canvas,
+    resolved by the `resolve` function of `resolve_function`.
+    """
+    return (resolve_function + "var canvas = resolve(arguments[0]);\n"
+            "if (!canvas) {\n    return {drawn: false, readable: false, points: null};\n}\n"
+            + (_CHECK if check else _REPLAY))
+
+
+@lru_cache(maxsize=None)
+def signature_path(stroke=SIGNATURE_STROKE, steps=6):
+    """
+    ## Precomputes the points replayed by `SIGNATURE_SCRIPT`: the key points of `stroke` with `steps` points
+    interpolated on every segment, so the widget receives a smooth stroke. Computed once per run.
+
+    - return: Tuple of `(x, y)` fractions of the canvas size.
+    """
+    path = [tuple(stroke[0])]
+    for (x1, y1), (x2, y2) in zip(stroke, stroke[1:]):
+        for step in range(1, steps + 1):
+            path.append((round(x1 + (x2 - x1) * step / steps, 4), round(y1 + (y2 - y1) * step / steps, 4)))
+    return tuple(path)
+
+
+def replay_signature(driver, canvas):
+    """
+    ## Signs `canvas` with one `execute_script` call (see `SIGNATURE_SCRIPT`).
+
+    - return: `{"drawn": bool, "readable": bool, "points": list}`; `drawn` is False when the canvas did not change or
+      cannot be read.
+    """
+    return driver.execute_script(SIGNATURE_SCRIPT, canvas, signature_path())
+
+
+def stroke_signature(driver, canvas):
+    """
+    ## Signs `canvas` with real pointer input (W3C actions), for the widgets that ignore synthetic events, then
+    compares the canvas with the pixels read by `replay_signature`, which must run first.
+
+    - return: `{"drawn": bool, "readable": bool}` (see `SIGNATURE_CHECK_SCRIPT`).
+    """
+    width, height = canvas.size["width"], canvas.size["height"]
+    # Offsets are relative to the center of the element
+    offsets = [(round((x - 0.5) * width), round((y - 0.5) * height)) for x, y in signature_path()]
+    actions = ActionChains(driver, duration=10)
+    actions.move_to_element_with_offset(canvas, *offsets[0]).click_and_hold()
+    for offset in offsets[1:]:
+        actions.move_to_element_with_offset(canvas, *offset)
+    actions.release().perform()
+    return driver.execute_script(SIGNATURE_CHECK_SCRIPT, canvas)
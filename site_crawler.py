@@ -0,0 +1,347 @@
+import argparse
+import csv
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from address_matcher import normalize_address
+from driver_pool import DriverPool
+from fetcher_bot import TableReadIncomplete
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # Parquet snapshots are optional, CSV snapshots need nothing
+    pyarrow = None
+
+
+# Columns of a snapshot, in file order
+COLUMNS = ("site", "page", "row", "address", "name", "status", "consent", "last_updated")
+
+# `data-title-text` of the table cell of each column read from the table
+TABLE_COLUMNS = {
+    "address": "Address",
+    "name": "Name",
+    "status": "Status",
+    "consent": "Consent",
+    "last_updated": "Last Updated",
+}
+
+# Columns compared by `SnapshotDiff`
+STATE_COLUMNS = ("name", "status", "consent", "last_updated")
+
+SNAPSHOT_FORMATS = ("csv", "parquet")
+
+
+class SiteRow:
+    """
+    ## SiteRow
+    #### One row of a site table. `__slots__` keep it to a fixed set of attributes (no per-row dictionary), so a crawl holds thousands of them cheaply.
+
+    #### Methods:
+
+    - `SiteRow.from_cells(site, page, row, cells: dict) -> SiteRow`:
+        - Builds a row from the cells of `FetcherBot.get_table_data`.
+
+    - `key -> str`:
+        - Normalized address (see `address_matcher.normalize_address`), used to compare snapshots.
+
+    - `state() -> tuple`:
+        - Values of `STATE_COLUMNS`.
+
+    - `values() -> tuple`:
+        - Values of `COLUMNS`.
+    """
+    __slots__ = COLUMNS
+
+    def __init__(self, site, page, row, address, name="", status="", consent="", last_updated=""):
+        self.site = site
+        self.page = int(page)
+        self.row = int(row)
+        self.address = address
+        self.name = name
+        self.status = status
+        self.consent = consent
+        self.last_updated = last_updated
+
+    @classmethod
+    def from_cells(cls, site, page, row, cells):
+        return cls(site, page, row, **{column: cells.get(title) or "" for column, title in TABLE_COLUMNS.items()})
+
+    @property
+    def key(self):
+        return normalize_address(self.address)
+
+    def state(self):
+        return tuple(getattr(self, column) for column in STATE_COLUMNS)
+
+    def values(self):
+        return tuple(getattr(self, column) for column in COLUMNS)
+
+
+class CsvSnapshotWriter:
+    """
+    ## Streams `SiteRow`s to a CSV file; every `write` is flushed, so an interrupted crawl keeps the pages already read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(row.values() for row in rows)
+        self._file.flush()
+        self.rows += len(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSnapshotWriter:
+    """
+    ## Streams `SiteRow`s to a Parquet file, one row group every `row_group_size` rows. Needs pyarrow.
+    """
+
+    def __init__(self, path, row_group_size=10000):
+        if pyarrow is None:
+            raise ValueError("Parquet snapshots need pyarrow (pip install pyarrow), use the csv format instead")
+        self.path = path
+        self.rows = 0
+        self.row_group_size = row_group_size
+        self.schema = pyarrow.schema([
+            (column, pyarrow.int32() if column in ("page", "row") else pyarrow.string()) for column in COLUMNS])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self._buffer = []
+
+    def write(self, rows):
+        self._buffer.extend(row.values() for row in rows)
+        self.rows += len(rows)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        columns = list(zip(*self._buffer))
+        self._writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema))
+        self._buffer = []
+
+
+def open_snapshot_writer(path):
+    """
+    ## Opens the snapshot writer matching the extension of `path` (".csv" or ".parquet").
+    """
+    if path.endswith(".parquet"):
+        return ParquetSnapshotWriter(path)
+    return CsvSnapshotWriter(path)
+
+
+def read_snapshot(path, batch_size=10000):
+    """
+    ## Streams the `SiteRow`s of a CSV or Parquet snapshot.
+
+    - return: Iterator of `SiteRow`.
+    """
+    if path.endswith(".parquet"):
+        if pyarrow is None:
+            raise ValueError(f"Reading {path} needs pyarrow (pip install pyarrow)")
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=batch_size):
+            for values in batch.to_pylist():
+                yield SiteRow(**values)
+        return
+    with open(path, newline="", encoding="utf-8") as file:
+        for values in csv.DictReader(file):
+            yield SiteRow(**values)
+
+
+class SnapshotDiff:
+    """
+    ## SnapshotDiff
+    #### Compares the rows of a crawl, as they are read, with the previous snapshot of the same site and streams the differences to a CSV file.
+
+    #### Methods:
+
+    - `update(rows: Iterable[SiteRow])`:
+        - Compares a page of rows with the previous snapshot.
+
+    - `close(complete: bool = True) -> dict`:
+        - Reports the addresses of the previous snapshot that were not seen again as removed and returns the counts.
+          With `complete` False (the crawl stopped before the last page) the unseen addresses are not reported.
+
+    #### Attributes:
+
+    - `self.counts`: Number of `added`, `removed`, `changed` and `unchanged` addresses.
+
+    #### Note:
+    - Only the `STATE_COLUMNS` of the previous snapshot are held in memory, keyed by normalized address.
+    """
+
+    def __init__(self, previous_path, diff_path):
+        self.previous = {row.key: (row.address, row.state()) for row in read_snapshot(previous_path)}
+        self.counts = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0}
+        self._file = open(diff_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(("change", "address")
+                              + tuple(f"{column}_before" for column in STATE_COLUMNS)
+                              + tuple(f"{column}_after" for column in STATE_COLUMNS))
+
+    def update(self, rows):
+        empty = ("",) * len(STATE_COLUMNS)
+        for row in rows:
+            _, before = self.previous.pop(row.key, (None, None))
+            after = row.state()
+            if before is None:
+                self._write("added", row.address, empty, after)
+            elif before != after:
+                self._write("changed", row.address, before, after)
+            else:
+                self.counts["unchanged"] += 1
+
+    def close(self, complete=True):
+        empty = ("",) * len(STATE_COLUMNS)
+        if complete:
+            for address, before in self.previous.values():
+                self._write("removed", address, before, empty)
+        self.previous = {}
+        self._file.close()
+        return self.counts
+
+    def _write(self, change, address, before, after):
+        self.counts[change] += 1
+        self._writer.writerow((change, address) + tuple(before) + tuple(after))
+
+
+class SiteCrawler:
+    """
+    ## SiteCrawler
+    #### Crawl mode: snapshots every site of the `site_select` dropdown, several sites at a time, with the logged-in bots of a `DriverPool`.
+
+    #### Methods:
+
+    - `crawl(sites: list = None) -> dict`:
+        - Crawls the given sites (every site of the dropdown by default) into a new `<output_dir>/<timestamp>/`
+          directory, one snapshot file per site, written page by page.
+        - When an earlier crawl has a snapshot of a site, the differences are written next to the new snapshot as
+          `<site>.diff.csv`.
+        - Returns a summary per site: number of `rows`, snapshot `path`, `diff` counts (None on a first crawl) and
+          whether the table was read to its last page (`complete`). An incomplete crawl has an `error`, its snapshot is
+          saved as `<site>.partial.<format>` so later crawls do not diff against it, and its diff reports no removals.
+
+    - `crawl_site(site_name: str, crawl_dir: str) -> dict`:
+        - Crawls one site with a bot leased from the pool.
+
+    - `previous_snapshot(site_name: str, crawl_dir: str) -> Optional[str]`:
+        - Path of the latest snapshot of the site older than `crawl_dir`.
+
+    #### Usage:
+    - `python site_crawler.py --url ... --username ... --password ... --workers 3 --format parquet`
+    """
+
+    def __init__(self, pool, output_dir="./snapshots", snapshot_format="csv"):
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format {snapshot_format!r}, expected one of {SNAPSHOT_FORMATS}")
+        if snapshot_format == "parquet" and pyarrow is None:
+            raise ValueError("Parquet snapshots need pyarrow (pip install pyarrow), use the csv format instead")
+        self.pool = pool
+        self.output_dir = output_dir
+        self.snapshot_format = snapshot_format
+
+    def list_sites(self):
+        with self.pool.lease() as bot:
+            return bot.list_sites()
+
+    def crawl(self, sites=None):
+        crawl_dir = os.path.join(self.output_dir, time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(crawl_dir, exist_ok=True)
+        sites = list(sites or self.list_sites())
+        print(f"Crawling {len(sites)} sites into {crawl_dir}")
+        with ThreadPoolExecutor(max_workers=self.pool.size) as executor:
+            summaries = executor.map(lambda site_name: self.crawl_site(site_name, crawl_dir), sites)
+            return dict(zip(sites, summaries))
+
+    def crawl_site(self, site_name, crawl_dir):
+        summary = {"rows": 0, "path": None, "diff": None, "complete": False}
+        try:
+            with self.pool.lease() as bot:
+                if not bot.select_site(site_name):
+                    summary["error"] = "site_not_selected"
+                    return summary
+                previous = self.previous_snapshot(site_name, crawl_dir)
+                summary["path"] = os.path.join(crawl_dir, f"{self._file_name(site_name)}.{self.snapshot_format}")
+                writer = open_snapshot_writer(summary["path"])
+                diff = SnapshotDiff(previous, os.path.join(crawl_dir, f"{self._file_name(site_name)}.diff.csv")) \
+                    if previous else None
+                try:
+                    for page_number, page_data in bot.iter_table_pages(site_name):
+                        rows = [SiteRow.from_cells(site_name, page_number, position, cells)
+                                for position, cells in enumerate(page_data) if cells.get("Address")]
+                        writer.write(rows)
+                        if diff is not None:
+                            diff.update(rows)
+                    summary["complete"] = True
+                finally:
+                    writer.close()
+                    summary["rows"] = writer.rows
+                    if diff is not None:
+                        summary["diff"] = diff.close(summary["complete"])
+                    if not summary["complete"]:
+                        partial_path = os.path.join(
+                            crawl_dir, f"{self._file_name(site_name)}.partial.{self.snapshot_format}")
+                        os.replace(summary["path"], partial_path)
+                        summary["path"] = partial_path
+                print(f"Site {site_name}: {writer.rows} rows, changes since the last crawl: {summary['diff']}")
+        except TableReadIncomplete as e:
+            print(f"Error: Crawl of site {site_name} stopped after {e.pages_read} of {e.page_count or '?'} pages")
+            summary["error"] = f"incomplete: {e.pages_read} of {e.page_count or '?'} pages read"
+        except Exception as e:
+            print(f"Error: Unable to crawl site {site_name}\n{e}")
+            summary["error"] = str(e)
+        return summary
+
+    def previous_snapshot(self, site_name, crawl_dir):
+        current = os.path.basename(os.path.normpath(crawl_dir))
+        if not os.path.isdir(self.output_dir):
+            return None
+        for name in sorted(os.listdir(self.output_dir), reverse=True):
+            if name >= current:
+                continue
+            for snapshot_format in SNAPSHOT_FORMATS:
+                path = os.path.join(self.output_dir, name, f"{self._file_name(site_name)}.{snapshot_format}")
+                if os.path.exists(path):
+                    return path
+        return None
+
+    @staticmethod
+    def _file_name(site_name):
+        return re.sub(r"[^\w.-]", "_", site_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot every site table of the Bell consent org")
+    parser.add_argument("--url", required=True, help="login page")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--workers", type=int, default=2, help="browsers crawling sites at the same time")
+    parser.add_argument("--sites", nargs="*", help="sites to crawl (every site of the dropdown by default)")
+    parser.add_argument("--output", default="./snapshots", help="directory of the snapshots")
+    parser.add_argument("--format", default="csv", choices=SNAPSHOT_FORMATS)
+    parser.add_argument("--session-path", help="session file shared by the browsers (see session_store.py)")
+    parser.add_argument("--browser-profile", default="lean", choices=("default", "lean"))
+    args = parser.parse_args()
+
+    with DriverPool(args.url, args.username, args.password, size=args.workers, session_path=args.session_path,
+                    profile=args.browser_profile).start() as driver_pool:
+        crawler = SiteCrawler(driver_pool, args.output, args.format)
+        for crawled_site, crawl_summary in crawler.crawl(args.sites).items():
+            print(f"{crawled_site}: {crawl_summary}")
@@ -0,0 +1,724 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from urllib.request import urlopen
+
+import websocket
+
+from address_matcher import AddressIndex, addresses_match
+from checkpoint_journal import STAGES
+from csv_stream import iter_batches
+from fetcher_bot import FORM_FILL_SCRIPT, TABLE_DATA_SCRIPT, FetcherBot, row_key
+from locators import RESOLVE_FUNCTION
+from retry_queue import RetryQueue, classify_error
+from scheduler import RETRYABLE_STATUSES, SiteScheduler
+from signature import signature_path, signature_script_by_locators
+from wait_engine import ANGULAR_IDLE_SCRIPT, TABLE_SIGNATURE_SCRIPT
+
+
+# arguments: locators, action ("exists", "click" or "select"), option text for "select".
+# Returns false when the element (or the option) is not on the page.
+ELEMENT_SCRIPT = RESOLVE_FUNCTION + """
+var element = resolve(arguments[0]);
+if (!element) {
+    return false;
+}
+if (arguments[1] === 'click') {
+    element.click();
+} else if (arguments[1] === 'select') {
+    var index = -1;
+    for (var o = 0; o < element.options.length; o++) {
+        if (element.options[o].text.trim() === arguments[2]) {
+            index = o;
+        }
+    }
+    if (index === -1) {
+        return false;
+    }
+    element.selectedIndex = index;
+    element.dispatchEvent(new Event('change', {bubbles: true}));
+} else if (arguments[1] === 'value') {
+    var selected = element.options ? element.options[element.selectedIndex] : null;
+    return selected ? selected.text.trim() : element.value;
+}
+return true;
+"""
+
+# Views of a tab, told apart by an element of the `LocatorRegistry` that only they show
+VIEWS = {"table": "site_select", "form_1": "form_language", "form_2": "signature_canvas"}
+
+# arguments: locators of the expected views by name (see `VIEWS`).
+# Returns the name of the expected view shown once the page is idle, null otherwise.
+VIEW_SCRIPT = RESOLVE_FUNCTION + """
+var views = arguments[0];
+var idle = function () {
+""" + ANGULAR_IDLE_SCRIPT + """
+};
+for (var view in views) {
+    if (resolve(views[view])) {
+        return idle() ? view : null;
+    }
+}
+return null;
+"""
+
+# Numbers of the pagination links currently shown
+PAGE_LINKS_SCRIPT = """
+var links = document.querySelectorAll('ul.pagination a');
+var pages = [];
+for (var i = 0; i < links.length; i++) {
+    var text = links[i].textContent.trim();
+    if (/^[0-9]+$/.test(text)) {
+        pages.push(parseInt(text, 10));
+    }
+}
+return pages;
+"""
+
+# Clicks the pagination link of arguments[0] (a page number, or "next")
+CLICK_PAGE_SCRIPT = """
+var links = document.querySelectorAll('ul.pagination a');
+for (var i = 0; i < links.length; i++) {
+    var matches = arguments[0] === 'next' ? links[i].parentNode.classList.contains('next')
+                                          : links[i].textContent.trim() === String(arguments[0]);
+    if (matches) {
+        links[i].click();
+        return true;
+    }
+}
+return false;
+"""
+
+# Signs the canvas found with the locators of arguments[0] (see `signature.SIGNATURE_SCRIPT`), and checks it after a
+# stroke of real pointer input
+SIGNATURE_SCRIPT = signature_script_by_locators(RESOLVE_FUNCTION)
+SIGNATURE_CHECK_SCRIPT = signature_script_by_locators(RESOLVE_FUNCTION, check=True)
+
+
+class CdpError(Exception):
+    """
+    ## Error answered by the browser to a DevTools protocol command.
+    """
+
+
+def classify_tab_error(error):
+    """
+    ## Classifies an exception raised by a tab step, like `retry_queue.classify_error` does for WebDriver errors.
+
+    - return: One of `retry_queue.ERROR_KINDS`, or None for an error a retry cannot fix.
+    """
+    if isinstance(error, ConnectionError):
+        # The DevTools WebSocket is gone with the browser
+        return "session_lost"
+    if isinstance(error, TimeoutError):
+        return "timeout"
+    if isinstance(error, CdpError):
+        # A script failed on the page, e.g. on an element that is not there
+        return "element_not_found"
+    return classify_error(error)
+
+
+class CdpConnection:
+    """
+    ## CdpConnection
+    #### Asyncio connection to the browser-wide DevTools (CDP) WebSocket. Commands of every tab are multiplexed over it by session id, so many commands can be in flight at once.
+
+    #### Methods:
+
+    - `connect(debugger_address: str) -> CdpConnection` (coroutine, classmethod):
+        - Opens the WebSocket of the browser listening on `debugger_address` ("host:port").
+
+    - `send(method: str, params: dict = None, session_id: str = None) -> dict` (coroutine):
+        - Sends a command and returns its result; raises `CdpError` when the browser answers an error.
+
+    - `close()` (coroutine):
+        - Closes the WebSocket.
+
+    #### Note:
+    - The WebSocket is a `websocket-client` connection, a dependency of Selenium. A thread reads it and hands the
+      answers to the event loop.
+    - Events are not subscribed to; page state is polled (see `AsyncTabBot.until`).
+    """
+
+    def __init__(self, socket, loop):
+        self._socket = socket
+        self._loop = loop
+        self._next_id = 0
+        self._pending = {}
+        self._closing = False
+        self._listener = threading.Thread(target=self._listen, name="cdp-listener", daemon=True)
+        self._listener.start()
+
+    @classmethod
+    async def connect(cls, debugger_address, timeout=30):
+        version = await asyncio.to_thread(
+            lambda: json.loads(urlopen(f"http://{debugger_address}/json/version", timeout=timeout).read()))
+        # Chrome refuses the WebSocket of a page origin unless started with --remote-allow-origins
+        socket = await asyncio.to_thread(
+            websocket.create_connection, version["webSocketDebuggerUrl"], timeout=timeout, suppress_origin=True)
+        # The listener blocks on the socket until the browser answers
+        socket.settimeout(None)
+        return cls(socket, asyncio.get_running_loop())
+
+    async def send(self, method, params=None, session_id=None, timeout=60):
+        self._next_id += 1
+        message_id = self._next_id
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = self._loop.create_future()
+        self._pending[message_id] = future
+        try:
+            if not self._listener.is_alive():
+                raise ConnectionError("DevTools WebSocket closed")
+            self._socket.send(json.dumps(message))
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(message_id, None)
+        if "error" in response:
+            raise CdpError(f"{method}: {response['error'].get('message')}")
+        return response.get("result", {})
+
+    async def close(self):
+        self._closing = True
+        try:
+            self._socket.send_close()
+            # The listener stops on the browser's closing frame
+            await asyncio.to_thread(self._listener.join, 5)
+        except Exception:
+            pass
+        self._socket.shutdown()
+
+    def _resolve(self, message):
+        future = self._pending.get(message.get("id"))
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    def _fail_pending(self, error):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _listen(self):
+        error = ConnectionError("DevTools WebSocket closed")
+        try:
+            while True:
+                # Pings are answered by `recv`, a closing frame returns an empty message
+                data = self._socket.recv()
+                if not data:
+                    break
+                self._loop.call_soon_threadsafe(self._resolve, json.loads(data))
+        except Exception as e:
+            if not self._closing:
+                error = ConnectionError(f"DevTools WebSocket failed: {e}")
+        try:
+            self._loop.call_soon_threadsafe(self._fail_pending, error)
+        except RuntimeError:
+            # The event loop is already closed
+            pass
+
+
+class CdpTab:
+    """
+    ## CdpTab
+    #### One browser tab driven over a `CdpConnection` session.
+
+    #### Methods:
+
+    - `open(connection: CdpConnection, url: str = "about:blank") -> CdpTab` (coroutine, classmethod):
+        - Creates a tab and attaches a session to it.
+
+    - `execute_script(script: str, *args)` (coroutine):
+        - Runs `script` like `WebDriver.execute_script`: the body of a function called with `arguments`, whose JSON
+          return value is returned.
+
+    - `navigate(url: str)` (coroutine) / `close()` (coroutine)
+    """
+
+    def __init__(self, connection, target_id, session_id, number=0):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+        self.number = number
+        # Table state of the tab (see `AsyncTabBot.ensure_table`)
+        self.site = None
+        self.current_page = None
+        # Like `FetcherBot.last_error` and `FetcherBot.last_match`, for the row the tab is processing
+        self.last_error = None
+        self.last_match = None
+
+    @classmethod
+    async def open(cls, connection, url="about:blank", number=0):
+        target = await connection.send("Target.createTarget", {"url": url})
+        session = await connection.send("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+        return cls(connection, target["targetId"], session["sessionId"], number)
+
+    async def send(self, method, params=None, timeout=60):
+        return await self.connection.send(method, params, self.session_id, timeout)
+
+    async def execute_script(self, script, *args):
+        expression = f"(function () {{\n{script}\n}}).apply(null, {json.dumps(list(args))})"
+        result = await self.send("Runtime.evaluate", {"expression": expression, "returnByValue": True})
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CdpError(details.get("exception", {}).get("description") or details.get("text"))
+        return result["result"].get("value")
+
+    async def navigate(self, url):
+        await self.send("Page.navigate", {"url": url})
+        self.current_page = None
+
+    async def close(self):
+        await self.connection.send("Target.closeTarget", {"targetId": self.target_id})
+
+
+class AsyncTabBot:
+    """
+    ## AsyncTabBot
+    #### Asyncio backend that drives several tabs of one logged-in browser over CDP, so K rows are processed at once with one login and one browser's memory.
+
+    #### Methods (coroutines taking the `CdpTab` to work in, mirroring `FetcherBot`):
+
+    - `select_site(tab, site_name: str) -> bool`:
+        - Selects the site in the tab's table.
+
+    - `find_matching_address_from_table(tab, data: dict) -> bool`:
+        - Opens the row of the address, jumping to its page with the site index and scanning the table otherwise.
+
+    - `update_site(tab, data: dict) -> bool`:
+        - Fills form 1 with `FORM_FILL_SCRIPT` and submits it.
+
+    - `check_if_form_2_required(tab) -> bool` / `draw_signature(tab) -> bool`:
+        - Signs form 2 with a stroke of pointer events, drawn again with real mouse input when the widget ignores them,
+          and saves it.
+
+    - `process_row(tab, data: dict, journal=None) -> dict`:
+        - Same steps, journal records and outcome as `FetcherBot.process_row`; the failure is recorded in
+          `tab.last_error` (see `classify_tab_error`).
+
+    - `run(rows: Iterable[dict], journal=None) -> list`:
+        - Opens the tabs and processes the rows, site by site, with one worker per tab. Rows failing with a classified
+          error are tried again after the backoff of `self.retry_queue`. Returns the row outcomes.
+
+    #### Attributes:
+
+    - `self.bot`:
+        - The logged-in `FetcherBot` whose browser is shared. Its own window builds the site indexes (see
+          `FetcherBot.build_site_index`, including the direct data mode), in a thread while the tabs keep working.
+
+    #### Note:
+    - The tabs open the URL of the Lightning iframe directly, they share the browser's cookies and therefore its session.
+    - The browser must expose its DevTools endpoint; Chrome started by chromedriver does (`goog:chromeOptions.debuggerAddress`).
+    """
+
+    def __init__(self, bot, debugger_address, frame_url, tabs=4, default_site=None, batch_size=50):
+        self.bot = bot
+        self.debugger_address = debugger_address
+        self.frame_url = frame_url
+        self.tab_count = tabs
+        self.default_site = default_site
+        self.batch_size = batch_size
+        self.metrics = bot.metrics
+        self.waits = bot.waits
+        self.poll_frequency = bot.waits.poll_frequency
+        self.site_indexes = {}
+        self.retry_queue = RetryQueue()
+        self._index_lock = None
+
+    @classmethod
+    def from_bot(cls, bot, tabs=4, default_site=None, batch_size=50):
+        """
+        ## Builds the backend from a `FetcherBot` that went through `start_session`.
+        """
+        debugger_address = bot.driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+        bot.locators.leave_frame()
+        frame_url = bot.locators.find("lightning_iframe", timeout=120).get_attribute("src")
+        return cls(bot, debugger_address, frame_url, tabs, default_site, batch_size)
+
+    async def until(self, tab, name, script, timeout=10, *args):
+        """
+        ## Polls `script` in the tab until it returns a truthy value; the latency is recorded in `self.waits` as "tab.<name>".
+
+        - return: The value returned by the script. Raises TimeoutError when it is not met in time.
+        """
+        start = time.perf_counter()
+        while True:
+            try:
+                value = await tab.execute_script(script, *args)
+            except CdpError:
+                # The document is being replaced
+                value = None
+            if value:
+                self.waits.record(f"tab.{name}", time.perf_counter() - start)
+                return value
+            if time.perf_counter() - start > timeout:
+                self.waits.record(f"tab.{name}", time.perf_counter() - start, timed_out=True)
+                raise TimeoutError(f"Tab {tab.number}: condition '{name}' not met after {timeout} seconds")
+            await asyncio.sleep(self.poll_frequency)
+
+    async def element(self, tab, name, action="exists", value=None):
+        return await tab.execute_script(ELEMENT_SCRIPT, self.bot.locators.script_locators(name), action, value)
+
+    def view_locators(self, views):
+        return {view: self.bot.locators.script_locators(VIEWS[view]) for view in views}
+
+    async def click_and_wait_for_view(self, tab, views, script, *args, timeout=60):
+        """
+        ## Runs a script that moves the tab to another view (e.g. a click) and waits until one of `views` is shown and idle.
+        #### The views are recognized by their elements (see `VIEWS`), so a new document and an in-app route change are
+        waited for alike.
+
+        - param views: Names of the views the script may lead to.
+
+        - return: True if the script reported success and one of `views` is shown.
+        """
+        if not await tab.execute_script(script, *args):
+            return False
+        await self.until(tab, "view_changed", VIEW_SCRIPT, timeout, self.view_locators(views))
+        tab.current_page = None
+        return True
+
+    async def ensure_table(self, tab, site_name):
+        """
+        ## Makes the tab show the table of the site with 100 rows per page, loading the table page when needed.
+        """
+        if tab.site == site_name and tab.current_page is not None:
+            return True
+        if not await self.element(tab, "site_select"):
+            await tab.navigate(self.frame_url)
+            await self.until(tab, "table_loaded", VIEW_SCRIPT, 120, self.view_locators(("table",)))
+            tab.site = None
+        if not await self.select_site(tab, site_name):
+            return False
+        # Like `FetcherBot.click_100_views_button`, the rows may not change when the table already shows 100 per page
+        if await self.element(tab, "page_size_100", "click"):
+            await self.until(tab, "angular_idle", ANGULAR_IDLE_SCRIPT)
+        tab.current_page = 1
+        return True
+
+    async def select_site(self, tab, site_name):
+        try:
+            if await self.element(tab, "site_select", "value") != site_name:
+                if not await self.element(tab, "site_select", "select", site_name):
+                    print(f"Error: Tab {tab.number}: site {site_name} is not in the site list")
+                    return False
+                await self.until(tab, "angular_idle", ANGULAR_IDLE_SCRIPT)
+            tab.site = site_name
+            tab.current_page = 1
+            return True
+        except Exception as e:
+            print(f"Exception @ select_site (tab {tab.number})\n{e}")
+            return False
+
+    async def click_and_wait_for_rows(self, tab, script, *args):
+        """
+        ## Runs a paging script and waits until the table shows new rows.
+
+        - return: True if the script reported success.
+        """
+        previous_signature = await tab.execute_script(TABLE_SIGNATURE_SCRIPT)
+        if not await tab.execute_script(script, *args):
+            return False
+
+        async def rows_changed():
+            return await tab.execute_script(ANGULAR_IDLE_SCRIPT) and \
+                await tab.execute_script(TABLE_SIGNATURE_SCRIPT) != previous_signature
+
+        start = time.perf_counter()
+        while not await rows_changed():
+            if time.perf_counter() - start > 10:
+                self.waits.record("tab.table_rows_changed", time.perf_counter() - start, timed_out=True)
+                print(f"Warning: Tab {tab.number}: the table rows did not change after 10 seconds")
+                return True
+            await asyncio.sleep(self.poll_frequency)
+        self.waits.record("tab.table_rows_changed", time.perf_counter() - start)
+        return True
+
+    async def go_to_table_page(self, tab, page_number):
+        """
+        ## Displays the given page, clicking its pagination link or the furthest link before it.
+        """
+        while tab.current_page != page_number:
+            pages = await tab.execute_script(PAGE_LINKS_SCRIPT)
+            if page_number in pages:
+                target = page_number
+            else:
+                forward = [page for page in pages if (tab.current_page or 0) < page < page_number]
+                if not forward:
+                    return False
+                target = max(forward)
+            if not await self.click_and_wait_for_rows(tab, CLICK_PAGE_SCRIPT, target):
+                return False
+            tab.current_page = target
+        return True
+
+    async def open_row(self, tab, row, address):
+        if not row["goTo"]:
+            return False
+        print(f'Tab {tab.number}: found matching address {address}:\n{row["cells"]}')
+        return await self.click_and_wait_for_view(
+            tab, ("form_1", "form_2"), "var button = document.querySelector('button[data-fetcher-row=\"' + arguments[0] + '\"]');"
+                 "if (!button) { return false; } button.click(); return true;", row["goTo"])
+
+    async def find_matching_address_from_table(self, tab, data, max_attempts=100):
+        address = FetcherBot.normalize_address_key(data['streetNumber'], data['streetName'])
+        address_index = self.site_indexes.get(tab.site) or AddressIndex()
+        try:
+            tab.last_match = match = address_index.match(data['streetNumber'], data['streetName'])
+            # A partial index (see `FetcherBot.build_site_index`) does not hold every address of the table
+            missing_from_partial = match.status == "no_match" and not address_index.complete
+            if len(address_index) and match.status != "exact" and not missing_from_partial:
+                print(f"Address {address} is {match.status.replace('_', ' ')} in the index of site {tab.site}")
+                return False
+            entry = match.entry
+            if entry is not None and await self.go_to_table_page(tab, entry["page"]):
+                rows = json.loads(await tab.execute_script(TABLE_DATA_SCRIPT))
+                if entry["row"] < len(rows) and \
+                        addresses_match(rows[entry["row"]]["cells"].get("Address", ""), match.candidates[0][1]):
+                    return await self.open_row(tab, rows[entry["row"]], address)
+                print(f"Info: Tab {tab.number}: indexed position is out of date, scanning the table")
+
+            # Scan the table from the first page
+            if tab.current_page != 1:
+                tab.current_page = None
+                if not await self.ensure_table(tab, tab.site) or not await self.go_to_table_page(tab, 1):
+                    return False
+            for _ in range(max_attempts):
+                for row in json.loads(await tab.execute_script(TABLE_DATA_SCRIPT)):
+                    if addresses_match(row["cells"].get("Address", ""), address):
+                        return await self.open_row(tab, row, address)
+                if not await self.click_and_wait_for_rows(tab, CLICK_PAGE_SCRIPT, "next"):
+                    break
+                tab.current_page += 1
+            print(f"Address {address} not found")
+            return False
+        except Exception as e:
+            print(f"Error @ find_matching_address_from_table (tab {tab.number}): {e}")
+            self._record_error(tab, "find_matching_address_from_table", e)
+            tab.current_page = None
+            return False
+
+    async def update_site(self, tab, data):
+        try:
+            await self.until(tab, "form_loaded", "return !!document.getElementsByName('language').length && (function () {\n"
+                             + ANGULAR_IDLE_SCRIPT + "\n})();", 20)
+            fields = FetcherBot._form_1_fields(data)
+            payload = [
+                {"key": key, "kind": kind, "value": value, "locators": self.bot.locators.script_locators(locator)}
+                for key, locator, kind, value in fields
+            ]
+            # The form may still re-render after the first pass (e.g. the Consent select), fill it at most twice
+            for _ in range(2):
+                result = json.loads(await tab.execute_script(FORM_FILL_SCRIPT, payload))
+                mismatches = {
+                    key: result.get(key) for key, _, _, value in fields
+                    if (result.get(key) or "").strip() != value.strip()
+                }
+                if not mismatches:
+                    break
+                await self.until(tab, "angular_idle", ANGULAR_IDLE_SCRIPT)
+            else:
+                print(f"Error: Tab {tab.number}: form 1 not filled: {mismatches}")
+                return False
+
+            await self.until(tab, "angular_idle", ANGULAR_IDLE_SCRIPT)
+            # The form moves on (to form 2 or back to the table) once the submission is saved
+            return await self.click_and_wait_for_view(
+                tab, ("form_2", "table"), ELEMENT_SCRIPT, self.bot.locators.script_locators("form_submit"), "click")
+        except Exception as e:
+            print(f"Error @ update_site (tab {tab.number}): {e}")
+            self._record_error(tab, "update_site", e)
+            return False
+
+    async def check_if_form_2_required(self, tab):
+        try:
+            return bool(await self.element(tab, "signature_canvas"))
+        except Exception as e:
+            print(e)
+            return False
+
+    async def draw_signature(self, tab):
+        try:
+            locators = self.bot.locators.script_locators("signature_canvas")
+            result = await tab.execute_script(SIGNATURE_SCRIPT, locators, signature_path())
+            if not result or not result["points"]:
+                print(f"Error @ draw_signature (tab {tab.number}): the signature canvas is not on the page")
+                return False
+            if not result["drawn"]:
+                # The widget ignored the synthetic events, or the canvas cannot be read
+                await self.stroke_signature(tab, result["points"])
+                result = await tab.execute_script(SIGNATURE_CHECK_SCRIPT, locators)
+            if result["readable"] and not result["drawn"]:
+                print(f"Error @ draw_signature (tab {tab.number}): the signature canvas is still blank")
+                return False
+            if not result["readable"]:
+                print(f"Warning: Tab {tab.number}: the signature canvas cannot be read, "
+                      "saving the mouse stroke unconfirmed")
+            await self.until(tab, "angular_idle", ANGULAR_IDLE_SCRIPT)
+            return await self.click_and_wait_for_view(
+                tab, ("table", "form_1"), ELEMENT_SCRIPT, self.bot.locators.script_locators("signature_save"), "click")
+        except Exception as e:
+            print(f"Error @ draw_signature (tab {tab.number}): {e}")
+            self._record_error(tab, "draw_signature", e)
+            return False
+
+    async def stroke_signature(self, tab, points):
+        """
+        ## Draws the stroke through `points` (client coordinates) with real mouse input (CDP `Input.dispatchMouseEvent`).
+        """
+        def mouse(kind, point, buttons):
+            return tab.send("Input.dispatchMouseEvent", {"type": kind, "x": point["x"], "y": point["y"],
+                                                         "button": "left", "buttons": buttons, "clickCount": 1})
+
+        await mouse("mousePressed", points[0], 1)
+        for point in points[1:]:
+            await mouse("mouseMoved", point, 1)
+        await mouse("mouseReleased", points[-1], 0)
+
+    @staticmethod
+    def _record_error(tab, step, error):
+        tab.last_error = {"step": step, "kind": classify_tab_error(error),
+                          "message": str(error).strip().split("\n")[0]}
+
+    async def process_row(self, tab, data, journal=None, skip_unchanged=True):
+        checkpoint = row_key(data)
+        outcome = FetcherBot.row_outcome(data)
+        tab.last_error = None
+        tab.last_match = None
+        # The journal is SQLite: its calls run in a thread so the other tabs keep going
+        if journal is not None and await asyncio.to_thread(journal.is_finished, checkpoint):
+            print(f"Row {checkpoint} already updated, skipping")
+            outcome["status"] = "already_done"
+            return outcome
+        address_index = self.site_indexes.get(tab.site) or AddressIndex()
+        if skip_unchanged and self.bot.is_row_unchanged(data, address_index):
+            print(f"Row {checkpoint} already in its target state, skipping")
+            outcome["status"] = "unchanged"
+            return outcome
+
+        if not await self.find_matching_address_from_table(tab, data):
+            return FetcherBot.report_not_found(outcome, tab.last_match)
+        stage = await asyncio.to_thread(journal.stage_of, checkpoint) if journal is not None else None
+        if journal is not None and not stage:
+            await asyncio.to_thread(journal.record, checkpoint, "lookup")
+
+        if stage is not None and STAGES.index(stage) >= STAGES.index("form_1"):
+            print(f"Row {checkpoint}: form 1 already submitted, resuming at form 2")
+        else:
+            if not await self.update_site(tab, data):
+                print('Error: Site not updated, unable to submit form 1')
+                outcome["status"] = "form_1_failed"
+                return outcome
+            if journal is not None:
+                await asyncio.to_thread(journal.record, checkpoint, "form_1")
+
+        if not await self.check_if_form_2_required(tab):
+            if stage is not None and STAGES.index(stage) >= STAGES.index("form_2"):
+                # The row was left at form 2: it is finished only once signed
+                print(f'Error: Row {checkpoint} was left at form 2 but no signature canvas was found')
+                outcome["status"] = "signature_failed"
+                return outcome
+            outcome["status"] = "updated"
+            if journal is not None:
+                await asyncio.to_thread(journal.record, checkpoint, "form_1", True)
+            return outcome
+
+        if journal is not None:
+            await asyncio.to_thread(journal.record, checkpoint, "form_2")
+        if not await self.draw_signature(tab):
+            outcome["status"] = "signature_failed"
+            return outcome
+        outcome["status"] = "signed"
+        if journal is not None:
+            await asyncio.to_thread(journal.record, checkpoint, "signature", True)
+        return outcome
+
+    async def build_site_index(self, site_name):
+        """
+        ## Builds the index of a site once with `self.bot` (in a thread) and keeps a copy per site.
+        """
+        async with self._index_lock:
+            if site_name in self.site_indexes:
+                return
+            indexed = await asyncio.to_thread(
+                lambda: self.bot.select_site(site_name) and self.bot.build_site_index(site_name))
+            self.site_indexes[site_name] = self.bot.address_index if indexed else AddressIndex()
+
+    async def run(self, rows, journal=None):
+        self._index_lock = asyncio.Lock()
+        connection = await CdpConnection.connect(self.debugger_address)
+        tabs = []
+        outcomes = []
+        try:
+            for number in range(self.tab_count):
+                tabs.append(await CdpTab.open(connection, number=number))
+            scheduler = SiteScheduler(self.bot, default_site=self.default_site)
+            for batch in iter_batches(rows, self.batch_size):
+                for site_name, site_rows in scheduler.plan(batch):
+                    outcomes.extend(await self._run_site(tabs, site_name, site_rows, journal))
+        finally:
+            for tab in tabs:
+                try:
+                    await tab.close()
+                except Exception:
+                    pass
+            await connection.close()
+        return outcomes
+
+    async def _run_site(self, tabs, site_name, rows, journal):
+        await self.build_site_index(site_name)
+        address_index = self.site_indexes[site_name]
+        # Page order, so every tab moves forward through the table; a failed row comes back once its backoff is over
+        queue = asyncio.PriorityQueue()
+        order = itertools.count()
+        for data in sorted(rows, key=lambda item: self._position(address_index, item)):
+            queue.put_nowait((0.0, next(order), 1, data))
+        outcomes = []
+
+        async def worker(tab):
+            while not queue.empty():
+                ready_at, _, attempt, data = queue.get_nowait()
+                wait = ready_at - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                start = time.perf_counter()
+                tab.last_error = None
+                try:
+                    if not await self.ensure_table(tab, site_name):
+                        outcome = SiteScheduler.failed_outcome(data, site_name, "site_not_selected")
+                    else:
+                        outcome = await self.process_row(tab, data, journal)
+                except Exception as e:
+                    print(f"Error @ run_site (tab {tab.number}): {e}")
+                    self._record_error(tab, "run_site", e)
+                    tab.current_page = None
+                    outcome = SiteScheduler.failed_outcome(data, site_name, "error")
+                self.metrics.record("process_row", time.perf_counter() - start)
+                # Same retry rule as `SiteScheduler.attempt`: only the failures of a classified error are retried
+                kind = (tab.last_error or {}).get("kind")
+                if outcome["status"] not in RETRYABLE_STATUSES + ("error",):
+                    kind = None
+                if kind is not None:
+                    tab.current_page = None
+                    if attempt < self.retry_queue.max_attempts:
+                        self.retry_queue.stats[kind] += 1
+                        print(f"Info: Row {outcome['key']} failed at {tab.last_error['step']} ({kind}), deferred")
+                        queue.put_nowait((time.monotonic() + self.retry_queue.delay(attempt), next(order),
+                                          attempt + 1, data))
+                        continue
+                    self.retry_queue.stats["exhausted"] += 1
+                    outcome["error"] = kind
+                elif attempt > 1:
+                    self.retry_queue.stats["recovered"] += 1
+                outcome["attempts"] = attempt
+                outcomes.append(outcome)
+
+        await asyncio.gather(*(worker(tab) for tab in tabs))
+        return outcomes
+
+    @staticmethod
+    def _position(address_index, data):
+        entry = address_index.get(data['streetNumber'], data['streetName'])
+        return (0, entry["page"], entry["row"]) if entry else (1, 0, 0)
@@ -0,0 +1,265 @@
+from selenium.common.exceptions import TimeoutException
+
+from address_matcher import parse_address
+from locators import RESOLVE_FUNCTION
+from wait_engine import ANGULAR_IDLE_SCRIPT, TABLE_SIGNATURE_SCRIPT
+
+
+# Reads the ng-table pager in one round-trip. arguments[0] are the locators of the filter box.
+# ng-table always renders the first and the last page links, so the largest page number shown is the page count.
+# `api` is true when the NgTableParams of the pager scope can be called directly (AngularJS debug info enabled).
+PAGER_STATE_SCRIPT = RESOLVE_FUNCTION + """
+var state = {page: null, pages: null, hasNext: false, pageSize: null, pageSizes: [], filter: null, api: false};
+var pager = document.querySelector('ul.pagination');
+if (pager) {
+    var items = pager.querySelectorAll('li');
+    for (var i = 0; i < items.length; i++) {
+        var link = items[i].querySelector('a');
+        var text = link ? link.textContent.trim() : '';
+        if (/^[0-9]+$/.test(text)) {
+            var number = parseInt(text, 10);
+            state.pages = Math.max(state.pages || 0, number);
+            if (items[i].classList.contains('active')) {
+                state.page = number;
+            }
+        }
+    }
+    var next = pager.querySelector('li.next');
+    state.hasNext = !!(next && !next.classList.contains('disabled') && next.querySelector('a'));
+    var buttons = pager.querySelectorAll('button[ng-click^="params.count("]');
+    for (var b = 0; b < buttons.length; b++) {
+        var size = parseInt(/params\\.count\\(([0-9]+)\\)/.exec(buttons[b].getAttribute('ng-click'))[1], 10);
+        state.pageSizes.push(size);
+        if (buttons[b].classList.contains('active')) {
+            state.pageSize = size;
+        }
+    }
+    var scope = window.angular && window.angular.element(pager).scope ? window.angular.element(pager).scope() : null;
+    state.api = !!(scope && scope.params && typeof scope.params.page === 'function');
+    if (state.api && typeof scope.params.count === 'function') {
+        state.pageSize = scope.params.count();
+    }
+}
+var filter = resolve(arguments[0]);
+state.filter = filter ? filter.value : null;
+return state;
+"""
+
+# Displays page arguments[0]: through NgTableParams when available ("api"), else by clicking its link ("link"), else
+# by clicking the link shown closest to it ("hop"). Returns null when the pager has no page link.
+JUMP_PAGE_SCRIPT = """
+var target = arguments[0];
+var pager = document.querySelector('ul.pagination');
+if (!pager) {
+    return null;
+}
+var scope = window.angular && window.angular.element(pager).scope ? window.angular.element(pager).scope() : null;
+if (scope && scope.params && typeof scope.params.page === 'function') {
+    scope.$apply(function () {
+        scope.params.page(target);
+    });
+    return 'api';
+}
+var links = pager.querySelectorAll('a');
+var closest = null;
+var distance = null;
+for (var i = 0; i < links.length; i++) {
+    var text = links[i].textContent.trim();
+    if (!/^[0-9]+$/.test(text) || links[i].parentNode.classList.contains('active')) {
+        continue;
+    }
+    var number = parseInt(text, 10);
+    if (number === target) {
+        links[i].click();
+        return 'link';
+    }
+    if (distance === null || Math.abs(number - target) < distance) {
+        closest = links[i];
+        distance = Math.abs(number - target);
+    }
+}
+if (closest) {
+    closest.click();
+    return 'hop';
+}
+return null;
+"""
+
+# Clicks the page size button of arguments[0] rows
+CLICK_PAGE_SIZE_SCRIPT = """
+var button = document.querySelector('ul.pagination button[ng-click="params.count(' + arguments[0] + ')"]');
+if (!button) {
+    return false;
+}
+button.click();
+return true;
+"""
+
+# Types arguments[1] in the filter box found with the locators of arguments[0]; ng-table reloads the rows from the server
+SET_FILTER_SCRIPT = RESOLVE_FUNCTION + """
+var input = resolve(arguments[0]);
+if (!input) {
+    return false;
+}
+input.focus();
+input.value = arguments[1];
+input.dispatchEvent(new Event('input', {bubbles: true}));
+input.dispatchEvent(new Event('change', {bubbles: true}));
+input.blur();
+return true;
+"""
+
+
+class TableNavigator:
+    """
+    ## TableNavigator
+    #### Navigation layer of the ng-table of a site. Every decision is taken from one read of the pager (`state()`), so the bot knows the page count up front and never waits for a "next" button that is not there.
+
+    #### Methods:
+
+    - `state() -> dict`:
+        - Current `page`, page count (`pages`), `hasNext`, current `pageSize` and the available `pageSizes`, the value
+          of the filter box (`filter`, None when the table has none) and whether NgTableParams can be called (`api`).
+
+    - `ensure_page_size() -> bool`:
+        - Switches the table to its largest page size unless it already shows it. Sets `bot.table_page_size`.
+
+    - `go_to_page(page_number: int) -> bool`:
+        - Jumps to a page: through NgTableParams when available, otherwise by clicking its link, or the link closest to
+          it when it is not shown. Clears the filter first.
+
+    - `next_page() -> bool`:
+        - Clicks "next" and waits for the new rows; returns False right away on the last page.
+
+    - `apply_filter(text: str) -> bool`:
+        - Types `text` in the filter box of the Address column (the `table_filter` locators) so the server returns only
+          the matching rows. False when the table has no such filter box.
+
+    - `clear_filter() -> bool`:
+        - Empties the filter box when it holds a value.
+
+    #### Attributes:
+
+    - `self.stats`: Counts of `page_size_changes`, `filters`, page jumps by method (`api`, `link`, `hop`) and
+      `next_pages`.
+    """
+
+    def __init__(self, bot, max_hops=50):
+        self.bot = bot
+        self.max_hops = max_hops
+        self.stats = {"page_size_changes": 0, "filters": 0, "api": 0, "link": 0, "hop": 0, "next_pages": 0}
+
+    def state(self):
+        state = self.bot.driver.execute_script(PAGER_STATE_SCRIPT, self.bot.locators.script_locators("table_filter"))
+        # A table that fits on one page has no page link
+        state["pages"] = state["pages"] or 1
+        state["page"] = state["page"] or 1
+        return state
+
+    def page_count(self):
+        return self.state()["pages"]
+
+    @staticmethod
+    def filter_text(street_number, street_name=""):
+        """
+        ## Text typed in the filter box for an address: its civic number only, so a differently spelled street
+        name still reaches the rows, which are then matched with `address_matcher.addresses_match`.
+        """
+        return parse_address(street_number, street_name).number
+
+    def ensure_page_size(self):
+        state = self.state()
+        if not state["pageSizes"]:
+            return False
+        largest = max(state["pageSizes"])
+        if state["pageSize"] != largest:
+            previous_signature = self.bot.waits.table_signature()
+            if not self.bot.driver.execute_script(CLICK_PAGE_SIZE_SCRIPT, largest):
+                return False
+            self.stats["page_size_changes"] += 1
+
+            def resized(driver):
+                if not driver.execute_script(ANGULAR_IDLE_SCRIPT):
+                    return False
+                return (self.state()["pageSize"] == largest
+                        or driver.execute_script(TABLE_SIGNATURE_SCRIPT) != previous_signature)
+
+            try:
+                self.bot.waits.until("page_size_changed", resized)
+            except TimeoutException as e:
+                print(f"Warning: {e}")
+            self.bot.current_page = 1
+        self.bot.table_page_size = largest
+        return True
+
+    def go_to_page(self, page_number):
+        filter_cleared = resized = False
+        for _ in range(self.max_hops):
+            state = self.state()
+            if state["filter"]:
+                # A filter that cannot be cleared, or comes back, would be cleared on every hop
+                if filter_cleared or not self.clear_filter():
+                    print(f"Error: The table filter cannot be cleared, page {page_number} not reached")
+                    self.bot.current_page = None
+                    return False
+                filter_cleared = True
+                continue
+            if (self.bot.table_page_size and state["pageSize"]
+                    and state["pageSize"] != self.bot.table_page_size):
+                # The table was reloaded with its default page size, the indexed page numbers do not apply to it
+                if resized or not self.ensure_page_size():
+                    print(f"Error: The table keeps its page size of {state['pageSize']} rows, "
+                          f"page {page_number} not reached")
+                    self.bot.current_page = None
+                    return False
+                resized = True
+                continue
+            if state["page"] == page_number:
+                self.bot.current_page = page_number
+                return True
+            if page_number > state["pages"]:
+                return False
+            previous_signature = self.bot.waits.table_signature()
+            method = self.bot.driver.execute_script(JUMP_PAGE_SCRIPT, page_number)
+            if method is None:
+                return False
+            self.stats[method] += 1
+            self._wait_for_rows(previous_signature)
+        print(f"Error: Page {page_number} not reached after {self.max_hops} jumps")
+        self.bot.current_page = None
+        return False
+
+    def next_page(self):
+        state = self.state()
+        if not state["hasNext"]:
+            return False
+        previous_signature = self.bot.waits.table_signature()
+        self.bot.locators.find("next_page", cache=False).click()
+        self.stats["next_pages"] += 1
+        self._wait_for_rows(previous_signature)
+        self.bot.current_page = state["page"] + 1
+        return True
+
+    def apply_filter(self, text):
+        state = self.state()
+        if state["filter"] is None:
+            return False
+        if state["filter"] == text:
+            return True
+        previous_signature = self.bot.waits.table_signature()
+        if not self.bot.driver.execute_script(
+                SET_FILTER_SCRIPT, self.bot.locators.script_locators("table_filter"), text):
+            return False
+        self.stats["filters"] += 1
+        self._wait_for_rows(previous_signature)
+        self.bot.current_page = 1
+        return True
+
+    def clear_filter(self):
+        return self.apply_filter("")
+
+    def _wait_for_rows(self, previous_signature):
+        try:
+            self.bot.waits.table_rows_changed(previous_signature)
+        except TimeoutException as e:
+            print(f"Warning: {e}")
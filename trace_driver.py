@@ -0,0 +1,379 @@
+"""
+Record-and-replay harness for profiling the bot logic without a browser.
+
+A `RecordingExecutor` wraps the command executor of a live driver and writes every WebDriver command, its
+parameters (locators and scripts included), the response payload, its latency and the `Metrics` span that sent it to a
+JSON lines trace file, with typed text, cookies and session storage redacted. A `ReplayExecutor` serves that trace back
+to a `FetcherBot`, so the Python side of a run (matching, parsing, scheduling) can be profiled deterministically and
+the commands of every code path counted.
+
+    python benchmark.py --rows 50 --table-rows 400 --trace run.jsonl
+    python trace_driver.py summary run.jsonl
+    python trace_driver.py replay run.jsonl --feed run.feed.csv --profile
+"""
+import argparse
+import copy
+import cProfile
+import json
+import pstats
+import threading
+import time
+from collections import deque
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+
+# Commands whose parameters hold typed text: it is not written to the trace (passwords) and not part of the replay key
+_TYPED_TEXT_COMMANDS = ("sendKeysToElement", "sendKeysToActiveElement")
+_TYPED_TEXT_PARAMS = ("text", "value")
+
+# Commands whose parameters or responses hold the session cookies
+_COOKIE_COMMANDS = ("addCookie", "getCookie", "getCookies")
+# Chrome DevTools commands (sent as `executeCdpCommand`) holding cookies or an injected script
+_SECRET_CDP_COMMANDS = ("Network.getAllCookies", "Network.getCookies", "Network.setCookie", "Network.setCookies",
+                        "Storage.getCookies", "Storage.setCookies", "Page.addScriptToEvaluateOnNewDocument")
+_SCRIPT_COMMANDS = ("w3cExecuteScript", "w3cExecuteScriptAsync", "executeScript", "executeAsyncScript")
+# Scripts mentioning these read or write the saved storage of the session (see `SessionStore`)
+_STORAGE_MARKERS = ("localStorage", "sessionStorage")
+
+REDACTED = "<redacted>"
+
+
+def _redact_cookies(value):
+    # A cookie is a dictionary with a `name` and a `value`; it can be nested in lists and response dictionaries
+    if isinstance(value, list):
+        return [_redact_cookies(item) for item in value]
+    if isinstance(value, dict):
+        return {key: REDACTED if key == "value" and "name" in value else _redact_cookies(item)
+                for key, item in value.items()}
+    return value
+
+
+def _uses_storage(text):
+    return isinstance(text, str) and any(marker in text for marker in _STORAGE_MARKERS)
+
+
+def _is_secret(command, params):
+    params = params or {}
+    if command in _COOKIE_COMMANDS:
+        return True
+    if command == "executeCdpCommand":
+        return params.get("cmd") in _SECRET_CDP_COMMANDS
+    return command in _SCRIPT_COMMANDS and _uses_storage(params.get("script"))
+
+
+def redact_params(command, params):
+    """
+    ## Copy of the parameters of a command as written to a trace: typed text is replaced by its length, cookie values,
+    the arguments of storage scripts and the source of injected scripts by `REDACTED`.
+    """
+    params = copy.deepcopy(params or {})
+    if command in _TYPED_TEXT_COMMANDS:
+        for name in _TYPED_TEXT_PARAMS:
+            if isinstance(params.get(name), (str, list)):
+                params[name] = len(params[name])
+    if not _is_secret(command, params):
+        return params
+    if command in _SCRIPT_COMMANDS:
+        params["args"] = REDACTED
+        return params
+    params = _redact_cookies(params)
+    if command == "executeCdpCommand" and isinstance(params.get("params"), dict) and "source" in params["params"]:
+        params["params"]["source"] = REDACTED
+    return params
+
+
+def redact_response(command, params, response):
+    """
+    ## Copy of a command response as written to a trace: cookie values and the results of storage scripts are replaced
+    by `REDACTED`.
+    """
+    if not _is_secret(command, params):
+        return response
+    if command in _SCRIPT_COMMANDS and isinstance(response, dict):
+        return dict(response, value=REDACTED)
+    return _redact_cookies(response)
+
+
+class ReplayMismatch(WebDriverException):
+    """
+    ## Raised by `ReplayExecutor` for a command the trace has no response for: the replayed code took another path
+    than the recorded run.
+    """
+
+
+def command_key(command, params):
+    """
+    ## Replay key of a command: its name and canonical JSON parameters as recorded (see `redact_params`), without the
+    session id and typed text.
+    """
+    params = {name: value for name, value in redact_params(command, params).items() if name != "sessionId"
+              and not (command in _TYPED_TEXT_COMMANDS and name in _TYPED_TEXT_PARAMS)}
+    return command, json.dumps(params, sort_keys=True, default=str)
+
+
+def read_trace(path):
+    """
+    ## Streams the entries of a trace file: one "header" entry, then one "command" entry per WebDriver command.
+    """
+    with open(path, encoding="utf-8") as trace_file:
+        for line in trace_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class RecordingExecutor:
+    """
+    ## RecordingExecutor
+    #### Command executor writing every command sent through a driver to a trace file, then passing it on to the real executor.
+
+    #### Methods:
+
+    - `execute(command: str, params: dict) -> dict`:
+        - Sends the command and records `seq`, `command`, `params`, the raw `response` (or the `error`), `elapsed`
+          seconds and the innermost `span` of `metrics`.
+
+    - `close()`:
+        - Closes the real executor and the trace file (called by `driver.quit()`).
+
+    #### Note:
+    - A trace holds no credential and no live session (see `redact_params` and `redact_response`): the text of
+      `send_keys` is recorded as its length only, and cookie values, cookie commands of Chrome DevTools and the
+      arguments and results of the scripts reading or writing localStorage / sessionStorage are replaced by `REDACTED`.
+    - Every other attribute is read from the real executor.
+    """
+
+    def __init__(self, executor, path, metrics=None, capabilities=None, session_id=None):
+        self.executor = executor
+        self.path = path
+        self.metrics = metrics
+        self.commands = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "w", encoding="utf-8")
+        self._write({"type": "header", "recorded_at": time.time(), "capabilities": capabilities or {},
+                     "session_id": session_id})
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
+
+    def execute(self, command, params):
+        # The real executor removes the URL parameters (element id, session id) from `params`
+        recorded = redact_params(command, params)
+        span = self.metrics.current_span() if self.metrics is not None else None
+        start = time.perf_counter()
+        try:
+            response = self.executor.execute(command, params)
+        except Exception as e:
+            self._write_command(command, recorded, {"error": f"{type(e).__name__}: {e}"}, start, span)
+            raise
+        self._write_command(command, recorded, {"response": redact_response(command, recorded, response)}, start, span)
+        return response
+
+    def close(self):
+        try:
+            self.executor.close()
+        finally:
+            with self._lock:
+                self._file.close()
+
+    def _write_command(self, command, params, result, start, span):
+        with self._lock:
+            self.commands += 1
+            entry = {"type": "command", "seq": self.commands, "command": command, "params": params,
+                     "elapsed": time.perf_counter() - start, "span": span}
+            entry.update(result)
+            self._write(entry, locked=True)
+
+    def _write(self, entry, locked=False):
+        line = json.dumps(entry, default=str) + "\n"
+        if locked:
+            self._file.write(line)
+            self._file.flush()
+            return
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+
+class ReplayExecutor:
+    """
+    ## ReplayExecutor
+    #### Command executor answering every command from a trace file, with no browser.
+
+    #### Methods:
+
+    - `execute(command: str, params: dict) -> dict`:
+        - Returns the recorded responses of the same command and parameters in their recorded order; once only the last
+          one is left it is returned again (polled waits). Raises `ReplayMismatch` for a command that was not recorded.
+
+    #### Attributes:
+
+    - `self.stats`: Number of commands `served`, `repeated` (the last recorded response served again) and `missing`.
+    - `self.first_url`: Page of the first `get` command, where the recorded run started.
+
+    #### Note:
+    - `latency_scale` replays the recorded latency of each command multiplied by it (0, the default, replays as fast as
+      possible).
+    - New sessions and `quit` are answered without the trace.
+    """
+
+    def __init__(self, path, latency_scale=0.0):
+        self.path = path
+        self.latency_scale = latency_scale
+        self.header = {}
+        self.first_url = None
+        self.stats = {"served": 0, "repeated": 0, "missing": 0}
+        self._responses = {}
+        self._lock = threading.Lock()
+        for entry in read_trace(path):
+            if entry["type"] == "header":
+                self.header = entry
+                continue
+            if entry["command"] == "get" and self.first_url is None:
+                self.first_url = entry["params"].get("url")
+            self._responses.setdefault(command_key(entry["command"], entry["params"]), deque()).append(entry)
+
+    def execute(self, command, params):
+        if command == "newSession":
+            capabilities = dict(self.header.get("capabilities") or {})
+            capabilities.setdefault("browserName", "chrome")
+            return {"value": {"sessionId": self.header.get("session_id") or "replay", "capabilities": capabilities}}
+        if command == "quit":
+            return {"value": None}
+
+        with self._lock:
+            responses = self._responses.get(command_key(command, params))
+            if not responses:
+                self.stats["missing"] += 1
+                raise ReplayMismatch(f"No recorded response for {command} {params}")
+            entry = responses.popleft() if len(responses) > 1 else responses[0]
+            if entry.get("served"):
+                self.stats["repeated"] += 1
+            entry["served"] = True
+            self.stats["served"] += 1
+        if self.latency_scale:
+            time.sleep(entry["elapsed"] * self.latency_scale)
+        if "error" in entry:
+            raise WebDriverException(f"Recorded error: {entry['error']}")
+        # The driver unwraps the response in place
+        return copy.deepcopy(entry["response"])
+
+    def close(self):
+        pass
+
+
+def record_bot(bot, path):
+    """
+    ## Starts recording the WebDriver commands of `bot` (its browser is started if needed) to the trace file `path`.
+
+    - return: The `RecordingExecutor`; the trace is closed with `bot.quit()`.
+    """
+    driver = bot.driver
+    recorder = RecordingExecutor(driver.command_executor, path, bot.metrics, driver.caps, driver.session_id)
+    driver.command_executor = recorder
+    return recorder
+
+
+def replay_driver(path, latency_scale=0.0):
+    """
+    ## Remote WebDriver answering from the trace file `path` (see `ReplayExecutor`).
+    """
+    return webdriver.Remote(command_executor=ReplayExecutor(path, latency_scale), options=Options())
+
+
+def replay_bot(path, latency_scale=0.0, **kwargs):
+    """
+    ## `FetcherBot` driving a replay of the trace file `path`; `kwargs` are passed to `FetcherBot`.
+    """
+    from fetcher_bot import FetcherBot
+    return FetcherBot(driver=replay_driver(path, latency_scale), **kwargs)
+
+
+def summarize_trace(path):
+    """
+    ## Counts the commands of a trace and their recorded latency, per command and per span (code path).
+
+    - return: Dictionary with `commands`, `errors`, `recorded_seconds`, `by_command` and `by_span`
+      (`{name: {"count", "seconds"}}`).
+    """
+    summary = {"commands": 0, "errors": 0, "recorded_seconds": 0.0, "by_command": {}, "by_span": {}}
+    for entry in read_trace(path):
+        if entry["type"] != "command":
+            continue
+        summary["commands"] += 1
+        summary["errors"] += "error" in entry
+        summary["recorded_seconds"] += entry["elapsed"]
+        for group, name in (("by_command", entry["command"]), ("by_span", entry["span"] or "(no span)")):
+            counts = summary[group].setdefault(name, {"count": 0, "seconds": 0.0})
+            counts["count"] += 1
+            counts["seconds"] += entry["elapsed"]
+    return summary
+
+
+def print_summary(summary):
+    print(f"Commands: {summary['commands']} ({summary['errors']} errors), "
+          f"recorded WebDriver time {summary['recorded_seconds']:.2f}s")
+    for group in ("by_span", "by_command"):
+        print(f"\n{group[3:]:45} {'count':>7} {'seconds':>9}")
+        for name, counts in sorted(summary[group].items(), key=lambda item: -item[1]["count"]):
+            print(f"{name:45} {counts['count']:>7} {counts['seconds']:>9.3f}")
+
+
+def replay_run(path, feed_path, latency_scale=0.0, profile=False):
+    """
+    ## Replays a recorded `benchmark.py` / `SiteScheduler` run: logs in on the recorded page and processes `feed_path`.
+
+    - return: Tuple of the outcomes, the bot and the `pstats.Stats` of the run (None without `profile`).
+    """
+    from csv_stream import iter_csv_rows
+    from scheduler import SiteScheduler
+
+    bot = replay_bot(path, latency_scale)
+    url = bot.driver.command_executor.first_url
+    if not url or not bot.start_session(url, "replay", "replay"):
+        raise RuntimeError(f"The login of {path} could not be replayed")
+    profiler = cProfile.Profile() if profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        outcomes = SiteScheduler(bot).run(iter_csv_rows(feed_path))
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    return outcomes, bot, pstats.Stats(profiler) if profiler is not None else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize or replay a WebDriver trace of the bot")
+    commands = parser.add_subparsers(dest="action", required=True)
+    summary_parser = commands.add_parser("summary", help="commands and recorded latency per code path")
+    summary_parser.add_argument("trace")
+    replay_parser = commands.add_parser("replay", help="run the bot against the trace, with no browser")
+    replay_parser.add_argument("trace")
+    replay_parser.add_argument("--feed", required=True, help="CSV feed of the recorded run")
+    replay_parser.add_argument("--latency-scale", type=float, default=0.0,
+                               help="replay the recorded latencies multiplied by this factor")
+    replay_parser.add_argument("--profile", action="store_true", help="profile the run with cProfile")
+    args = parser.parse_args()
+
+    if args.action == "summary":
+        print_summary(summarize_trace(args.trace))
+    else:
+        start = time.perf_counter()
+        replay_outcomes, replay_fetcher, replay_stats = replay_run(args.trace, args.feed, args.latency_scale,
+                                                                   args.profile)
+        elapsed = time.perf_counter() - start
+        statuses = {}
+        for outcome in replay_outcomes:
+            statuses[outcome["status"]] = statuses.get(outcome["status"], 0) + 1
+        print(f"Replayed {len(replay_outcomes)} rows in {elapsed:.2f}s: {statuses}")
+        print(f"Replay: {replay_fetcher.driver.command_executor.stats}")
+        print(f"\n{'step':45} {'count':>6} {'mean s':>8} {'cmds':>7}")
+        for step_name, step in sorted(replay_fetcher.metrics.to_dict()["steps"].items()):
+            print(f"{step_name:45} {step['count']:>6} {step['mean']:>8.4f} {step['commands']:>7}")
+        if replay_stats is not None:
+            print()
+            replay_stats.sort_stats("cumulative").print_stats(25)
+        replay_fetcher.quit()
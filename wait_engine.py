@@ -0,0 +1,184 @@
+import time
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+# True once the document is loaded and AngularJS has no pending $http request and no digest in progress.
+# Pages without AngularJS are idle as soon as the document is loaded.
+ANGULAR_IDLE_SCRIPT = """
+if (document.readyState !== 'complete') {
+    return false;
+}
+if (!window.angular) {
+    return true;
+}
+var root = document.querySelector('[ng-app], [data-ng-app], .ng-scope') || document.body;
+var injector = window.angular.element(root).injector();
+if (!injector) {
+    return true;
+}
+if (injector.get('$http').pendingRequests.length) {
+    return false;
+}
+return !injector.get('$rootScope').$$phase;
+"""
+
+# Identifies the rows currently displayed by the table, used to notice that paging replaced them
+TABLE_SIGNATURE_SCRIPT = """
+var rows = [];
+var trs = document.getElementsByTagName('tr');
+for (var i = 0; i < trs.length; i++) {
+    if (trs[i].getElementsByTagName('td').length) {
+        rows.push(trs[i]);
+    }
+}
+if (!rows.length) {
+    return '0';
+}
+return rows.length + '|' + rows[0].innerText + '|' + rows[rows.length - 1].innerText;
+"""
+
+# Counts the XMLHttpRequests the page starts and finishes (installed on first use), so a submit is acknowledged by the
+# request it started even when that request is over before the first poll. Returns the number started so far.
+REQUEST_COUNTER_SCRIPT = """
+if (!window.__fetcherRequests) {
+    var counter = window.__fetcherRequests = {started: 0, finished: 0};
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        counter.started++;
+        this.addEventListener('loadend', function () {
+            counter.finished++;
+        });
+        return send.apply(this, arguments);
+    };
+}
+return window.__fetcherRequests.started;
+"""
+
+# arguments[0] is the number of requests started before the click; true once a later request is over
+REQUESTS_SETTLED_SCRIPT = """
+var counter = window.__fetcherRequests;
+return !!counter && counter.started > arguments[0] && counter.finished >= counter.started;
+"""
+
+
+class WaitEngine:
+    """
+    ## WaitEngine
+    #### Condition-driven waits shared by the `FetcherBot` steps, replacing fixed sleeps. Every wait is named and its latency is recorded, so `stats()` shows how long each step actually waits.
+
+    #### Named conditions:
+
+    - `angular_idle(timeout)`: the page is loaded and the Angular/ng-table digest has settled.
+    - `table_rows_changed(previous_signature, timeout)`: the table rows differ from `previous_signature` (taken with `table_signature()` before paging) and Angular is idle.
+    - `form_loaded(timeout)`: the site form is displayed and Angular is idle.
+    - `submit_acknowledged(button, requests_before, timeout)`: the page reacted to the click on `button`, with
+      `requests_before` taken by `request_mark()` right before the click.
+    - `login_complete(timeout)`: the login form is gone and the next page is loaded.
+
+    #### Note:
+    - Every condition raises `TimeoutException` when it is not met in time, like `WebDriverWait.until`.
+    """
+
+    def __init__(self, driver, poll_frequency=0.1):
+        self.driver = driver
+        self.poll_frequency = poll_frequency
+        self._stats = {}
+
+    def until(self, name, condition, timeout=10):
+        """
+        ## Waits until `condition(driver)` returns a truthy value and records the latency under `name`.
+
+        - param name: Name of the condition in `stats()`.
+        - param condition: Callable taking the driver.
+        - param timeout: Maximum number of seconds to wait.
+
+        - return: The value returned by the condition.
+        """
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(self.driver, timeout, poll_frequency=self.poll_frequency).until(condition)
+        except TimeoutException:
+            self.record(name, time.perf_counter() - start, timed_out=True)
+            raise TimeoutException(f"Condition '{name}' not met after {timeout} seconds")
+        self.record(name, time.perf_counter() - start)
+        return result
+
+    def angular_idle(self, timeout=10):
+        return self.until("angular_idle", lambda driver: driver.execute_script(ANGULAR_IDLE_SCRIPT), timeout)
+
+    def table_signature(self):
+        return self.driver.execute_script(TABLE_SIGNATURE_SCRIPT)
+
+    def table_rows_changed(self, previous_signature, timeout=10):
+        def rows_changed(driver):
+            if not driver.execute_script(ANGULAR_IDLE_SCRIPT):
+                return False
+            signature = driver.execute_script(TABLE_SIGNATURE_SCRIPT)
+            return signature if signature != previous_signature else False
+
+        return self.until("table_rows_changed", rows_changed, timeout)
+
+    def form_loaded(self, timeout=20):
+        def loaded(driver):
+            return bool(driver.find_elements(By.NAME, "language")) and driver.execute_script(ANGULAR_IDLE_SCRIPT)
+
+        return self.until("form_loaded", loaded, timeout)
+
+    def request_mark(self):
+        return self.driver.execute_script(REQUEST_COUNTER_SCRIPT)
+
+    def submit_acknowledged(self, button, requests_before=None, timeout=15):
+        # Acknowledged when the button leaves the page or is disabled, or once a request started by the click is over
+        # and Angular is idle. Without a `request_mark`, only a busy then idle page is seen.
+        state = {"busy": False}
+
+        def acknowledged(driver):
+            try:
+                if not button.is_displayed() or not button.is_enabled():
+                    return True
+            except StaleElementReferenceException:
+                return True
+            idle = driver.execute_script(ANGULAR_IDLE_SCRIPT)
+            if requests_before is not None:
+                return idle and driver.execute_script(REQUESTS_SETTLED_SCRIPT, requests_before)
+            if not idle:
+                state["busy"] = True
+            return idle and state["busy"]
+
+        return self.until("submit_acknowledged", acknowledged, timeout)
+
+    def login_complete(self, timeout=60):
+        def complete(driver):
+            return (not driver.find_elements(By.NAME, "username")
+                    and driver.execute_script("return document.readyState === 'complete';"))
+
+        return self.until("login_complete", complete, timeout)
+
+    def stats(self):
+        """
+        ## Returns the latency statistics of every named condition.
+
+        - return: Dictionary keyed by condition name with `count`, `timeouts`, `total`, `mean` and `max` (seconds).
+        """
+        return {
+            name: dict(stat, mean=stat["total"] / stat["count"] if stat["count"] else 0.0)
+            for name, stat in self._stats.items()
+        }
+
+    def print_stats(self):
+        for name, stat in sorted(self.stats().items()):
+            print(f"Wait '{name}': {stat['count']} waits, {stat['timeouts']} timeouts, "
+                  f"mean {stat['mean']:.3f}s, max {stat['max']:.3f}s")
+
+    def record(self, name, elapsed, timed_out=False):
+        """
+        ## Records the latency of a wait that did not go through `until` (e.g. the waits of `tab_bot.AsyncTabBot`).
+        """
+        stat = self._stats.setdefault(name, {"count": 0, "timeouts": 0, "total": 0.0, "max": 0.0})
+        stat["count"] += 1
+        stat["timeouts"] += int(timed_out)
+        stat["total"] += elapsed
+        stat["max"] = max(stat["max"], elapsed)
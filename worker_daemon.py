@@ -0,0 +1,415 @@
+"""
+Daemon mode: one warm, logged-in `FetcherBot` that processes CSV feeds from a local job queue all day long, so a feed
+no longer pays Chrome's start, the login and the site selection.
+
+Jobs come from a spool directory (CSV files dropped in `<spool>/incoming/`) or from a SQLite queue:
+
+    python worker_daemon.py serve --url ... --username ... --password ... --spool ./spool
+    python worker_daemon.py serve --url ... --username ... --password ... --queue ./.queue/jobs.sqlite3
+    python worker_daemon.py submit --queue ./.queue/jobs.sqlite3 feed.csv
+
+One daemon serves one queue. A job interrupted by a stop or a crash is queued again when the daemon restarts, and its
+checkpoint journal skips the rows it had already finished.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from checkpoint_journal import CheckpointJournal, remove_journal
+from csv_stream import iter_batches, iter_csv_rows
+from driver_pool import DriverPool
+from driver_recycler import DriverRecycler
+from fetcher_bot import FetcherBot
+from locators import DEFAULT_CONTEXT
+from scheduler import SiteScheduler
+from session_store import SessionStore
+
+
+# Sends a request to the server of the current frame, which extends the Salesforce session; returns the HTTP status
+KEEP_ALIVE_SCRIPT = """
+var done = arguments[arguments.length - 1];
+fetch(window.location.href, {method: 'HEAD', credentials: 'include', cache: 'no-store'})
+    .then(function (response) { done(response.status); }, function () { done(null); });
+"""
+
+Job = namedtuple("Job", ["id", "path"])
+Job.__doc__ = """
+## A queued CSV feed: the queue's `id` of the job and the `path` of the CSV file.
+"""
+
+
+class SpoolQueue:
+    """
+    ## SpoolQueue
+    #### Job queue on a spool directory: every CSV file dropped in `incoming/` is a job.
+
+    #### Methods:
+
+    - `submit(csv_path: str) -> str`:
+        - Copies a CSV file into `incoming/` (written under a temporary name, then renamed) and returns the job id.
+
+    - `claim() -> Optional[Job]`:
+        - Moves the oldest CSV file of `incoming/` to `processing/` and returns it, None when there is none. Files
+          modified less than `settle_seconds` ago are left alone, they may still be being written.
+
+    - `complete(job: Job, result: dict)` / `fail(job: Job, error: str)`:
+        - Moves the file to `done/` or `failed/`, next to a `<name>.json` file with the result or the error.
+
+    - `requeue_interrupted() -> int`:
+        - Moves the files left in `processing/` by a stopped daemon back to `incoming/`.
+    """
+
+    def __init__(self, spool_dir="./spool", settle_seconds=2.0):
+        self.spool_dir = spool_dir
+        self.settle_seconds = settle_seconds
+        self.incoming, self.processing, self.done, self.failed = (
+            os.path.join(spool_dir, name) for name in ("incoming", "processing", "done", "failed"))
+        for directory in (self.incoming, self.processing, self.done, self.failed):
+            os.makedirs(directory, exist_ok=True)
+
+    def submit(self, csv_path):
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.path.basename(csv_path)}"
+        partial = os.path.join(self.incoming, name + ".part")
+        shutil.copyfile(csv_path, partial)
+        os.replace(partial, os.path.join(self.incoming, name))
+        return name
+
+    def claim(self):
+        now = time.time()
+        drops = []
+        for name in os.listdir(self.incoming):
+            path = os.path.join(self.incoming, name)
+            if not name.lower().endswith(".csv"):
+                continue
+            try:
+                modified = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if now - modified >= self.settle_seconds:
+                drops.append((modified, name))
+        for _, name in sorted(drops):
+            try:
+                os.replace(os.path.join(self.incoming, name), os.path.join(self.processing, name))
+            except FileNotFoundError:
+                continue
+            return Job(name, os.path.join(self.processing, name))
+        return None
+
+    def complete(self, job, result):
+        self._finish(job, self.done, result)
+
+    def fail(self, job, error):
+        self._finish(job, self.failed, {"error": error})
+
+    def requeue_interrupted(self):
+        names = os.listdir(self.processing)
+        for name in names:
+            os.replace(os.path.join(self.processing, name), os.path.join(self.incoming, name))
+        return len(names)
+
+    def _finish(self, job, directory, report):
+        os.replace(job.path, os.path.join(directory, job.id))
+        with open(os.path.join(directory, f"{job.id}.json"), "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+class SqliteJobQueue:
+    """
+    ## SqliteJobQueue
+    #### Job queue in a SQLite table: jobs are paths of CSV files, claimed oldest first.
+
+    #### Methods:
+
+    - `submit(csv_path: str) -> int`:
+        - Queues a CSV file (by absolute path) and returns the job id.
+
+    - `claim() -> Optional[Job]`:
+        - Marks the oldest queued job as running and returns it, None when the queue is empty.
+
+    - `complete(job: Job, result: dict)` / `fail(job: Job, error: str)`:
+        - Marks the job as done or failed and stores the result (JSON) or the error.
+
+    - `requeue_interrupted() -> int`:
+        - Queues again the jobs left running by a stopped daemon.
+
+    - `summary() -> dict`:
+        - Counts the jobs by status.
+
+    #### Note:
+    - Like `CheckpointJournal`, every change is committed immediately (WAL journal); `submit` can be called from other
+      processes while the daemon runs.
+    """
+
+    def __init__(self, path="./.queue/jobs.sqlite3"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " csv_path TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'queued',"
+            " submitted_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " result TEXT)")
+        self._connection.commit()
+
+    def submit(self, csv_path):
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT INTO jobs (csv_path, submitted_at) VALUES (?, ?)", (os.path.abspath(csv_path), time.time()))
+            self._connection.commit()
+        return cursor.lastrowid
+
+    def claim(self):
+        with self._lock:
+            found = self._connection.execute(
+                "SELECT id, csv_path FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if found is None:
+                return None
+            self._connection.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), found[0]))
+            self._connection.commit()
+        return Job(*found)
+
+    def complete(self, job, result):
+        self._finish(job, "done", result)
+
+    def fail(self, job, error):
+        self._finish(job, "failed", {"error": error})
+
+    def requeue_interrupted(self):
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+            self._connection.commit()
+        return cursor.rowcount
+
+    def summary(self):
+        with self._lock:
+            return dict(self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _finish(self, job, status, report):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ? WHERE id = ?",
+                (status, time.time(), json.dumps(report), job.id))
+            self._connection.commit()
+
+
+class WorkerDaemon:
+    """
+    ## WorkerDaemon
+    #### Keeps one `FetcherBot` logged in and on its last site between jobs, and runs every job of a queue (`SpoolQueue` or `SqliteJobQueue`) through a `SiteScheduler`.
+
+    #### Methods:
+
+    - `start() -> bool`:
+        - Starts the browser and logs in (reusing the saved session of `session_path` when there is one), and queues
+          again the jobs of an interrupted run.
+
+    - `serve(stop_event: threading.Event = None, exit_when_idle: bool = False)`:
+        - Claims and runs jobs until `stop_event` is set (or the queue is empty with `exit_when_idle`). While idle,
+          `keep_alive` runs every `keep_alive_interval` seconds.
+
+    - `run_job(job: Job) -> dict`:
+        - Processes the CSV rows of a job in batches, then retries the deferred rows. The scheduler, and so the
+          selected site and its table index, is kept from one job to the next.
+        - Returns the result stored in the queue: `rows`, `statuses`, `seconds`, `site_switches`, `outcomes`.
+
+    - `keep_alive() -> bool`:
+        - Sends a request from the page to extend the Salesforce session, then checks it; a lost session or a dead
+          browser is recovered and the last site selected again.
+
+    - `stop()`:
+        - Quits the browser.
+
+    #### Note:
+    - The browser is recycled between rows by a `DriverRecycler` with `recycle_policy` (default `RecyclePolicy()`).
+    - Each job has its own `CheckpointJournal` (`<journal_dir>/job-<id>.sqlite3`), so a restarted job resumes where it
+      stopped while a later feed with the same row ids is processed again. The journal is deleted once the job is done.
+    """
+
+    def __init__(self, job_queue, url, username, password, session_path=None, default_site=None,
+                 journal_dir="./.checkpoints/jobs", keep_alive_interval=300, poll_interval=5, batch_size=50,
+                 index_ttl=900, profile="default", recycle_policy=None):
+        if keep_alive_interval <= 0 or poll_interval <= 0:
+            raise ValueError("keep_alive_interval and poll_interval must be positive")
+        self.job_queue = job_queue
+        self.url = url
+        self.username = username
+        self.password = password
+        self.session_store = SessionStore(session_path) if session_path else None
+        self.journal_dir = journal_dir
+        self.keep_alive_interval = keep_alive_interval
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.bot = FetcherBot(index_ttl=index_ttl, profile=profile)
+        # The browser is restarted between rows once it grew too large or slow (see `driver_recycler.py`)
+        self.recycler = DriverRecycler(self.bot, recycle_policy)
+        self.scheduler = SiteScheduler(self.bot, default_site=default_site, recycler=self.recycler)
+        self.last_activity = time.monotonic()
+        self.stats = {"jobs": 0, "failed_jobs": 0, "rows": 0, "keep_alives": 0, "recoveries": 0}
+
+    def start(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        requeued = self.job_queue.requeue_interrupted()
+        if requeued:
+            print(f"Info: {requeued} interrupted jobs queued again")
+        if not self.bot.start_session(self.url, self.username, self.password, self.session_store):
+            print("Error: Worker daemon could not log in")
+            return False
+        self.last_activity = time.monotonic()
+        print("Worker daemon logged in, waiting for jobs")
+        return True
+
+    def serve(self, stop_event=None, exit_when_idle=False):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            job = self.job_queue.claim()
+            if job is not None:
+                self.run_queued_job(job)
+                continue
+            if exit_when_idle:
+                return
+            if time.monotonic() - self.last_activity >= self.keep_alive_interval:
+                self.keep_alive()
+            stop_event.wait(self.poll_interval)
+
+    def run_queued_job(self, job):
+        """
+        ## Runs a claimed job and reports its result, or its error, to the queue.
+        """
+        print(f"Job {job.id}: {job.path}")
+        try:
+            if not self.ensure_session():
+                raise RuntimeError("The browser session could not be recovered")
+            result = self.run_job(job)
+        except Exception as e:
+            print(f"Error: Job {job.id} failed\n{e}")
+            self.stats["failed_jobs"] += 1
+            self.job_queue.fail(job, str(e))
+            return
+        finally:
+            self.last_activity = time.monotonic()
+        self.stats["jobs"] += 1
+        self.stats["rows"] += result["rows"]
+        self.job_queue.complete(job, result)
+        print(f"Job {job.id} done: {result['rows']} rows in {result['seconds']:.1f}s, {result['statuses']}")
+
+    def run_job(self, job):
+        start = time.perf_counter()
+        site_switches = self.scheduler.site_switches
+        # A job starts with a new chance to log in
+        self.scheduler.session_failed = False
+        journal_path = os.path.join(self.journal_dir, f"job-{job.id}.sqlite3")
+        journal = CheckpointJournal(journal_path)
+        outcomes = []
+        try:
+            for batch in iter_batches(iter_csv_rows(job.path), self.batch_size):
+                outcomes.extend(self.scheduler.run(batch, journal, drain=False))
+            outcomes.extend(self.scheduler.drain_retries(journal))
+        finally:
+            journal.close()
+        remove_journal(journal_path)
+
+        statuses = {}
+        for outcome in outcomes:
+            statuses[outcome["status"]] = statuses.get(outcome["status"], 0) + 1
+        return {
+            "rows": len(outcomes),
+            "statuses": statuses,
+            "seconds": time.perf_counter() - start,
+            "site_switches": self.scheduler.site_switches - site_switches,
+            "outcomes": outcomes,
+        }
+
+    def ensure_session(self):
+        """
+        ## Recovers a dead browser or a lost session, then selects the last site again.
+
+        - return: True if the bot is logged in, False otherwise.
+        """
+        if DriverPool.is_alive(self.bot) and not self.bot.is_session_lost():
+            return True
+        site_name = self.bot.active_site
+        self.stats["recoveries"] += 1
+        if not self.bot.recover_session():
+            print("Error: Unable to recover the session of the worker daemon")
+            return False
+        if site_name is not None:
+            self.bot.select_site(site_name)
+        return True
+
+    def keep_alive(self):
+        self.stats["keep_alives"] += 1
+        self.last_activity = time.monotonic()
+        frame_context = self.bot.locators.frame_context
+        try:
+            # Both the Lightning page and the iframe of the site table have a session
+            self.bot.driver.execute_async_script(KEEP_ALIVE_SCRIPT)
+            if frame_context != DEFAULT_CONTEXT:
+                self.bot.locators.leave_frame()
+                self.bot.driver.execute_async_script(KEEP_ALIVE_SCRIPT)
+                self.bot.locators.enter_frame(frame_context)
+        except Exception as e:
+            print(f"Warning: Keep-alive request failed\n{e}")
+        return self.ensure_session()
+
+    def stop(self):
+        self.bot.quit()
+        print(f"Worker daemon stopped: {self.stats}, browser restarts: {self.recycler.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process CSV feeds from a local queue with a warm, logged-in browser")
+    actions = parser.add_subparsers(dest="action", required=True)
+    serve_parser = actions.add_parser("serve", help="run the worker daemon")
+    submit_parser = actions.add_parser("submit", help="queue CSV feeds")
+    for action_parser in (serve_parser, submit_parser):
+        source = action_parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--spool", help="spool directory, CSV files are dropped in <spool>/incoming/")
+        source.add_argument("--queue", help="SQLite job queue")
+    submit_parser.add_argument("csv_paths", nargs="+")
+    serve_parser.add_argument("--url", required=True, help="login page")
+    serve_parser.add_argument("--username", required=True)
+    serve_parser.add_argument("--password", required=True)
+    serve_parser.add_argument("--site", help="site of the rows without a location")
+    serve_parser.add_argument("--session-path", help="saved session reused at start (see session_store.py)")
+    serve_parser.add_argument("--keep-alive", type=float, default=300, help="seconds between keep-alives while idle")
+    serve_parser.add_argument("--poll", type=float, default=5, help="seconds between queue checks while idle")
+    serve_parser.add_argument("--exit-when-idle", action="store_true", help="stop once the queue is empty")
+    serve_parser.add_argument("--browser-profile", default="default", choices=("default", "lean"))
+    args = parser.parse_args()
+
+    jobs = SpoolQueue(args.spool) if args.spool else SqliteJobQueue(args.queue)
+    if args.action == "submit":
+        for feed_path in args.csv_paths:
+            print(f"Queued {feed_path} as job {jobs.submit(feed_path)}")
+    else:
+        daemon = WorkerDaemon(jobs, args.url, args.username, args.password, session_path=args.session_path,
+                              default_site=args.site, keep_alive_interval=args.keep_alive, poll_interval=args.poll,
+                              profile=args.browser_profile)
+        stop_requested = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop_requested.set())
+        signal.signal(signal.SIGINT, lambda *_: stop_requested.set())
+        try:
+            if daemon.start():
+                daemon.serve(stop_requested, args.exit_when_idle)
+        finally:
+            daemon.stop()